@@ -0,0 +1,33 @@
+"""Support for the async views served under ASGI.
+
+Blocking file work is handed to a dedicated thread pool of
+``ASYNC_IO_THREADS`` threads. Its size bounds how many uploads touch the
+disk at once, and it keeps file I/O from competing with the thread that
+``sync_to_async`` uses for the ORM.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+_executor = None
+_lock = threading.Lock()
+
+
+def io_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_IO_THREADS, thread_name_prefix="async-io"
+            )
+        return _executor
+
+
+async def run_io(func, *args, **kwargs):
+    """Run a blocking call on the I/O pool and wait for it without blocking the loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor(), functools.partial(func, *args, **kwargs))
@@ -0,0 +1,41 @@
+"""Async versions of the upload endpoints, routed in place of the sync ones under ASGI.
+
+DRF views are synchronous, so these are plain Django views with the same
+request and response formats. Multipart parsing, hashing and moving files run
+on the bounded I/O pool (``app.aio``); queries use the async ORM.
+"""
+
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from jobs.queue import aenqueue
+
+from . import pages, uploads
+from .aio import run_io
+from .storage import astore_upload
+
+
+@csrf_exempt
+@require_POST
+async def upload_file(request):
+    serializer, rejection = await run_io(uploads.parse_pdf_upload, request, JsonResponse)
+    if rejection is not None:
+        return rejection
+    if serializer.is_valid():
+        return JsonResponse({"message": "File uploaded successfully"}, status=201)
+    return JsonResponse(serializer.errors, status=400)
+
+
+@csrf_exempt
+@require_POST
+async def pdf_upload(request):
+    serializer, rejection = await run_io(uploads.parse_pdf_upload, request, JsonResponse)
+    if rejection is not None:
+        return rejection
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    upload, created = await astore_upload(serializer.validated_data["file"])
+    job = await aenqueue("render_pages", uploads.prerender_payload(upload)) if created else None
+    page_list = await run_io(pages.page_descriptors, upload)
+    return JsonResponse(uploads.stored_upload_data(upload, created, job, page_list))
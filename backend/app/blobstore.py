@@ -0,0 +1,106 @@
+"""Where blob files live under ``PDF_TMP_DIR``.
+
+``PDF_STORAGE_BACKEND`` names the layout by dotted path (see
+``app.storage.blob_store``). ``ShardedBlobStore``, the default, nests files
+two directory levels deep by digest prefix, so no directory holds more than
+a few thousand entries even with hundreds of millions of blobs and lookups
+stay fast on every filesystem. ``FlatBlobStore`` keeps the original
+one-directory layout.
+
+Kept free of Django imports so the processing stages that run in worker
+processes can map blobs with ``mapped``.
+"""
+
+import io
+import mmap
+import os
+from contextlib import contextmanager
+
+EXTENSION = ".pdf"
+
+
+class BlobStore:
+    """Base class for blob layouts under a root directory."""
+
+    def __init__(self, root):
+        """Store blobs under ``root``."""
+        self.root = root
+
+    def relative_path(self, sha256):
+        """Return the path of blob ``sha256`` relative to the root."""
+        raise NotImplementedError
+
+    def stored(self):
+        """Yield ``(sha256, path)`` for every blob file under the root."""
+        raise NotImplementedError
+
+    def path(self, sha256):
+        return os.path.join(self.root, self.relative_path(sha256))
+
+    def put(self, source_path, sha256):
+        """Move ``source_path``, on the same filesystem as the root, into place."""
+        destination = self.path(sha256)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(source_path, destination)
+
+
+class FlatBlobStore(BlobStore):
+    """Every blob directly in the root as ``<sha256>.pdf``."""
+
+    def relative_path(self, sha256):
+        return f"{sha256}{EXTENSION}"
+
+    def stored(self):
+        if not os.path.isdir(self.root):
+            return
+        for entry in os.scandir(self.root):
+            stem, extension = os.path.splitext(entry.name)
+            if extension == EXTENSION and entry.is_file():
+                yield stem, entry.path
+
+
+class ShardedBlobStore(BlobStore):
+    """Blobs as ``ab/cd/<sha256>.pdf``, sharded by the first two digest bytes."""
+
+    def relative_path(self, sha256):
+        return os.path.join(sha256[:2], sha256[2:4], f"{sha256}{EXTENSION}")
+
+    def stored(self):
+        for first in _subdirectories(self.root):
+            for second in _subdirectories(first.path):
+                for entry in os.scandir(second.path):
+                    stem, extension = os.path.splitext(entry.name)
+                    if extension == EXTENSION:
+                        yield stem, entry.path
+
+
+def map_file(path):
+    """Map ``path`` read-only; the map stays valid if the file is removed or replaced.
+
+    Raises ``ValueError`` for an empty file.
+    """
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@contextmanager
+def mapped(path):
+    """Map ``path`` read-only for the duration of a ``with`` block.
+
+    The map reads straight from the page cache: passing it to anything that
+    takes a buffer or a seekable file, such as ``pypdf.PdfReader``, avoids
+    copying the whole file into the process first. Empty files, which cannot
+    be mapped, give an empty ``BytesIO``.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield io.BytesIO()
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            yield content
+
+
+def _subdirectories(path):
+    if not os.path.isdir(path):
+        return []
+    return [entry for entry in os.scandir(path) if entry.is_dir() and len(entry.name) == 2]
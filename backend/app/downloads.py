@@ -0,0 +1,154 @@
+"""Sending stored PDFs to clients.
+
+With ``PDF_DOWNLOAD_OFFLOAD`` unset the file is streamed by Django. Under
+gunicorn, whose ``wsgi.file_wrapper`` uses ``sendfile``, the bytes go from the
+page cache to the socket without passing through Python, for byte ranges as
+well. In production ``"x-accel-redirect"`` or ``"x-sendfile"`` hands the file
+to nginx or Apache instead, which also answer ``Range`` requests, so no
+worker is tied up while a large PDF downloads.
+
+A single ``Range`` is answered with 206 so that PDF viewers such as pdf.js
+can fetch a linearized document page by page. Multiple ranges are answered
+with the whole file, which RFC 9110 allows.
+"""
+
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header
+
+from .storage import blob_store
+
+CONTENT_TYPE = "application/pdf"
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+OFFLOAD_MODES = ("x-accel-redirect", "x-sendfile")
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """Return the inclusive ``(start, end)`` of a single byte range, or None for all of it.
+
+    Headers this does not handle, such as several ranges, mean the whole
+    file. Raises ``RangeNotSatisfiable`` for a range outside the file.
+    """
+    match = _RANGE.fullmatch(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+class FileRange:
+    """File-like view of the next ``length`` bytes of an open file.
+
+    ``fileno`` lets gunicorn's file wrapper ``sendfile`` the range starting
+    at the file's current position, bounded by ``Content-Length``; other
+    servers iterate over ``read``, which stops at the end of the range.
+    """
+
+    def __init__(self, file, length):
+        """Wrap ``file``, already positioned at the start of the range."""
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def blob_response(request, sha256, filename):
+    """Return the response sending blob ``sha256`` as ``filename``.
+
+    Raises ``FileNotFoundError`` when the blob file is gone.
+    """
+    etag = f'"{sha256}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    mode = settings.PDF_DOWNLOAD_OFFLOAD
+    if mode is not None:
+        response = _offloaded(mode, sha256)
+    else:
+        response = _streamed(request, sha256, etag)
+    response["ETag"] = etag
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = CACHE_CONTROL
+    if filename:
+        response["Content-Disposition"] = content_disposition_header(False, filename)
+    return response
+
+
+def _offloaded(mode, sha256):
+    store = blob_store()
+    path = store.path(sha256)
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    response = HttpResponse(content_type=CONTENT_TYPE)
+    if mode == "x-accel-redirect":
+        relative = store.relative_path(sha256).replace(os.sep, "/")
+        response["X-Accel-Redirect"] = quote(settings.PDF_DOWNLOAD_ACCEL_PREFIX + relative)
+    elif mode == "x-sendfile":
+        response["X-Sendfile"] = os.path.abspath(path)
+    else:
+        raise ValueError(
+            f"PDF_DOWNLOAD_OFFLOAD must be one of {', '.join(OFFLOAD_MODES)} or None, "
+            f"not {mode!r}"
+        )
+    return response
+
+
+def _streamed(request, sha256, etag):
+    file = open(blob_store().path(sha256), "rb")
+    size = os.fstat(file.fileno()).st_size
+    if_range = request.headers.get("If-Range")
+    try:
+        byte_range = None
+        if if_range is None or if_range == etag:
+            byte_range = parse_range(request.headers.get("Range"), size)
+    except RangeNotSatisfiable:
+        file.close()
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        return FileResponse(file, content_type=CONTENT_TYPE)
+    start, end = byte_range
+    length = end - start + 1
+    file.seek(start)
+    response = FileResponse(FileRange(file, length), content_type=CONTENT_TYPE, status=206)
+    response["Content-Length"] = str(length)
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
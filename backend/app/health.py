@@ -0,0 +1,49 @@
+"""Readiness checks: can this process serve requests that touch the DB and disk."""
+
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+
+def check_database():
+    started = time.perf_counter()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except DatabaseError as e:
+        return {"ok": False, "error": str(e)}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+
+def check_disk(path):
+    """Check that ``path`` is writable with at least ``HEALTH_MIN_FREE_BYTES`` free.
+
+    A directory that does not exist yet is judged by the parent it will be
+    created in.
+    """
+    while not os.path.exists(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    try:
+        usage = shutil.disk_usage(path)
+    except OSError as e:
+        return {"ok": False, "error": str(e)}
+    writable = os.access(path, os.W_OK)
+    result = {
+        "ok": writable and usage.free >= settings.HEALTH_MIN_FREE_BYTES,
+        "free_bytes": usage.free,
+        "min_free_bytes": settings.HEALTH_MIN_FREE_BYTES,
+    }
+    if not writable:
+        result["error"] = f"{path} is not writable"
+    return result
+
+
+def readiness():
+    return {
+        "database": check_database(),
+        "pdf_storage": check_disk(settings.PDF_TMP_DIR),
+        "page_cache": check_disk(settings.PAGE_RENDER_DIR),
+    }
@@ -0,0 +1,30 @@
+import os
+
+from app.blobstore import FlatBlobStore, ShardedBlobStore
+from app.storage import blob_store
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Move stored PDFs into the layout chosen by PDF_STORAGE_BACKEND"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report how many files would move without moving them",
+        )
+
+    def handle(self, *args, **options):
+        store = blob_store()
+        moved = 0
+        for layout in (FlatBlobStore, ShardedBlobStore):
+            for sha256, path in list(layout(settings.PDF_TMP_DIR).stored()):
+                if os.path.abspath(path) == os.path.abspath(store.path(sha256)):
+                    continue
+                moved += 1
+                if not options["dry_run"]:
+                    store.put(path, sha256)
+        verb = "Would move" if options["dry_run"] else "Moved"
+        self.stdout.write(f"{verb} {moved} blob(s) into the {type(store).__name__} layout")
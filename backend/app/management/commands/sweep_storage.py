@@ -0,0 +1,43 @@
+import time
+
+from app import retention
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Evict stored PDFs and page renders beyond the storage quota or age limit"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be removed without removing anything",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep sweeping every --interval seconds",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.STORAGE_SWEEP_INTERVAL,
+            help="Seconds between sweeps with --loop",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            report = retention.sweep(dry_run=options["dry_run"])
+            usage = retention.usage()
+            self.stdout.write(
+                "Evicted {evicted_blobs} blob(s), artifacts of {evicted_artifacts} more and "
+                "{stray_files} stray file(s), freeing {freed_bytes} bytes".format(**report)
+                + f"; {usage['total_bytes']} of {usage['quota_bytes']} bytes in use"
+            )
+            if not options["loop"]:
+                return
+            try:
+                time.sleep(options["interval"])
+            except KeyboardInterrupt:
+                return
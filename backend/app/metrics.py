@@ -0,0 +1,284 @@
+"""Process-local metrics, shared across worker processes through a directory.
+
+Every thread updates its own dict of samples, so recording a value never
+takes a lock. Reading adds the per-thread dicts up. With ``METRICS_DIR`` set,
+each process writes its totals to a file there at most every
+``METRICS_FLUSH_INTERVAL`` seconds, and ``collect`` adds up the files of all
+processes. That is how the gunicorn workers answering ``/api/metrics/`` in
+turn all report the same numbers. Counters of processes that have exited are
+folded into an archive file, so totals never go backwards; their gauges are
+dropped.
+
+``render`` produces the Prometheus text exposition format.
+"""
+
+import atexit
+import fcntl
+import glob
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+THROUGHPUT_BUCKETS = tuple(2**power for power in range(16, 30, 2))  # 64 KiB/s to 256 MiB/s
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    "http_requests_total": (COUNTER, "HTTP requests by route, method and status.", None),
+    "http_request_duration_seconds": (
+        HISTOGRAM,
+        "Time until the view returned a response, by route and method.",
+        LATENCY_BUCKETS,
+    ),
+    "http_requests_in_flight": (GAUGE, "Requests being handled right now.", None),
+    "http_request_bytes_total": (COUNTER, "Request body bytes by route.", None),
+    "http_response_bytes_total": (COUNTER, "Response body bytes by route.", None),
+    "http_db_queries_total": (COUNTER, "Database queries issued by requests, by route.", None),
+    "http_db_query_seconds_total": (
+        COUNTER,
+        "Time requests spent in database queries, by route.",
+        None,
+    ),
+    "http_upload_bytes_per_second": (
+        HISTOGRAM,
+        "Request body throughput of uploads, by route.",
+        THROUGHPUT_BUCKETS,
+    ),
+    "upload_rejections_total": (COUNTER, "Uploads aborted while streaming, by reason.", None),
+    "upload_rejected_bytes_total": (
+        COUNTER,
+        "Request bytes left unread by aborted uploads, by reason.",
+        None,
+    ),
+}
+
+ARCHIVE = "archive.json"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Registry:
+    """Samples of one process, sharded per thread."""
+
+    def __init__(self):
+        """Start empty; shards are created by the threads that record values."""
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.token = uuid.uuid4().hex[:12]
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._flushed = 0.0
+
+    def _shard(self):
+        shard = getattr(self._local, "samples", None)
+        if shard is None:
+            shard = self._local.samples = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name, amount=1, **labels):
+        shard = self._shard()
+        key = (name, tuple(sorted(labels.items())))
+        shard[key] = shard.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        shard = self._shard()
+        key = (name, tuple(sorted(labels.items())))
+        counts = shard.get(key)
+        if counts is None:
+            # One count per bucket plus +Inf, then the sum of observed values
+            counts = shard[key] = [0] * (len(buckets) + 1) + [0.0]
+        counts[bisect_left(buckets, value)] += 1
+        counts[-1] += value
+
+    def samples(self):
+        """Return this process's ``{(name, labels): value}`` totals."""
+        with self._shards_lock:
+            shards = list(self._shards)
+        totals = {}
+        for shard in shards:
+            _merge(totals, dict(shard))
+        return totals
+
+    def flush(self, force=False):
+        """Write this process's totals to ``METRICS_DIR`` if it is time to."""
+        directory = settings.METRICS_DIR
+        now = time.monotonic()
+        if not directory or (not force and now - self._flushed < settings.METRICS_FLUSH_INTERVAL):
+            return
+        self._flushed = now
+        os.makedirs(directory, exist_ok=True)
+        _write(os.path.join(directory, f"{self.token}.json"), self.pid, self.samples())
+
+
+registry = Registry()
+# A forked worker starts from zero rather than repeating its parent's counts
+os.register_at_fork(after_in_child=registry.reset)
+atexit.register(lambda: registry.flush(force=True))
+
+
+def inc(name, amount=1, **labels):
+    registry.inc(name, amount, **labels)
+
+
+def observe(name, value, **labels):
+    registry.observe(name, value, **labels)
+
+
+def collect():
+    """Return the ``{(name, labels): value}`` totals of every process."""
+    directory = settings.METRICS_DIR
+    if not directory:
+        return registry.samples()
+    registry.flush(force=True)
+    for path in _process_files(directory):
+        pid, _ = _read(path)
+        if pid is not None and not _alive(pid):
+            _archive(directory, path)
+
+    totals = {}
+    with _locked(directory, fcntl.LOCK_SH):
+        for path in glob.glob(os.path.join(directory, "*.json")):
+            _, samples = _read(path)
+            _merge(totals, samples or {})
+    return totals
+
+
+def render(samples):
+    """Format ``samples`` in the Prometheus text exposition format."""
+    by_name = {}
+    for (name, labels), value in samples.items():
+        by_name.setdefault(name, []).append((labels, value))
+    lines = []
+    for name in sorted(by_name):
+        kind, help_text, buckets = METRICS.get(name, (GAUGE, "", None))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(by_name[name]):
+            if kind == HISTOGRAM:
+                lines.extend(_histogram_lines(name, labels, value, buckets))
+            else:
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(name, labels, counts, buckets):
+    cumulative = 0
+    for bound, count in zip(buckets + (math.inf,), counts):
+        cumulative += count
+        le = "+Inf" if bound == math.inf else _number(bound)
+        yield f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}"
+    yield f"{name}_sum{_labels(labels)} {_number(counts[-1])}"
+    yield f"{name}_count{_labels(labels)} {cumulative}"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _number(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _merge(totals, samples, counters_only=False):
+    """Add ``samples`` into ``totals``, leaving out gauges with ``counters_only``."""
+    for key, value in samples.items():
+        if counters_only and METRICS.get(key[0], (GAUGE,))[0] == GAUGE:
+            continue
+        current = totals.get(key)
+        if current is None:
+            totals[key] = list(value) if isinstance(value, list) else value
+        elif isinstance(value, list):
+            totals[key] = [a + b for a, b in zip(current, value)]
+        else:
+            totals[key] = current + value
+
+
+def _write(path, pid, samples):
+    document = {
+        "pid": pid,
+        "samples": [[name, list(labels), value] for (name, labels), value in samples.items()],
+    }
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(document, f)
+    os.replace(tmp_path, path)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            document = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None, None
+    samples = {
+        (name, tuple(tuple(pair) for pair in labels)): value
+        for name, labels, value in document["samples"]
+    }
+    return document.get("pid"), samples
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_files(directory):
+    paths = glob.glob(os.path.join(directory, "*.json"))
+    return [path for path in paths if os.path.basename(path) != ARCHIVE]
+
+
+class _locked:
+    """``flock`` on the directory's lock file for the duration of a ``with`` block."""
+
+    def __init__(self, directory, operation):
+        """Lock ``directory`` shared or exclusively, per ``operation``."""
+        self.path = os.path.join(directory, ".lock")
+        self.operation = operation
+
+    def __enter__(self):
+        self.file = open(self.path, "a")
+        fcntl.flock(self.file, self.operation)
+
+    def __exit__(self, *exc_info):
+        self.file.close()
+
+
+def _archive(directory, path):
+    """Fold the counters and histograms of an exited process into the archive."""
+    with _locked(directory, fcntl.LOCK_EX):
+        _, samples = _read(path)
+        if samples is None:
+            # Another scrape archived it first
+            return
+        archive_path = os.path.join(directory, ARCHIVE)
+        _, archived = _read(archive_path)
+        archived = archived or {}
+        _merge(archived, samples, counters_only=True)
+        _write(archive_path, None, archived)
+        os.remove(path)
@@ -0,0 +1,161 @@
+"""Request instrumentation feeding ``app.metrics``.
+
+Requests are labelled by URL route (``api/templates/<int:pk>/``) rather than
+by path, which keeps the number of series bounded. Database queries are
+attributed to the request that issued them through a context variable, which
+``sync_to_async`` carries into the ORM thread of async views.
+"""
+
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+UPLOAD_CONTENT_TYPES = ("multipart/form-data", "application/offset+octet-stream")
+
+_query_stats = ContextVar("query_stats", default=None)
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        """Start with no queries."""
+        self.count = 0
+        self.seconds = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - started
+
+
+def install_query_hook(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_hook)
+
+
+class MetricsMiddleware:
+    """Record latency, sizes, query counts and in-flight requests of every request.
+
+    Latency is measured until the view returns, so for streamed responses it
+    is the time to the first byte.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """Wrap ``get_response``, keeping its sync or async nature."""
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started, stats, token = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+            metrics.inc("http_requests_in_flight", -1)
+        return self._finish(request, response, started, stats)
+
+    async def __acall__(self, request):
+        started, stats, token = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+            metrics.inc("http_requests_in_flight", -1)
+        return self._finish(request, response, started, stats)
+
+    def _start(self):
+        # Connections opened before this module was imported missed the signal
+        for connection in connections.all(initialized_only=True):
+            install_query_hook(connection)
+        metrics.inc("http_requests_in_flight")
+        stats = QueryStats()
+        return time.perf_counter(), stats, _query_stats.set(stats)
+
+    def _finish(self, request, response, started, stats):
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        route = match.route if match is not None else "unmatched"
+        method = request.method if request.method in METHODS else "other"
+
+        metrics.inc(
+            "http_requests_total", route=route, method=method, status=str(response.status_code)
+        )
+        metrics.observe("http_request_duration_seconds", elapsed, route=route, method=method)
+        if stats.count:
+            metrics.inc("http_db_queries_total", stats.count, route=route)
+            metrics.inc("http_db_query_seconds_total", stats.seconds, route=route)
+
+        request_bytes = _content_length(request.META.get("CONTENT_LENGTH"))
+        if request_bytes:
+            metrics.inc("http_request_bytes_total", request_bytes, route=route)
+            if request.content_type in UPLOAD_CONTENT_TYPES and elapsed > 0:
+                throughput = request_bytes / elapsed
+                metrics.observe("http_upload_bytes_per_second", throughput, route=route)
+        _count_response_bytes(response, route)
+
+        metrics.registry.flush()
+        return response
+
+
+def _content_length(value):
+    try:
+        return max(int(value or 0), 0)
+    except ValueError:
+        return 0
+
+
+def _count_response_bytes(response, route):
+    if not response.streaming:
+        metrics.inc("http_response_bytes_total", len(response.content), route=route)
+    elif response.has_header("Content-Length"):
+        # Files sent by the server's file wrapper never pass through streaming_content
+        length = _content_length(response["Content-Length"])
+        metrics.inc("http_response_bytes_total", length, route=route)
+    elif response.is_async:
+        response.streaming_content = _acounted(response.streaming_content, route)
+    else:
+        response.streaming_content = _counted(response.streaming_content, route)
+
+
+def _counted(chunks, route):
+    size = 0
+    try:
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+    finally:
+        metrics.inc("http_response_bytes_total", size, route=route)
+
+
+async def _acounted(chunks, route):
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+    finally:
+        metrics.inc("http_response_bytes_total", size, route=route)
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_upload_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blob',
+            name='artifacts_size',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='blob',
+            name='last_accessed',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Blob(models.Model):
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Storage bookkeeping, see app.retention
+    last_accessed = models.DateTimeField(default=timezone.now, db_index=True)
+    artifacts_size = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Blob {self.sha256}"
+
+
+class Upload(models.Model):
+    upload_id = models.CharField(max_length=64, unique=True)
+    blob = models.ForeignKey("Blob", related_name="uploads", on_delete=models.PROTECT)
+    filename = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Upload {self.upload_id}"
+
+
+class UploadSession(models.Model):
+    session_id = models.CharField(max_length=64, unique=True)
+    filename = models.CharField(max_length=255, blank=True)
+    length = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    upload = models.OneToOneField("Upload", null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"UploadSession {self.session_id} ({self.offset}/{self.length})"
@@ -0,0 +1,137 @@
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.urls import reverse
+from pypdfium2 import PdfiumError
+
+from . import rasterize
+from .storage import blob_path
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def render_workers():
+    workers = settings.PAGE_RENDER_WORKERS
+    return (os.cpu_count() or 1) if workers is None else workers
+
+
+def get_executor():
+    """Return the shared render pool, or None when rendering runs inline."""
+    global _executor
+    if render_workers() <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            # spawn keeps pdfium state and DB connections out of the children
+            _executor = ProcessPoolExecutor(
+                max_workers=render_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+
+
+def cache_dir(sha256):
+    path = os.path.join(settings.PAGE_RENDER_DIR, sha256)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def rendered_path(sha256, page_number, dpi, image_format):
+    return os.path.join(cache_dir(sha256), f"{page_number}-{dpi}.{image_format}")
+
+
+def page_sizes(sha256):
+    """Page sizes of a blob in points, cached on disk next to its renders."""
+    meta_path = os.path.join(cache_dir(sha256), "pages.json")
+    try:
+        with open(meta_path) as f:
+            return [tuple(size) for size in json.load(f)]
+    except FileNotFoundError:
+        pass
+
+    sizes = rasterize.page_sizes(blob_path(sha256))
+    with open(meta_path, "w") as f:
+        json.dump(sizes, f)
+    return sizes
+
+
+def page_count(sha256):
+    try:
+        return len(page_sizes(sha256))
+    except PdfiumError:
+        return 0
+
+
+def page_descriptors(upload):
+    """Describe every page of an upload without rendering any image."""
+    sha256 = upload.blob.sha256
+    try:
+        sizes = page_sizes(sha256)
+    except PdfiumError:
+        logger.warning("Could not read pages of upload %s", upload.upload_id)
+        return []
+
+    descriptors = []
+    for page_number, (width, height) in enumerate(sizes, start=1):
+        url = reverse("page_image", args=[upload.upload_id, page_number])
+        images = [
+            {"dpi": dpi, "format": image_format, "url": f"{url}?dpi={dpi}&format={image_format}"}
+            for dpi in settings.PAGE_RENDER_DPIS
+            for image_format in settings.PAGE_RENDER_FORMATS
+        ]
+        descriptors.append(
+            {
+                "page": page_number,
+                "width": width,
+                "height": height,
+                "images": images,
+            }
+        )
+    return descriptors
+
+
+def render(sha256, page_number, dpi, image_format):
+    """Return the path of a rendered page, rendering it on first request."""
+    return render_many(sha256, [page_number], dpi, image_format)[0]
+
+
+def render_all(sha256, dpi, image_format):
+    """Render every page of a blob at one resolution."""
+    pages = range(1, len(page_sizes(sha256)) + 1)
+    return render_many(sha256, pages, dpi, image_format)
+
+
+def render_many(sha256, page_numbers, dpi, image_format):
+    """Render the missing pages across the render pool and return all paths."""
+    executor = get_executor()
+    source = blob_path(sha256)
+    paths, pending = [], []
+    for page_number in page_numbers:
+        output_path = rendered_path(sha256, page_number, dpi, image_format)
+        paths.append(output_path)
+        if os.path.exists(output_path):
+            continue
+        args = (source, page_number, dpi, image_format, output_path)
+        if executor is None:
+            rasterize.render_page(*args)
+        else:
+            pending.append(executor.submit(rasterize.render_page, *args))
+    for future in pending:
+        future.result()
+    return paths
@@ -0,0 +1,51 @@
+"""PDF page rasterization.
+
+Kept free of Django imports so the functions can run in worker processes
+started with the ``spawn`` method.
+"""
+
+import os
+import tempfile
+
+import pypdfium2 as pdfium
+
+POINTS_PER_INCH = 72
+
+IMAGE_FORMATS = {
+    "png": ("PNG", {"optimize": False}),
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+}
+
+
+def page_sizes(pdf_path):
+    """Return ``[(width, height), ...]`` in PDF points for every page."""
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        return [pdf[index].get_size() for index in range(len(pdf))]
+    finally:
+        pdf.close()
+
+
+def render_page(pdf_path, page_number, dpi, image_format, output_path):
+    """Render one 1-based page to ``output_path`` and return the path.
+
+    The image is written to a temporary file next to ``output_path`` and moved
+    into place, so concurrent readers never see a partial file.
+    """
+    pil_format, options = IMAGE_FORMATS[image_format]
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        bitmap = pdf[page_number - 1].render(scale=dpi / POINTS_PER_INCH)
+        image = bitmap.to_pil()
+    finally:
+        pdf.close()
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output_path), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as destination:
+            image.save(destination, pil_format, **options)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_path
@@ -0,0 +1,108 @@
+import fcntl
+import os
+import uuid
+
+from django.conf import settings
+
+from .models import UploadSession
+from .storage import hash_file, store_file
+
+CHUNK_SIZE = 64 * 1024
+
+
+class OffsetMismatch(Exception):
+    pass
+
+
+class IncompleteUpload(Exception):
+    pass
+
+
+class ChecksumMismatch(Exception):
+    pass
+
+
+def session_path(session):
+    return os.path.join(settings.PDF_TMP_DIR, f"{session.session_id}.upload")
+
+
+def create_session(filename, length, sha256=""):
+    session = UploadSession.objects.create(
+        session_id=uuid.uuid4().hex, filename=filename, length=length, sha256=sha256
+    )
+    open(session_path(session), "wb").close()
+    return session
+
+
+def current_offset(session):
+    """Bytes received so far.
+
+    The file on disk is the source of truth: bytes that arrived before a
+    dropped connection are kept, so the client resumes right after them.
+    """
+    try:
+        return os.path.getsize(session_path(session))
+    except FileNotFoundError:
+        return 0
+
+
+def append_chunk(session, offset, stream):
+    """Append ``stream`` at ``offset`` without buffering it in memory.
+
+    Raises ``OffsetMismatch`` when ``offset`` is not the current end of the
+    upload. Never writes past the declared upload length. Returns the new
+    offset.
+    """
+    with open(session_path(session), "ab") as destination:
+        # A retry overlapping a PATCH that is still writing waits for it here,
+        # then finds the upload has moved past its offset
+        fcntl.flock(destination, fcntl.LOCK_EX)
+        end = os.fstat(destination.fileno()).st_size
+        if offset != end:
+            raise OffsetMismatch(end)
+
+        remaining = session.length - offset
+        try:
+            while remaining > 0:
+                chunk = stream.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                destination.write(chunk)
+                remaining -= len(chunk)
+        finally:
+            destination.flush()
+            new_offset = os.fstat(destination.fileno()).st_size
+            UploadSession.objects.filter(pk=session.pk).update(offset=new_offset)
+            session.offset = new_offset
+    return new_offset
+
+
+def finalize(session):
+    """Check the completed upload and move it into the blob store.
+
+    Returns ``(upload, created)``. Finalizing twice returns the same upload.
+    """
+    if session.upload_id is not None:
+        return session.upload, False
+    if current_offset(session) != session.length:
+        raise IncompleteUpload(current_offset(session))
+
+    path = session_path(session)
+    digest = hash_file(path)
+    if session.sha256 and digest != session.sha256:
+        # The bytes on disk are unusable, let the client start over
+        open(path, "wb").close()
+        UploadSession.objects.filter(pk=session.pk).update(offset=0)
+        raise ChecksumMismatch(digest)
+
+    upload, created = store_file(path, digest, session.length, session.filename)
+    session.upload = upload
+    session.offset = session.length
+    session.save(update_fields=["upload", "offset", "updated_at"])
+    return upload, created
+
+
+def discard(session):
+    if os.path.exists(session_path(session)):
+        os.remove(session_path(session))
+    session.delete()
@@ -0,0 +1,232 @@
+"""Keep ``PDF_TMP_DIR`` and ``PAGE_RENDER_DIR`` within a byte quota.
+
+Every ``Blob`` row records the size of its PDF, the size of its derived
+artifacts (page renders, page sizes, detected layouts) as last measured by a
+sweep, and when it was last used. ``sweep`` evicts least recently used blobs
+until the total fits ``STORAGE_QUOTA_BYTES`` and evicts blobs unused for
+``STORAGE_MAX_AGE`` seconds. Evicting a blob deletes its file, its artifacts
+and its ``Upload`` rows.
+
+Blobs behind a ``Template`` are never evicted; only their artifacts are,
+since those can be rebuilt from the PDF. Nothing used within the last
+``STORAGE_EVICTION_GRACE`` seconds is touched, which keeps the sweeper away
+from uploads and renders still in progress.
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import ProtectedError, Sum
+from django.utils import timezone
+from templates.models import Template
+
+from . import resumable
+from .models import Blob, Upload, UploadSession
+from .storage import blob_path, blob_store
+
+logger = logging.getLogger(__name__)
+
+_touched = {}
+_touched_lock = threading.Lock()
+TOUCH_MEMORY = 10000
+
+
+def touch(sha256):
+    """Record a use of a blob, at most once per ``STORAGE_TOUCH_INTERVAL`` per process."""
+    now = time.monotonic()
+    with _touched_lock:
+        last = _touched.get(sha256)
+        if last is not None and now - last < settings.STORAGE_TOUCH_INTERVAL:
+            return
+        if len(_touched) >= TOUCH_MEMORY:
+            _touched.clear()
+        _touched[sha256] = now
+    Blob.objects.filter(sha256=sha256).update(last_accessed=timezone.now())
+
+
+def referenced_blob_ids():
+    return set(
+        Upload.objects.filter(upload_id__in=Template.objects.values("upload_id")).values_list(
+            "blob_id", flat=True
+        )
+    )
+
+
+def usage():
+    totals = Blob.objects.aggregate(blob_bytes=Sum("size"), artifact_bytes=Sum("artifacts_size"))
+    referenced = Blob.objects.filter(pk__in=referenced_blob_ids()).aggregate(bytes=Sum("size"))
+    blob_bytes = totals["blob_bytes"] or 0
+    artifact_bytes = totals["artifact_bytes"] or 0
+    return {
+        "blobs": Blob.objects.count(),
+        "blob_bytes": blob_bytes,
+        "artifact_bytes": artifact_bytes,
+        "total_bytes": blob_bytes + artifact_bytes,
+        "referenced_bytes": referenced["bytes"] or 0,
+        "quota_bytes": settings.STORAGE_QUOTA_BYTES,
+        "max_age_seconds": settings.STORAGE_MAX_AGE,
+    }
+
+
+def sweep(dry_run=False):
+    """Measure artifacts, evict what the quota and age limits require and remove strays.
+
+    Returns a report of what was (or, with ``dry_run``, would be) removed.
+    """
+    now = timezone.now()
+    report = {"evicted_blobs": 0, "evicted_artifacts": 0, "stray_files": 0, "freed_bytes": 0}
+    measure_artifacts()
+    _evict(now, report, dry_run)
+    _remove_strays(now, report, dry_run)
+    return report
+
+
+def measure_artifacts():
+    """Store the current size of every blob's artifact directory on its row."""
+    sizes = {sha256: _tree_size(path) for sha256, path in _artifact_dirs()}
+    changed = []
+    for blob in Blob.objects.only("pk", "sha256", "artifacts_size").iterator():
+        size = sizes.get(blob.sha256, 0)
+        if blob.artifacts_size != size:
+            blob.artifacts_size = size
+            changed.append(blob)
+    Blob.objects.bulk_update(changed, ["artifacts_size"], batch_size=500)
+
+
+def _evict(now, report, dry_run):
+    referenced = referenced_blob_ids()
+    grace = now - timedelta(seconds=settings.STORAGE_EVICTION_GRACE)
+    expired = now - timedelta(seconds=settings.STORAGE_MAX_AGE)
+    total = usage()["total_bytes"]
+
+    rows = Blob.objects.filter(last_accessed__lt=grace).order_by("last_accessed", "pk")
+    for blob in list(rows):
+        over_quota = total > settings.STORAGE_QUOTA_BYTES
+        if not over_quota and blob.last_accessed >= expired:
+            break
+        if blob.pk in referenced:
+            if over_quota and blob.artifacts_size:
+                freed = blob.artifacts_size if dry_run else _evict_artifacts(blob)
+                report["evicted_artifacts"] += 1
+                report["freed_bytes"] += freed
+                total -= freed
+            continue
+        freed = blob.size + blob.artifacts_size if dry_run else _evict_blob(blob)
+        if freed:
+            report["evicted_blobs"] += 1
+            report["freed_bytes"] += freed
+            total -= freed
+
+
+def _evict_artifacts(blob):
+    shutil.rmtree(os.path.join(settings.PAGE_RENDER_DIR, blob.sha256), ignore_errors=True)
+    Blob.objects.filter(pk=blob.pk).update(artifacts_size=0)
+    return blob.artifacts_size
+
+
+def _evict_blob(blob):
+    """Delete a blob with its uploads and files; return the bytes freed (0 if skipped)."""
+    try:
+        with transaction.atomic():
+            # Re-check under the transaction: a template may have been created since
+            uploads = Upload.objects.filter(blob=blob)
+            if Template.objects.filter(upload_id__in=uploads.values("upload_id")).exists():
+                return 0
+            UploadSession.objects.filter(upload__blob=blob).delete()
+            uploads.delete()
+            blob.delete()
+    except ProtectedError:
+        # An upload arrived for this blob in the meantime
+        return 0
+    if Blob.objects.filter(sha256=blob.sha256).exists():
+        # The same content was uploaded again right after the delete
+        return 0
+    _remove_file(blob_path(blob.sha256))
+    shutil.rmtree(os.path.join(settings.PAGE_RENDER_DIR, blob.sha256), ignore_errors=True)
+    logger.info("Evicted blob %s (%d bytes)", blob.sha256, blob.size + blob.artifacts_size)
+    return blob.size + blob.artifacts_size
+
+
+def _remove_strays(now, report, dry_run):
+    """Remove abandoned upload sessions and files no row accounts for."""
+    expired = now - timedelta(seconds=settings.STORAGE_MAX_AGE)
+    for session in UploadSession.objects.filter(upload__isnull=True, updated_at__lt=expired):
+        report["stray_files"] += 1
+        report["freed_bytes"] += resumable.current_offset(session)
+        if not dry_run:
+            resumable.discard(session)
+
+    cutoff = time.time() - settings.STORAGE_EVICTION_GRACE
+    known = set(Blob.objects.values_list("sha256", flat=True))
+    sessions = set(UploadSession.objects.values_list("session_id", flat=True))
+    for path in _stray_paths(known, sessions):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if stat.st_mtime >= cutoff:
+            continue
+        size = _tree_size(path) if os.path.isdir(path) else stat.st_size
+        report["stray_files"] += 1
+        report["freed_bytes"] += size
+        if not dry_run:
+            _remove_file(path)
+
+
+def _stray_paths(known, sessions):
+    """Files under the storage dirs that belong to no blob or upload session."""
+    root = os.path.normpath(settings.PDF_TMP_DIR)
+    if os.path.isdir(root):
+        for entry in os.scandir(root):
+            if entry.is_dir():
+                # Blob store shards, scanned below
+                continue
+            stem, extension = os.path.splitext(entry.name)
+            # Known digests at the top level are flat-layout blobs, or blobs
+            # still waiting for `migrate_blob_layout`
+            if extension == ".pdf" and stem in known:
+                continue
+            if extension == ".upload" and stem in sessions:
+                continue
+            yield entry.path
+    for sha256, path in blob_store().stored():
+        if sha256 not in known and os.path.dirname(path) != root:
+            yield path
+    for sha256, path in _artifact_dirs():
+        if sha256 not in known:
+            yield path
+
+
+def _artifact_dirs():
+    if not os.path.isdir(settings.PAGE_RENDER_DIR):
+        return
+    for entry in os.scandir(settings.PAGE_RENDER_DIR):
+        if entry.is_dir():
+            yield entry.name, entry.path
+
+
+def _tree_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def _remove_file(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 
 
@@ -5,6 +6,24 @@ class UploadSerializer(serializers.Serializer):
     file = serializers.FileField()
 
     def validate_file(self, value):
-        if not value.name.endswith('.pdf'):
-            raise serializers.ValidationError('Only PDF files are allowed')
+        if not value.name.endswith(".pdf"):
+            raise serializers.ValidationError("Only PDF files are allowed")
+        return value
+
+
+class UploadSessionSerializer(serializers.Serializer):
+    filename = serializers.CharField(max_length=255)
+    length = serializers.IntegerField(min_value=1)
+    sha256 = serializers.RegexField(r"^[0-9a-f]{64}$", required=False, default="")
+
+    def validate_filename(self, value):
+        if not value.endswith(".pdf"):
+            raise serializers.ValidationError("Only PDF files are allowed")
+        return value
+
+    def validate_length(self, value):
+        if value > settings.UPLOAD_SESSION_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Uploads are limited to {settings.UPLOAD_SESSION_MAX_SIZE} bytes"
+            )
         return value
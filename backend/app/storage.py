@@ -0,0 +1,119 @@
+import hashlib
+import os
+import tempfile
+import uuid
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .aio import run_io
+from .models import Blob, Upload
+
+
+def blob_store():
+    return _blob_store(settings.PDF_STORAGE_BACKEND, settings.PDF_TMP_DIR)
+
+
+@lru_cache(maxsize=8)
+def _blob_store(backend, root):
+    return import_string(backend)(root)
+
+
+def blob_path(sha256):
+    return blob_store().path(sha256)
+
+
+def store_upload(file):
+    """Stream ``file`` to disk, hashing it on the way, and alias it as a new upload.
+
+    Blobs are stored once per SHA-256 digest. When the digest is already known
+    the freshly written copy is discarded and the new ``Upload`` simply points
+    at the existing ``Blob``. Returns ``(upload, created)`` where ``created`` is
+    False for a deduplicated blob.
+    """
+    digest, size, tmp_path = _write_hashed(file)
+    return store_file(tmp_path, digest, size, file.name)
+
+
+def store_file(tmp_path, digest, size, filename):
+    """Move an already hashed file under ``PDF_TMP_DIR`` into the blob store.
+
+    ``tmp_path`` is consumed either way. Returns ``(upload, created)`` like
+    ``store_upload``.
+    """
+    try:
+        blob, created = _get_or_create_blob(digest, size)
+        if created or not os.path.exists(blob_path(digest)):
+            blob_store().put(tmp_path, digest)
+    finally:
+        _remove_if_exists(tmp_path)
+    if not created:
+        Blob.objects.filter(pk=blob.pk).update(last_accessed=timezone.now())
+
+    upload = Upload.objects.create(
+        upload_id=str(uuid.uuid4()),
+        blob=blob,
+        filename=os.path.basename(filename or ""),
+    )
+    return upload, created
+
+
+async def astore_upload(file):
+    """Async ``store_upload``: file work runs on the I/O pool, queries on the async ORM."""
+    digest, size, tmp_path = await run_io(_write_hashed, file)
+    try:
+        blob, created = await _aget_or_create_blob(digest, size)
+        if created or not await run_io(os.path.exists, blob_path(digest)):
+            await run_io(blob_store().put, tmp_path, digest)
+    finally:
+        await run_io(_remove_if_exists, tmp_path)
+    if not created:
+        await Blob.objects.filter(pk=blob.pk).aupdate(last_accessed=timezone.now())
+
+    upload = await Upload.objects.acreate(
+        upload_id=str(uuid.uuid4()),
+        blob=blob,
+        filename=os.path.basename(file.name or ""),
+    )
+    return upload, created
+
+
+def hash_file(path):
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _write_hashed(file):
+    hasher = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=settings.PDF_TMP_DIR, suffix=".part")
+    with os.fdopen(fd, "wb") as destination:
+        for chunk in file.chunks():
+            hasher.update(chunk)
+            destination.write(chunk)
+            size += len(chunk)
+    return hasher.hexdigest(), size, tmp_path
+
+
+def _get_or_create_blob(digest, size):
+    try:
+        with transaction.atomic():
+            return Blob.objects.get_or_create(sha256=digest, defaults={"size": size})
+    except IntegrityError:
+        # Another request stored the same digest between our lookup and insert
+        return Blob.objects.get(sha256=digest), False
+
+
+async def _aget_or_create_blob(digest, size):
+    try:
+        return await Blob.objects.aget_or_create(sha256=digest, defaults={"size": size})
+    except IntegrityError:
+        return await Blob.objects.aget(sha256=digest), False
+
+
+def _remove_if_exists(path):
+    if os.path.exists(path):
+        os.remove(path)
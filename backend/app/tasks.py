@@ -0,0 +1,9 @@
+from jobs.queue import task
+
+from . import pages
+
+
+@task("render_pages")
+def render_pages(sha256, dpi, image_format):
+    paths = pages.render_all(sha256, dpi, image_format)
+    return {"pages": len(paths)}
@@ -0,0 +1,25 @@
+"""Factories shared by the tests that upload and render PDFs."""
+
+import io
+
+import pypdfium2 as pdfium
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+
+def make_pdf(page_count=2):
+    """Return the bytes of a PDF with ``page_count`` blank letter-size pages."""
+    pdf = pdfium.PdfDocument.new()
+    for _ in range(page_count):
+        pdf.new_page(612, 792)
+    buffer = io.BytesIO()
+    pdf.save(buffer)
+    return buffer.getvalue()
+
+
+def upload(api_client, content):
+    """Post ``content`` to the PDF upload endpoint and return the response data."""
+    pdf_file = SimpleUploadedFile("form.pdf", content, content_type="application/pdf")
+    response = api_client.post(reverse("pdf_upload"), {"file": pdf_file}, format="multipart")
+    assert response.status_code == 200
+    return response.json()
@@ -0,0 +1,104 @@
+import logging
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+from rest_framework import status
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+PDF_MAGIC = b"%PDF-"
+# Room for multipart boundaries, part headers and small form fields next to the
+# file: the early check sees only the length of the whole request body
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def record_rejection(reason, bytes_saved):
+    metrics.inc("upload_rejections_total", reason=reason)
+    metrics.inc("upload_rejected_bytes_total", bytes_saved, reason=reason)
+    logger.info("Rejected upload (%s), skipped %d bytes", reason, bytes_saved)
+
+
+def rejection_metrics():
+    """Rejected uploads and the request bytes left unread in this process, per reason."""
+    stats = {}
+    for (name, labels), value in metrics.registry.samples().items():
+        if name == "upload_rejections_total":
+            stats.setdefault(dict(labels)["reason"], {"bytes_saved": 0})["count"] = value
+        elif name == "upload_rejected_bytes_total":
+            stats.setdefault(dict(labels)["reason"], {"count": 0})["bytes_saved"] = value
+    return stats
+
+
+class UploadRejected:
+    def __init__(self, reason, message, status_code):
+        """Describe why an upload was aborted and how to answer the client."""
+        self.reason = reason
+        self.message = message
+        self.status_code = status_code
+
+
+class PDFUploadHandler(FileUploadHandler):
+    """Abort multipart uploads that are not PDFs or are too large, while they stream.
+
+    Must run before Django's memory and temporary file handlers. The magic
+    bytes are checked on the first chunk and the size limit on every chunk, so
+    a bad upload is refused long before it has been fully received. The
+    rejection is kept on ``self.rejection`` for the view to report.
+    """
+
+    def __init__(self, request=None, max_size=None):
+        """Limit each uploaded file to ``max_size`` bytes (``PDF_UPLOAD_MAX_SIZE``)."""
+        super().__init__(request)
+        self.max_size = settings.PDF_UPLOAD_MAX_SIZE if max_size is None else max_size
+        self.rejection = None
+        self.request_length = 0
+        self.head = b""
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.request_length = content_length or 0
+        if self.request_length > self.max_size + MULTIPART_OVERHEAD:
+            # Declared too large: answer without reading a single body byte. Files
+            # just under the limit get the exact check in receive_data_chunk
+            self._reject("too_large", self.request_length)
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.head = b""
+
+    def receive_data_chunk(self, raw_data, start):
+        received = start + len(raw_data)
+        if len(self.head) < len(PDF_MAGIC):
+            self.head += raw_data[: len(PDF_MAGIC) - len(self.head)]
+            if len(self.head) == len(PDF_MAGIC) and self.head != PDF_MAGIC:
+                self._abort("not_pdf", received)
+        if received > self.max_size:
+            self._abort("too_large", received)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.head != PDF_MAGIC:
+            self._abort("not_pdf", file_size)
+        return None
+
+    def _abort(self, reason, received):
+        self._reject(reason, max(self.request_length - received, 0))
+        raise StopUpload(connection_reset=True)
+
+    def _reject(self, reason, bytes_saved):
+        if reason == "too_large":
+            self.rejection = UploadRejected(
+                reason,
+                f"File exceeds the maximum upload size of {self.max_size} bytes",
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        else:
+            self.rejection = UploadRejected(
+                reason, "Only PDF files are allowed", status.HTTP_400_BAD_REQUEST
+            )
+        record_rejection(reason, bytes_saved)
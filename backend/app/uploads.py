@@ -0,0 +1,47 @@
+"""Parsing PDF uploads and building their responses.
+
+Shared by the DRF views in ``app.views`` and the async views in
+``app.async_views``, which differ only in their request and response types.
+"""
+
+from django.conf import settings
+
+from . import pages
+from .serializers import UploadSerializer
+from .upload_handlers import PDFUploadHandler
+
+
+def parse_pdf_upload(request, response_class):
+    """Parse a multipart PDF upload, aborting bad files while they stream in.
+
+    ``request`` may be a Django or a DRF request. Returns ``(serializer, None)``,
+    or ``(None, response)`` built with ``response_class`` when the upload
+    handler refused the file.
+    """
+    handler = PDFUploadHandler(request)
+    request.upload_handlers.insert(0, handler)
+    serializer = UploadSerializer(data=request.FILES)
+    if handler.rejection is not None:
+        return None, response_class(
+            {"file": [handler.rejection.message]}, status=handler.rejection.status_code
+        )
+    return serializer, None
+
+
+def prerender_payload(upload):
+    """Return the ``render_pages`` job payload that pre-renders the smallest page images."""
+    return {
+        "sha256": upload.blob.sha256,
+        "dpi": settings.PAGE_RENDER_DPIS[0],
+        "image_format": settings.PAGE_RENDER_FORMATS[0],
+    }
+
+
+def stored_upload_data(upload, created, job, page_list=None):
+    return {
+        "upload_id": upload.upload_id,
+        "sha256": upload.blob.sha256,
+        "deduplicated": not created,
+        "job_id": job.pk if job else None,
+        "pages": pages.page_descriptors(upload) if page_list is None else page_list,
+    }
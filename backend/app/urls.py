@@ -1,7 +1,26 @@
 from django.urls import path
+
 from . import views
 
 urlpatterns = [
-    path('health/', views.health_check, name='health_check'),
-    path('upload/', views.upload_file, name='upload_file'),
+    path("health/", views.health_check, name="health_check"),
+    path("health/live/", views.liveness, name="liveness"),
+    path("health/ready/", views.readiness, name="readiness"),
+    path("metrics/", views.metrics_endpoint, name="metrics"),
+    path("storage/usage/", views.storage_usage, name="storage_usage"),
+    path("upload/", views.upload_file, name="upload_file"),
+    path("uploads/", views.PDFUploadView.as_view(), name="pdf_upload"),
+    path("uploads/<str:upload_id>/file/", views.upload_download, name="upload_download"),
+    path("uploads/<str:upload_id>/pages/<int:page>/", views.page_image, name="page_image"),
+    path("upload-sessions/", views.UploadSessionCreateView.as_view(), name="upload_session_create"),
+    path(
+        "upload-sessions/<str:session_id>/",
+        views.UploadSessionView.as_view(),
+        name="upload_session",
+    ),
+    path(
+        "upload-sessions/<str:session_id>/finalize/",
+        views.UploadSessionFinalizeView.as_view(),
+        name="upload_session_finalize",
+    ),
 ]
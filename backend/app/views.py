@@ -1,14 +1,21 @@
-import os
-import uuid
+import io
 
 from django.conf import settings
+from django.http import FileResponse, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+from jobs.queue import enqueue
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .serializers import UploadSerializer
+from . import downloads, health, metrics, pages, resumable, retention, uploads
+from .models import Upload, UploadSession
+from .serializers import UploadSessionSerializer
+from .storage import store_upload
 
 
 @api_view(["GET"])
@@ -16,9 +23,36 @@ def health_check(request):
     return Response({"status": "healthy"})
 
 
+@api_view(["GET"])
+def liveness(request):
+    return Response({"status": "alive"})
+
+
+@api_view(["GET"])
+def readiness(request):
+    checks = health.readiness()
+    if all(check["ok"] for check in checks.values()):
+        return Response({"status": "ready", "checks": checks})
+    return Response(
+        {"status": "unavailable", "checks": checks}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+
+@require_GET
+def metrics_endpoint(request):
+    return HttpResponse(metrics.render(metrics.collect()), content_type=metrics.CONTENT_TYPE)
+
+
+@api_view(["GET"])
+def storage_usage(request):
+    return Response(retention.usage())
+
+
 @api_view(["POST"])
 def upload_file(request):
-    serializer = UploadSerializer(data=request.data)
+    serializer, rejection = uploads.parse_pdf_upload(request, Response)
+    if rejection is not None:
+        return rejection
     if serializer.is_valid():
         # Process the file here
         return Response({"message": "File uploaded successfully"}, status=status.HTTP_201_CREATED)
@@ -29,18 +63,128 @@ class PDFUploadView(APIView):
     parser_classes = (MultiPartParser,)
 
     def post(self, request):
-        serializer = UploadSerializer(data=request.data)
+        serializer, rejection = uploads.parse_pdf_upload(request, Response)
+        if rejection is not None:
+            return rejection
         if not serializer.is_valid():
             return Response(serializer.errors, status=400)
 
-        file = serializer.validated_data["file"]
-        upload_id = str(uuid.uuid4())
-        filename = f"{upload_id}.pdf"
-        filepath = os.path.join(settings.PDF_TMP_DIR, filename)
+        # Save the file once per content digest; repeated uploads become aliases
+        upload, created = store_upload(serializer.validated_data["file"])
+        return _stored_upload_response(upload, created)
+
+
+class UploadSessionCreateView(APIView):
+    def post(self, request):
+        serializer = UploadSessionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        session = resumable.create_session(**serializer.validated_data)
+        response = _session_response(session, status_code=status.HTTP_201_CREATED)
+        response["Location"] = reverse("upload_session", args=[session.session_id])
+        return response
+
+
+class UploadSessionView(APIView):
+    def get(self, request, session_id):
+        session = get_object_or_404(UploadSession, session_id=session_id)
+        return _session_response(session)
+
+    def patch(self, request, session_id):
+        session = get_object_or_404(UploadSession, session_id=session_id)
+        if session.upload_id is not None:
+            return Response({"error": "Upload already finalized"}, status=status.HTTP_409_CONFLICT)
+        try:
+            offset = int(request.headers["Upload-Offset"])
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "Upload-Offset header is required"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Read the raw body straight from the socket; request.data would buffer it
+        try:
+            resumable.append_chunk(session, offset, request.stream or io.BytesIO())
+        except resumable.OffsetMismatch:
+            return _session_response(session, status_code=status.HTTP_409_CONFLICT)
+        return _session_response(session)
+
+    def delete(self, request, session_id):
+        session = get_object_or_404(UploadSession, session_id=session_id)
+        resumable.discard(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadSessionFinalizeView(APIView):
+    def post(self, request, session_id):
+        session = get_object_or_404(
+            UploadSession.objects.select_related("upload__blob"), session_id=session_id
+        )
+        try:
+            upload, created = resumable.finalize(session)
+        except resumable.IncompleteUpload:
+            return _session_response(session, status_code=status.HTTP_409_CONFLICT)
+        except resumable.ChecksumMismatch:
+            return Response(
+                {"error": "Uploaded data does not match the declared sha256"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return _stored_upload_response(upload, created)
+
+
+def _stored_upload_response(upload, created):
+    # Pre-render the smallest page images out of band
+    job = enqueue("render_pages", uploads.prerender_payload(upload)) if created else None
+    return Response(uploads.stored_upload_data(upload, created, job))
+
+
+def _session_response(session, status_code=status.HTTP_200_OK):
+    offset = resumable.current_offset(session)
+    data = {
+        "session_id": session.session_id,
+        "offset": offset,
+        "length": session.length,
+        "upload_id": session.upload.upload_id if session.upload_id else None,
+    }
+    headers = {
+        "Upload-Offset": str(offset),
+        "Upload-Length": str(session.length),
+        "Cache-Control": "no-store",
+    }
+    return Response(data, status=status_code, headers=headers)
+
+
+@require_GET
+def upload_download(request, upload_id):
+    upload = get_object_or_404(Upload.objects.select_related("blob"), upload_id=upload_id)
+    try:
+        response = downloads.blob_response(request, upload.blob.sha256, upload.filename)
+    except FileNotFoundError:
+        return JsonResponse({"error": "File not found"}, status=404)
+    retention.touch(upload.blob.sha256)
+    return response
+
 
-        # Save the file
-        with open(filepath, "wb+") as destination:
-            for chunk in file.chunks():
-                destination.write(chunk)
+# A plain Django view: DRF content negotiation would refuse image Accept headers
+@require_GET
+def page_image(request, upload_id, page):
+    upload = get_object_or_404(Upload.objects.select_related("blob"), upload_id=upload_id)
+    sha256 = upload.blob.sha256
+    try:
+        dpi = int(request.GET.get("dpi", settings.PAGE_RENDER_DPIS[0]))
+    except ValueError:
+        dpi = None
+    image_format = request.GET.get("format", settings.PAGE_RENDER_FORMATS[0])
+    if dpi not in settings.PAGE_RENDER_DPIS or image_format not in settings.PAGE_RENDER_FORMATS:
+        return JsonResponse({"error": "Unsupported resolution or format"}, status=400)
+    if not 1 <= page <= pages.page_count(sha256):
+        return JsonResponse({"error": "Page not found"}, status=404)
 
-        return Response({"upload_id": upload_id, "pages": []})
+    retention.touch(sha256)
+    # Renders are content addressed, so clients may cache them forever
+    response = FileResponse(
+        open(pages.render(sha256, page, dpi, image_format), "rb"),
+        content_type=f"image/{image_format}",
+    )
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
@@ -0,0 +1,19 @@
+import os
+
+from django.core.asgi import get_asgi_application
+
+# Serve the upload and template endpoints with their async views
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.asgi_settings")
+
+django_application = get_asgi_application()
+
+# Imported once the app registry is ready
+from voice.streaming import dictation_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """Send WebSocket connections to the dictation stream and the rest to Django."""
+    if scope["type"] == "websocket":
+        await dictation_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,9 @@
+"""Settings for ASGI deployments (``backend.asgi``).
+
+The same as ``backend.settings``, except that the upload and template
+endpoints are served by their async views.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+ROOT_URLCONF = "backend.asgi_urls"
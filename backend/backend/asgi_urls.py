@@ -0,0 +1,17 @@
+"""URLconf for ASGI deployments.
+
+The upload and template endpoints are served by their async views; every
+other route falls through to ``backend.urls``.
+"""
+
+from app import async_views as app_views
+from django.urls import include, path
+from templates import async_views as template_views
+
+urlpatterns = [
+    path("api/upload/", app_views.upload_file),
+    path("api/uploads/", app_views.pdf_upload),
+    path("api/templates/", template_views.template_collection),
+    path("api/templates/<int:pk>/", template_views.template_detail),
+    path("", include("backend.urls")),
+]
@@ -0,0 +1,99 @@
+"""``DATABASES["default"]`` built from the environment.
+
+``DATABASE_ENGINE`` picks the backend: ``sqlite3`` (the default),
+``postgresql`` or ``mysql``.
+
+SQLite is tuned for several workers writing one file. Every connection
+switches to WAL, so readers never wait for the writer, and commits with
+``synchronous=NORMAL``, which in WAL mode only fsyncs at checkpoints. Writes
+are serialized by opening every transaction with ``BEGIN IMMEDIATE``: the
+write lock is taken up front, where ``busy_timeout`` makes a second writer
+wait for it, instead of on the first write, where SQLite fails a transaction
+that would otherwise deadlock with ``database is locked`` straight away.
+
+Server databases keep connections open for ``DATABASE_CONN_MAX_AGE`` seconds
+and check them before reuse, so each worker thread holds one healthy
+connection instead of connecting per request.
+"""
+
+import os
+
+ENGINES = {
+    "sqlite3": "django.db.backends.sqlite3",
+    "postgresql": "django.db.backends.postgresql",
+    "mysql": "django.db.backends.mysql",
+}
+
+SQLITE_BUSY_TIMEOUT = 20  # seconds
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+CONN_MAX_AGE = 600
+
+
+def sqlite_pragmas(busy_timeout=SQLITE_BUSY_TIMEOUT, mmap_size=SQLITE_MMAP_SIZE):
+    return [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={int(busy_timeout * 1000)}",
+        f"PRAGMA mmap_size={int(mmap_size)}",
+    ]
+
+
+def sqlite_database(name, busy_timeout=SQLITE_BUSY_TIMEOUT, mmap_size=SQLITE_MMAP_SIZE):
+    name = str(name)
+    return {
+        "ENGINE": ENGINES["sqlite3"],
+        "NAME": name,
+        "OPTIONS": {
+            "init_command": "; ".join(sqlite_pragmas(busy_timeout, mmap_size)),
+            "transaction_mode": "IMMEDIATE",
+        },
+        # An in-memory test database is shared between threads through SQLite's
+        # shared cache, whose table locks fail at once instead of waiting out
+        # busy_timeout. A file next to the real one behaves like production.
+        "TEST": {"NAME": _test_name(name)},
+    }
+
+
+def server_database(engine, environ):
+    return {
+        "ENGINE": ENGINES[engine],
+        "NAME": environ.get("DATABASE_NAME", "voice2pdf"),
+        "USER": environ.get("DATABASE_USER", ""),
+        "PASSWORD": environ.get("DATABASE_PASSWORD", ""),
+        "HOST": environ.get("DATABASE_HOST", ""),
+        "PORT": environ.get("DATABASE_PORT", ""),
+        "CONN_MAX_AGE": int(environ.get("DATABASE_CONN_MAX_AGE", CONN_MAX_AGE)),
+        "CONN_HEALTH_CHECKS": True,
+    }
+
+
+def database_config(base_dir, environ=os.environ):
+    """Return the default database settings described by ``environ``."""
+    engine = environ.get("DATABASE_ENGINE", "sqlite3")
+    if engine not in ENGINES:
+        raise ValueError(
+            f"DATABASE_ENGINE must be one of {', '.join(sorted(ENGINES))}, not {engine!r}"
+        )
+    if engine != "sqlite3":
+        return server_database(engine, environ)
+    return sqlite_database(
+        environ.get("DATABASE_NAME") or base_dir / "db.sqlite3",
+        busy_timeout=float(environ.get("SQLITE_BUSY_TIMEOUT", SQLITE_BUSY_TIMEOUT)),
+        mmap_size=int(environ.get("SQLITE_MMAP_SIZE", SQLITE_MMAP_SIZE)),
+    )
+
+
+def remove_sqlite_files(name):
+    """Delete a SQLite database along with its WAL and shared-memory files."""
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        try:
+            os.remove(f"{name}{suffix}")
+        except FileNotFoundError:
+            pass
+
+
+def _test_name(name):
+    if name == ":memory:" or name.startswith("file:"):
+        return None
+    root, extension = os.path.splitext(name)
+    return f"{root}_test{extension or '.sqlite3'}"
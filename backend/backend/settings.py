@@ -1,6 +1,8 @@
 import os
 from pathlib import Path
 
+from .database import database_config
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = "django-insecure-your-secret-key-here"
@@ -20,9 +22,13 @@ INSTALLED_APPS = [
     "corsheaders",
     "app",
     "templates.apps.TemplatesConfig",
+    "jobs.apps.JobsConfig",
+    "voice.apps.VoiceConfig",
+    "search.apps.SearchConfig",
 ]
 
 MIDDLEWARE = [
+    "app.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -32,6 +38,7 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# ASGI deployments use backend.asgi_urls instead (see backend.asgi_settings)
 ROOT_URLCONF = "backend.urls"
 
 TEMPLATES = [
@@ -52,12 +59,12 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "backend.wsgi.application"
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
-}
+# Configured from the environment, see backend/database.py: DATABASE_ENGINE
+# (sqlite3, postgresql or mysql), DATABASE_NAME, DATABASE_USER,
+# DATABASE_PASSWORD, DATABASE_HOST, DATABASE_PORT and DATABASE_CONN_MAX_AGE.
+# SQLite runs in WAL mode with SQLITE_BUSY_TIMEOUT (seconds) and
+# SQLITE_MMAP_SIZE (bytes).
+DATABASES = {"default": database_config(BASE_DIR)}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -90,6 +97,114 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 PDF_TMP_DIR = os.path.join(MEDIA_ROOT, "pdf_tmp")
 os.makedirs(PDF_TMP_DIR, exist_ok=True)
 
+# Layout of stored PDFs under PDF_TMP_DIR, by dotted path to an
+# app.blobstore.BlobStore subclass. After switching layouts, run
+# `python manage.py migrate_blob_layout` to move the existing files.
+PDF_STORAGE_BACKEND = "app.blobstore.ShardedBlobStore"
+
+# How /api/uploads/<id>/file/ hands the PDF to the client. None streams it
+# from Django (sendfile under gunicorn); "x-accel-redirect" (nginx) and
+# "x-sendfile" (Apache, lighttpd) let the front server send it instead, Range
+# requests included. For nginx, PDF_DOWNLOAD_ACCEL_PREFIX must be an internal
+# location aliased to PDF_TMP_DIR.
+PDF_DOWNLOAD_OFFLOAD = os.environ.get("PDF_DOWNLOAD_OFFLOAD") or None
+PDF_DOWNLOAD_ACCEL_PREFIX = "/protected/pdf/"
+
+# Largest PDF accepted by the multipart upload endpoints; larger or non-PDF
+# uploads are aborted while the body is still streaming in.
+PDF_UPLOAD_MAX_SIZE = 100 * 1024 * 1024
+
+# Largest file accepted through resumable upload sessions
+UPLOAD_SESSION_MAX_SIZE = 1024 * 1024 * 1024
+
+# Rendered page images, cached per blob digest, page and resolution. Pages are
+# rendered in a process pool of PAGE_RENDER_WORKERS processes (None: one per
+# core, 0: render inline in the request).
+PAGE_RENDER_DIR = os.path.join(MEDIA_ROOT, "page_cache")
+PAGE_RENDER_DPIS = (72, 150, 300)
+PAGE_RENDER_FORMATS = ("webp", "png")
+PAGE_RENDER_WORKERS = None
+
+# Storage limits enforced by `python manage.py sweep_storage` (see
+# app.retention): total bytes of uploaded PDFs plus their page renders, and how
+# long an unused blob is kept. Blobs behind a template are never evicted, and
+# nothing used within STORAGE_EVICTION_GRACE seconds is touched. Uses are
+# recorded at most once per STORAGE_TOUCH_INTERVAL seconds per process.
+STORAGE_QUOTA_BYTES = 10 * 1024 * 1024 * 1024
+STORAGE_MAX_AGE = 7 * 24 * 60 * 60
+STORAGE_EVICTION_GRACE = 10 * 60
+STORAGE_TOUCH_INTERVAL = 5 * 60
+STORAGE_SWEEP_INTERVAL = 60 * 60
+
+# Request metrics served at /api/metrics/ (see app.metrics). Each process
+# keeps its own counters and, when METRICS_DIR is set, writes them there at
+# most every METRICS_FLUSH_INTERVAL seconds so that every worker reports the
+# totals of all of them. Point it at a directory shared by the workers of one
+# host, e.g. a tmpfs, and empty it when the server restarts.
+METRICS_DIR = os.environ.get("METRICS_DIR") or None
+METRICS_FLUSH_INTERVAL = 5
+
+# /api/health/ready/ reports unavailable when the database does not answer or
+# the PDF and page cache directories have less than this much space left.
+HEALTH_MIN_FREE_BYTES = 1024 * 1024 * 1024
+
+# Field detection splits documents into runs of this many pages, processed in
+# parallel on the page render pool.
+FIELD_EXTRACTION_PAGES_PER_TASK = 8
+
+# Filled PDF rendering keeps parsed source documents and per-page overlay
+# streams in memory so repeated renders only redraw what changed.
+RENDER_DOCUMENT_CACHE_SIZE = 32
+RENDER_OVERLAY_CACHE_SIZE = 4096
+
+# Template detail response cache: entries kept in-process, and optionally in a
+# Django cache alias (e.g. "default") shared by all workers.
+TEMPLATE_CACHE_SIZE = 256
+TEMPLATE_CACHE_ALIAS = None
+
+# Spatial indexes over field boxes (hit-test, nearest-field and overlap
+# endpoints), kept per template version. The grid cell size is in points.
+SPATIAL_INDEX_CACHE_SIZE = 128
+SPATIAL_INDEX_CELL_SIZE = 48.0
+
+# Voice input: the speech-to-text engine (dotted path to a
+# voice.transcription.Transcriber subclass), the largest recording accepted,
+# and how many compiled per-template label indexes are kept in memory.
+TRANSCRIPTION_ENGINE = "voice.transcription.StubTranscriber"
+VOICE_AUDIO_MAX_SIZE = 25 * 1024 * 1024
+MATCH_INDEX_CACHE_SIZE = 128
+
+# Compiled Field.validation rules (see templates.validation), kept per template
+# version and applied to field value edits, dictation and batch fills.
+VALIDATOR_CACHE_SIZE = 128
+
+# Threads for blocking file work in the async views (ASGI only). This bounds
+# how many uploads are written to disk at the same time.
+ASYNC_IO_THREADS = 16
+
+# Streaming dictation over WebSocket (served by backend.asgi). Each connection
+# gets its own RECOGNIZER_ENGINE instance, may send frames of at most
+# VOICE_STREAM_MAX_FRAME_SIZE bytes and VOICE_AUDIO_MAX_SIZE bytes in total,
+# and buffers at most VOICE_STREAM_MAX_PENDING_FRAMES unprocessed frames.
+RECOGNIZER_ENGINE = "voice.transcription.StubRecognizer"
+VOICE_STREAM_MAX_FRAME_SIZE = 64 * 1024
+VOICE_STREAM_MAX_PENDING_FRAMES = 16
+
+# Background jobs, run by `python manage.py run_jobs`. Failed jobs are retried
+# after JOBS_RETRY_BACKOFF seconds, doubling on every further attempt.
+JOBS_CONCURRENCY = 2
+JOBS_USE_PROCESSES = False
+JOBS_POLL_INTERVAL = 1.0
+JOBS_MAX_ATTEMPTS = 3
+JOBS_RETRY_BACKOFF = 5.0
+JOBS_RUNNING_TIMEOUT = 600
+
+# Full-text search at /api/search/ (SQLite FTS5, see search.indexing). New
+# uploads and template changes are indexed by background jobs;
+# `python manage.py update_search_index --loop` also catches up on anything
+# missed every SEARCH_INDEX_INTERVAL seconds.
+SEARCH_INDEX_INTERVAL = 5 * 60
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
 ]
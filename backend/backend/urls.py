@@ -1,5 +1,3 @@
-from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
@@ -7,4 +5,7 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("app.urls")),
     path("api/", include("templates.urls")),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path("api/", include("jobs.urls")),
+    path("api/", include("voice.urls")),
+    path("api/", include("search.urls")),
+]
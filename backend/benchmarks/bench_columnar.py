@@ -0,0 +1,28 @@
+import json
+
+import pytest
+from benchmarks.bench_template_persistence import make_fields
+from benchmarks.bench_templates import save
+from templates import columnar, payloads
+
+pytestmark = pytest.mark.django_db
+
+SIZES = (100, 1500)
+FORMATS = (payloads.JSON, payloads.COLUMNS)
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+@pytest.mark.parametrize("size", SIZES)
+def test_encode(bench, fmt, size):
+    template = save(make_fields(size))
+    _, body = payloads.detail(template.pk, fmt)
+    bench(lambda: payloads.detail(template.pk, fmt), bytes=len(body))
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+@pytest.mark.parametrize("size", SIZES)
+def test_decode(bench, fmt, size):
+    template = save(make_fields(size))
+    _, body = payloads.detail(template.pk, fmt)
+    decode = json.loads if fmt == payloads.JSON else columnar.decode
+    bench(lambda: decode(body), bytes=len(body))
@@ -0,0 +1,57 @@
+"""Compare the ``TemplateSerializer`` read path with ``templates.payloads``."""
+
+import pytest
+from rest_framework.renderers import JSONRenderer
+from templates import payloads
+from templates.models import Template
+from templates.persistence import bulk_create_fields
+from templates.serializers import TemplateSerializer
+
+pytestmark = pytest.mark.django_db
+
+SIZES = (10, 100, 1000)
+
+
+def create_template(size):
+    template = Template.objects.create(upload_id=f"bench-{size}")
+    bulk_create_fields(
+        template,
+        [
+            {
+                "field_id": f"p1_{i}",
+                "type": "text",
+                "label": f"Field {i}",
+                "page_number": 1 + i // 50,
+                "x": 36.0 + (i % 5) * 110,
+                "y": 72.0 + (i % 50) * 14,
+                "width": 100.0,
+                "height": 12.0,
+                "validation": {"max_length": 40},
+                "value": f"value {i}",
+            }
+            for i in range(size)
+        ],
+    )
+    return template.pk
+
+
+def serializer_body(pk):
+    template = Template.objects.prefetch_related("fields").get(pk=pk)
+    return JSONRenderer().render(TemplateSerializer(template).data)
+
+
+def payload_body(pk):
+    return payloads.detail(pk)[1]
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_serializer_body(bench, size):
+    pk = create_template(size)
+    bench(lambda: serializer_body(pk))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_payload_body(bench, size):
+    pk = create_template(size)
+    assert payload_body(pk) == serializer_body(pk)
+    bench(lambda: payload_body(pk))
@@ -0,0 +1,92 @@
+"""Compare per-row and bulk field persistence for TemplateSerializer."""
+
+import itertools
+
+import pytest
+from templates.models import Field, Template
+from templates.serializers import TemplateSerializer
+
+pytestmark = pytest.mark.django_db
+
+SIZES = (10, 100, 1000)
+
+
+def make_fields(count, value=""):
+    return [
+        {
+            "field_id": f"field{i}",
+            "type": "text",
+            "label": f"Label {i}",
+            "placeholder": "",
+            "page_number": 1 + i // 50,
+            "x": float(i % 10) * 50,
+            "y": float(i % 50) * 15,
+            "width": 40.0,
+            "height": 12.0,
+            "validation": {},
+            "value": value,
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_create(upload_id, fields_data):
+    template = Template.objects.create(upload_id=upload_id)
+    for field_data in fields_data:
+        Field.objects.create(template=template, **field_data)
+    return template
+
+
+def legacy_update(template, fields_data):
+    template.fields.all().delete()
+    for field_data in fields_data:
+        Field.objects.create(template=template, **field_data)
+    template.save()
+
+
+def bulk_create(upload_id, fields_data):
+    serializer = TemplateSerializer(data={"upload_id": upload_id, "fields": fields_data})
+    serializer.is_valid(raise_exception=True)
+    return serializer.save()
+
+
+def bulk_update(template, fields_data):
+    data = {"upload_id": template.upload_id, "fields": fields_data}
+    serializer = TemplateSerializer(template, data=data)
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+
+
+PATHS = {
+    "legacy": (legacy_create, legacy_update),
+    "bulk": (bulk_create, bulk_update),
+}
+
+
+@pytest.mark.parametrize("path", PATHS)
+@pytest.mark.parametrize("size", SIZES)
+def test_create(bench, path, size):
+    create, _ = PATHS[path]
+    fields = make_fields(size)
+    counter = itertools.count()
+    bench(
+        lambda upload_id: create(upload_id, fields),
+        setup=lambda: (f"{path}-{next(counter)}",),
+    )
+
+
+@pytest.mark.parametrize("path", PATHS)
+@pytest.mark.parametrize("size", SIZES)
+def test_update(bench, path, size):
+    create, update = PATHS[path]
+    template = create(path, make_fields(size))
+    counter = itertools.count()
+
+    def edited():
+        # Touch one field in ten so the update path has real work to do
+        fields = make_fields(size)
+        for field in fields[::10]:
+            field["value"] = f"edit {next(counter)}"
+        return (fields,)
+
+    bench(lambda fields: update(template, fields), setup=edited)
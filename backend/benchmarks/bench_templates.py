@@ -0,0 +1,67 @@
+import itertools
+
+import pytest
+from benchmarks.bench_template_persistence import make_fields
+from templates.cache import template_cache
+from templates.serializers import TemplateSerializer
+
+pytestmark = pytest.mark.django_db
+
+SIZES = (10, 100, 1000)
+
+
+def save(fields, instance=None, upload_id="bench"):
+    data = {"upload_id": instance.upload_id if instance else upload_id, "fields": fields}
+    serializer = TemplateSerializer(instance, data=data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.save()
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_serializer_create(bench, size):
+    fields = make_fields(size)
+    counter = itertools.count()
+    bench(
+        lambda upload_id: save(fields, upload_id=upload_id),
+        setup=lambda: (f"bench-{next(counter)}",),
+    )
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_serializer_update(bench, size):
+    template = save(make_fields(size))
+    counter = itertools.count()
+
+    def edited():
+        # One field in ten changes every round
+        fields = make_fields(size)
+        for field in fields[::10]:
+            field["value"] = f"edit {next(counter)}"
+        return (fields,)
+
+    bench(lambda fields: save(fields, instance=template), setup=edited)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_detail_read(bench, api_client, size):
+    template = save(make_fields(size))
+    url = f"/api/templates/{template.pk}/"
+
+    def cold():
+        template_cache.clear()
+        return ()
+
+    bench(lambda: api_client.get(url), setup=cold)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_detail_read_cached(bench, api_client, size):
+    template = save(make_fields(size))
+    url = f"/api/templates/{template.pk}/"
+    bench(lambda: api_client.get(url), rounds=30)
+
+
+def test_list_page(bench, api_client):
+    for i in range(200):
+        save(make_fields(10), upload_id=f"bench-list-{i}")
+    bench(lambda: api_client.get("/api/templates/", {"limit": 50}), rounds=30)
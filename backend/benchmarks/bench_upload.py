@@ -0,0 +1,46 @@
+import io
+import itertools
+import os
+
+import pypdfium2 as pdfium
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+pytestmark = pytest.mark.django_db
+
+SIZES = {"64k": 64 * 1024, "1m": 1024 * 1024, "8m": 8 * 1024 * 1024}
+
+
+def make_pdf():
+    pdf = pdfium.PdfDocument.new()
+    pdf.new_page(612, 792)
+    buffer = io.BytesIO()
+    pdf.save(buffer)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def storage(settings, tmp_path):
+    settings.PDF_TMP_DIR = str(tmp_path / "pdf")
+    settings.PAGE_RENDER_DIR = str(tmp_path / "pages")
+    os.makedirs(settings.PDF_TMP_DIR)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_stored_upload(bench, api_client, storage, size):
+    pdf = make_pdf()
+    counter = itertools.count()
+
+    def next_file():
+        # Unique content every round, so no upload is answered from the dedup store
+        padding = b"\n%" + str(next(counter)).encode().ljust(SIZES[size] - len(pdf) - 2, b"0")
+        return (SimpleUploadedFile("bench.pdf", pdf + padding, content_type="application/pdf"),)
+
+    def upload(pdf_file):
+        response = api_client.post(reverse("pdf_upload"), {"file": pdf_file}, format="multipart")
+        assert response.status_code == 200
+
+    # Disk writes make upload timings noisier than the in-memory benchmarks
+    result = bench(upload, setup=next_file, threshold=0.5, bytes=SIZES[size])
+    result["mb_per_s"] = round(SIZES[size] / 1024 / 1024 / (result["median_ms"] / 1000), 1)
@@ -0,0 +1,50 @@
+import pytest
+from templates.validation import TemplateValidator
+
+pytestmark = pytest.mark.django_db
+
+RULES = [
+    {"required": True, "max_length": 40},
+    {"format": "email"},
+    {"format": "integer", "min": 0, "max": 130},
+    {"format": "date"},
+    {"pattern": r"[A-Z]{2}\d{6}"},
+    {"choices": ["New York", "Texas", "California"]},
+    {},
+]
+VALUES = ["Ada Lovelace", "ada@example.com", "36", "1815-12-10", "AB123456", "Texas", "notes"]
+SIZES = (10, 100)
+RECORDS = 1000
+
+
+def template_fields(size):
+    return [
+        {"field_id": f"field{i}", "type": "text", "validation": RULES[i % len(RULES)]}
+        for i in range(size)
+    ]
+
+
+def record(size, invalid=False):
+    values = {f"field{i}": VALUES[i % len(VALUES)] for i in range(size)}
+    if invalid:
+        values["field1"] = "not an email"
+    return values
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_compile(bench, size):
+    fields = template_fields(size)
+    bench(lambda: TemplateValidator(fields))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_batch_records(bench, size):
+    validator = TemplateValidator(template_fields(size))
+    records = [record(size, invalid=i % 10 == 0) for i in range(RECORDS)]
+    bench(lambda: [validator.validate(values) for values in records], records=RECORDS)
+
+
+def test_dictated_utterance(bench):
+    validator = TemplateValidator(template_fields(100))
+    utterance = {"field1": "ada@example.com", "field2": "36"}
+    bench(lambda: [validator.validate(utterance, partial=True) for _ in range(RECORDS)])
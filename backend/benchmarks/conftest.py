@@ -0,0 +1,200 @@
+"""Benchmark harness for the ``bench_*.py`` modules in this directory.
+
+Benchmarks are ordinary pytest tests that take the ``bench`` fixture, so they
+share the fixtures of ``backend/conftest.py`` and the test database. They are
+only collected when ``python_files`` names them, which keeps them out of the
+regular test run::
+
+    make bench                      # from the repository root
+    pytest benchmarks -o python_files='bench_*.py' --bench-baseline benchmarks/baseline.json
+
+Every benchmark records the median, p95 and minimum of its round timings and
+the queries of one round. Results are written as JSON to ``--bench-output``.
+With ``--bench-baseline`` the run fails when a benchmark's fastest round is
+more than ``--bench-threshold`` (a fraction) slower than in the baseline, or
+it issues more queries than it did there. The fastest round is compared
+because it is the least disturbed by whatever else the machine is doing.
+A missing baseline file fails the run too, so a comparison never passes by
+comparing against nothing. ``--bench-save-baseline`` stores the results as
+the new baseline instead (``make bench-baseline``). Timings only compare
+meaningfully on the machine that recorded the baseline, so no baseline is
+kept in git; record one before the first ``make bench``.
+"""
+
+import gc
+import json
+import os
+import platform
+import time
+from datetime import datetime, timezone
+from statistics import median, quantiles
+
+import django
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+RESULTS = pytest.StashKey[dict]()
+REPORT = pytest.StashKey[list]()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption("--bench-rounds", type=int, default=None, help="rounds per benchmark")
+    group.addoption(
+        "--bench-output",
+        default="benchmarks/results.json",
+        help="where to write the results as JSON",
+    )
+    group.addoption("--bench-baseline", default=None, help="baseline results to compare against")
+    group.addoption(
+        "--bench-threshold",
+        type=float,
+        default=0.3,
+        help="allowed slowdown against the baseline, as a fraction",
+    )
+    group.addoption(
+        "--bench-save-baseline",
+        action="store_true",
+        help="write the results to --bench-baseline instead of comparing",
+    )
+
+
+class Bench:
+    """Times a callable over several rounds and records the result."""
+
+    def __init__(self, config, name):
+        """Record results for the benchmark ``name`` in the session stash."""
+        self.config = config
+        self.name = name
+
+    def __call__(self, func, setup=None, rounds=10, threshold=None, **extra):
+        """Run ``func`` for ``rounds`` timed rounds and return the recorded result.
+
+        ``setup`` runs untimed before every round and its return value is
+        passed to ``func`` as positional arguments. ``threshold`` overrides
+        ``--bench-threshold`` for this benchmark; ``extra`` values are stored
+        alongside the timings.
+        """
+        rounds = self.config.getoption("bench_rounds") or rounds
+        func(*(setup() if setup else ()))  # warm up imports and caches
+        timings = []
+        for _ in range(rounds):
+            args = setup() if setup else ()
+            # Like timeit, keep garbage collection pauses out of the timings
+            gc.collect()
+            gc.disable()
+            try:
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    func(*args)
+                    timings.append(time.perf_counter() - started)
+            finally:
+                gc.enable()
+        result = {
+            "median_ms": _ms(median(timings)),
+            "p95_ms": _ms(quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]),
+            "min_ms": _ms(min(timings)),
+            "rounds": rounds,
+            "queries": len(queries.captured_queries),
+            **extra,
+        }
+        if threshold is not None:
+            result["threshold"] = threshold
+        self.config.stash.setdefault(RESULTS, {})[self.name] = result
+        return result
+
+
+@pytest.fixture
+def bench(request):
+    module = os.path.splitext(request.node.path.name)[0]
+    return Bench(request.config, f"{module}::{request.node.name}")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_sessionfinish(session):
+    config = session.config
+    results = config.stash.get(RESULTS, None)
+    if not results:
+        return
+    document = {"meta": _meta(), "benchmarks": dict(sorted(results.items()))}
+    _write(config.getoption("bench_output"), document)
+
+    baseline_path = config.getoption("bench_baseline")
+    if not baseline_path:
+        return
+    if config.getoption("bench_save_baseline"):
+        _write(baseline_path, document)
+        config.stash[REPORT] = [f"Saved benchmark baseline to {baseline_path}"]
+        return
+    if not os.path.exists(baseline_path):
+        config.stash[REPORT] = [
+            f"FAILED: no benchmark baseline at {baseline_path}, nothing was compared.",
+            "Record one on this machine with `make bench-baseline` "
+            "(--bench-save-baseline) and run again.",
+        ]
+        if session.exitstatus == pytest.ExitCode.OK:
+            session.exitstatus = pytest.ExitCode.TESTS_FAILED
+        return
+    with open(baseline_path) as f:
+        baseline = json.load(f)["benchmarks"]
+    lines, regressed = compare(results, baseline, config.getoption("bench_threshold"))
+    config.stash[REPORT] = lines
+    if regressed and session.exitstatus == pytest.ExitCode.OK:
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+def compare(results, baseline, default_threshold):
+    """Return report lines and whether any benchmark regressed against ``baseline``."""
+    lines = [f"{'benchmark':<60}{'baseline ms':>13}{'now ms':>10}{'change':>9}  queries"]
+    key = "min_ms"
+    regressed = False
+    for name, result in sorted(results.items()):
+        before = baseline.get(name)
+        if before is None:
+            lines.append(f"{name:<60}{'-':>13}{result[key]:>10}{'new':>9}")
+            continue
+        threshold = result.get("threshold", default_threshold)
+        change = result[key] / before[key] - 1 if before[key] else 0
+        problems = []
+        if change > threshold:
+            problems.append(f"slower than {threshold:.0%}")
+        if result["queries"] > before["queries"]:
+            problems.append(f"queries {before['queries']} -> {result['queries']}")
+        regressed = regressed or bool(problems)
+        lines.append(
+            f"{name:<60}{before[key]:>13}{result[key]:>10}{change:>+9.0%}"
+            f"  {result['queries']}" + (f"  REGRESSED: {', '.join(problems)}" if problems else "")
+        )
+    for name in sorted(set(baseline) - set(results)):
+        lines.append(f"{name:<60}{baseline[name][key]:>13}{'-':>10}{'missing':>9}")
+    return lines, regressed
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    lines = config.stash.get(REPORT, None)
+    if lines:
+        terminalreporter.section("benchmarks")
+        for line in lines:
+            terminalreporter.write_line(line)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def _meta():
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "machine": platform.machine(),
+        "database": connection.vendor,
+    }
+
+
+def _write(path, document):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
@@ -0,0 +1,247 @@
+r"""Compare upload throughput of the WSGI and ASGI deployments.
+
+Many clients upload a PDF at once, each sending its body slowly in small
+chunks like a client on a poor connection. Meanwhile a probe keeps calling
+the health endpoint to show whether the server still answers other requests.
+With sync workers every slow upload holds a worker until its last byte
+arrives. Under ASGI the body is read without blocking.
+
+Run from the ``backend`` directory. Either point it at running servers::
+
+    python -m benchmarks.load_test \
+        --target wsgi=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001
+
+or let it start gunicorn and uvicorn on free ports against the development
+database, migrating it first::
+
+    python -m benchmarks.load_test --spawn --clients 200
+
+Pass ``--json`` for machine-readable results.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from statistics import quantiles
+from urllib.parse import urlsplit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pdf_body(size):
+    return b"%PDF-1.4\n" + os.urandom(max(size - 9, 0))
+
+
+def multipart(content):
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="load.pdf"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    return f"multipart/form-data; boundary={boundary}", head + content + tail
+
+
+async def http_request(url, method="GET", body=b"", content_type=None, chunk_size=0, delay=0.0):
+    """Send one HTTP/1.1 request, optionally trickling the body, and return the status."""
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    try:
+        headers = [
+            f"{method} {parts.path or '/'} HTTP/1.1",
+            f"Host: {parts.netloc}",
+            "Connection: close",
+            f"Content-Length: {len(body)}",
+        ]
+        if content_type:
+            headers.append(f"Content-Type: {content_type}")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode())
+        step = chunk_size or len(body) or 1
+        for offset in range(0, len(body), step):
+            writer.write(body[offset : offset + step])
+            await writer.drain()
+            if delay:
+                await asyncio.sleep(delay)
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def run_load(base_url, options):
+    content_type, body = multipart(pdf_body(options.upload_size))
+    upload_url = base_url.rstrip("/") + "/api/uploads/"
+    health_url = base_url.rstrip("/") + "/api/health/"
+    upload_times, probe_times, errors = [], [], 0
+    finished = asyncio.Event()
+
+    async def client():
+        nonlocal errors
+        for _ in range(options.requests):
+            started = time.perf_counter()
+            try:
+                status = await http_request(
+                    upload_url,
+                    "POST",
+                    body,
+                    content_type,
+                    chunk_size=options.chunk_size,
+                    delay=options.chunk_delay,
+                )
+            except OSError:
+                status = None
+            if status == 200:
+                upload_times.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    async def probe():
+        while not finished.is_set():
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(http_request(health_url), timeout=30)
+                probe_times.append(time.perf_counter() - started)
+            except (OSError, asyncio.TimeoutError):
+                pass
+            await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    probe_task = asyncio.ensure_future(probe())
+    await asyncio.gather(*(client() for _ in range(options.clients)))
+    elapsed = time.perf_counter() - started
+    finished.set()
+    await probe_task
+
+    return {
+        "uploads": len(upload_times),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "uploads_per_second": round(len(upload_times) / elapsed, 2),
+        "upload_p50": _percentile(upload_times, 50),
+        "upload_p95": _percentile(upload_times, 95),
+        "health_p50": _percentile(probe_times, 50),
+        "health_p95": _percentile(probe_times, 95),
+    }
+
+
+def _percentile(values, percent):
+    if len(values) < 2:
+        return round(values[0], 4) if values else None
+    return round(quantiles(values, n=100)[percent - 1], 4)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if asyncio.run(http_request(url)) == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start")
+
+
+@contextmanager
+def spawned_servers(workers):
+    """Start gunicorn and uvicorn on free ports and yield their base URLs."""
+    subprocess.run(
+        [sys.executable, "manage.py", "migrate", "--noinput"], cwd=BACKEND_DIR, check=True
+    )
+    wsgi_port, asgi_port = _free_port(), _free_port()
+    commands = {
+        "wsgi": [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "backend.wsgi:application",
+            "--bind",
+            f"127.0.0.1:{wsgi_port}",
+            "--workers",
+            str(workers),
+        ],
+        "asgi": [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "backend.asgi:application",
+            "--port",
+            str(asgi_port),
+            "--log-level",
+            "warning",
+        ],
+    }
+    settings_modules = {"wsgi": "backend.settings", "asgi": "backend.asgi_settings"}
+    processes = [
+        subprocess.Popen(
+            command,
+            cwd=BACKEND_DIR,
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": settings_modules[name]},
+            stdout=subprocess.DEVNULL,
+        )
+        for name, command in commands.items()
+    ]
+    targets = {
+        "wsgi": f"http://127.0.0.1:{wsgi_port}",
+        "asgi": f"http://127.0.0.1:{asgi_port}",
+    }
+    try:
+        for url in targets.values():
+            _wait_for(url + "/api/health/")
+        yield targets
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--target", action="append", default=[], help="name=base_url")
+    parser.add_argument("--spawn", action="store_true", help="start gunicorn and uvicorn locally")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers for --spawn")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2, help="uploads per client")
+    parser.add_argument("--upload-size", type=int, default=256 * 1024)
+    parser.add_argument("--chunk-size", type=int, default=16 * 1024)
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="seconds between chunks")
+    parser.add_argument("--json", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    targets = dict(target.split("=", 1) for target in options.target)
+    if options.spawn:
+        with spawned_servers(options.workers) as spawned:
+            results = {name: asyncio.run(run_load(url, options)) for name, url in spawned.items()}
+    elif targets:
+        results = {name: asyncio.run(run_load(url, options)) for name, url in targets.items()}
+    else:
+        sys.exit("Pass --spawn or at least one --target name=url")
+
+    if options.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = list(next(iter(results.values())))
+    print(f"{'target':<8}" + "".join(f"{column:>20}" for column in columns))
+    for name, result in results.items():
+        print(f"{name:<8}" + "".join(f"{str(result[column]):>20}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,61 @@
 import os
+
 import django
 import pytest
 
-
 # Set up Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 django.setup()
 
 
+def _remove_test_database_files():
+    from django.conf import settings
+
+    from backend.database import remove_sqlite_files
+
+    test_name = settings.DATABASES["default"].get("TEST", {}).get("NAME")
+    if test_name:
+        # A WAL left behind by an earlier run would be replayed into the new database
+        remove_sqlite_files(test_name)
+
+
+def pytest_sessionstart(session):
+    _remove_test_database_files()
+
+
+def pytest_sessionfinish(session):
+    _remove_test_database_files()
+
+
 @pytest.fixture
 def api_client():
     from rest_framework.test import APIClient
+
     return APIClient()
+
+
+@pytest.fixture
+def pdf_tmp_dir(settings, tmp_path):
+    # Uploads also write page metadata, so keep every media directory in tmp_path
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.PDF_TMP_DIR = str(tmp_path / "pdf_tmp")
+    settings.PAGE_RENDER_DIR = str(tmp_path / "page_cache")
+    os.makedirs(settings.PDF_TMP_DIR)
+    return tmp_path / "pdf_tmp"
+
+
+@pytest.fixture(autouse=True)
+def clear_template_cache():
+    from templates import spatial, validation
+    from templates.cache import template_cache
+    from voice import matching
+
+    template_cache.clear()
+    spatial.index_cache.clear()
+    matching.index_cache.clear()
+    validation.validator_cache.clear()
+    yield
+    template_cache.clear()
+    spatial.index_cache.clear()
+    matching.index_cache.clear()
+    validation.validator_cache.clear()
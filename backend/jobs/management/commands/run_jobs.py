@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.JOBS_CONCURRENCY,
+            help="Number of jobs to run at the same time",
+        )
+        parser.add_argument(
+            "--processes",
+            action="store_true",
+            default=settings.JOBS_USE_PROCESSES,
+            help="Run jobs in a process pool instead of a thread pool",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help="Seconds to wait between polls when the queue is empty",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the jobs that are currently due and exit",
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options["concurrency"],
+            use_processes=options["processes"],
+            poll_interval=options["poll_interval"],
+        )
+        if options["once"]:
+            count = worker.run_once()
+            worker.shutdown()
+            self.stdout.write(f"Ran {count} job(s)")
+            return
+
+        self.stdout.write(f"Job worker started with {worker.concurrency} slot(s)")
+        try:
+            worker.run_forever()
+        except KeyboardInterrupt:
+            worker.shutdown()
@@ -0,0 +1,107 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def task(kind):
+    """Register the decorated function as the handler for jobs of ``kind``.
+
+    Handlers are called with the job payload as keyword arguments and must
+    return a JSON-serializable result.
+    """
+
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+
+    return decorator
+
+
+def enqueue(kind, payload=None, max_attempts=None, delay=0):
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+async def aenqueue(kind, payload=None, max_attempts=None, delay=0):
+    return await Job.objects.acreate(
+        kind=kind,
+        payload=payload or {},
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def claim(limit):
+    """Atomically mark up to ``limit`` due jobs as running and return their ids.
+
+    Each job is claimed with a conditional UPDATE, so several workers can poll
+    the same table without row locks. Jobs left running longer than
+    ``JOBS_RUNNING_TIMEOUT`` (e.g. after a worker crash) are claimed again.
+    """
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_RUNNING_TIMEOUT)
+    candidates = (
+        Job.objects.filter(
+            Q(status=Job.QUEUED, run_after__lte=now) | Q(status=Job.RUNNING, started_at__lt=stale)
+        )
+        .order_by("run_after", "id")
+        .values_list("pk", "status", "started_at")[: limit * 2]
+    )
+
+    claimed = []
+    for pk, status, started_at in candidates:
+        won = Job.objects.filter(pk=pk, status=status, started_at=started_at).update(
+            status=Job.RUNNING, started_at=now, attempts=F("attempts") + 1
+        )
+        if won:
+            claimed.append(pk)
+            if len(claimed) == limit:
+                break
+    return claimed
+
+
+def execute(job_id):
+    """Run a claimed job and record its outcome. Returns the new status."""
+    job = Job.objects.get(pk=job_id)
+    try:
+        handler = _handlers.get(job.kind)
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind {job.kind!r}")
+        result = handler(**job.payload)
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job.pk, job.kind)
+        return _record_failure(job, e)
+
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.SUCCEEDED, result=result, error="", finished_at=timezone.now()
+    )
+    return Job.SUCCEEDED
+
+
+def _record_failure(job, error):
+    now = timezone.now()
+    if job.attempts >= job.max_attempts:
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, error=str(error), finished_at=now)
+        return Job.FAILED
+
+    # Exponential backoff: base, 2 * base, 4 * base, ...
+    backoff = settings.JOBS_RETRY_BACKOFF * 2 ** max(job.attempts - 1, 0)
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.QUEUED, error=str(error), run_after=now + timedelta(seconds=backoff)
+    )
+    return Job.QUEUED
@@ -0,0 +1,26 @@
+"""Entry points for job pool workers.
+
+Worker processes are started with ``spawn`` and unpickle these functions
+before Django is set up, so this module must not import models at load time.
+"""
+
+import os
+
+
+def setup_django():
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    django.setup()
+
+
+def run(job_id):
+    from django.db import connection
+
+    from . import queue
+
+    try:
+        return queue.execute(job_id)
+    finally:
+        # Pool threads and processes outlive the job, their connections should not
+        connection.close()
@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from jobs import queue
+from jobs.models import Job
+from jobs.worker import Worker
+from rest_framework.test import APIClient
+
+calls = []
+
+
+@queue.task("test_add")
+def add(a, b):
+    calls.append((a, b))
+    return {"sum": a + b}
+
+
+@queue.task("test_flaky")
+def flaky():
+    raise RuntimeError("boom")
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    calls.clear()
+
+
+@pytest.mark.django_db
+class TestJobQueue:
+    def test_worker_runs_due_job(self):
+        job = queue.enqueue("test_add", {"a": 2, "b": 3})
+        assert Worker().run_once() == 1
+
+        job.refresh_from_db()
+        assert job.status == Job.SUCCEEDED
+        assert job.result == {"sum": 5}
+        assert job.attempts == 1
+        assert calls == [(2, 3)]
+
+    def test_delayed_job_is_not_claimed_early(self):
+        queue.enqueue("test_add", {"a": 1, "b": 1}, delay=60)
+        assert Worker().run_once() == 0
+
+    def test_claim_is_exclusive(self):
+        queue.enqueue("test_add", {"a": 1, "b": 1})
+        assert len(queue.claim(5)) == 1
+        assert queue.claim(5) == []
+
+    def test_stale_running_job_is_reclaimed(self, settings):
+        settings.JOBS_RUNNING_TIMEOUT = 60
+        job = queue.enqueue("test_add", {"a": 1, "b": 1})
+        queue.claim(1)
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(minutes=5))
+        assert queue.claim(1) == [job.pk]
+
+    def test_failed_job_retries_with_backoff_then_fails(self, settings):
+        settings.JOBS_RETRY_BACKOFF = 10
+        job = queue.enqueue("test_flaky", max_attempts=2)
+
+        Worker().run_once()
+        job.refresh_from_db()
+        assert job.status == Job.QUEUED
+        assert job.error == "boom"
+        assert job.run_after >= timezone.now() + timedelta(seconds=9)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        Worker().run_once()
+        job.refresh_from_db()
+        assert job.status == Job.FAILED
+        assert job.attempts == 2
+
+    def test_unknown_kind_fails(self):
+        job = queue.enqueue("test_missing", max_attempts=1)
+        Worker().run_once()
+        job.refresh_from_db()
+        assert job.status == Job.FAILED
+        assert "test_missing" in job.error
+
+    def test_run_jobs_command_once(self):
+        queue.enqueue("test_add", {"a": 4, "b": 5})
+        call_command("run_jobs", "--once", "--concurrency", "1")
+        assert calls == [(4, 5)]
+
+    def test_status_endpoint(self):
+        job = queue.enqueue("test_add", {"a": 1, "b": 2})
+        resp = APIClient().get(f"/api/jobs/{job.pk}/")
+        assert resp.status_code == 200
+        assert resp.json()["status"] == Job.QUEUED
+        assert resp.json()["kind"] == "test_add"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_thread_pool_worker_runs_jobs_concurrently():
+    jobs = [queue.enqueue("test_add", {"a": i, "b": i}) for i in range(4)]
+    worker = Worker(concurrency=4)
+    try:
+        assert worker.run_once() == 4
+    finally:
+        worker.shutdown()
+    assert set(Job.objects.values_list("status", flat=True)) == {Job.SUCCEEDED}
+    assert sorted(calls) == [(job.payload["a"], job.payload["b"]) for job in jobs]
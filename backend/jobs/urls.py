@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import JobDetailView
+
+app_name = "jobs"
+
+urlpatterns = [
+    path("jobs/<int:pk>/", JobDetailView.as_view(), name="job-detail"),
+]
@@ -0,0 +1,23 @@
+import logging
+
+from rest_framework import status
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import Job
+from .serializers import JobSerializer
+
+logger = logging.getLogger(__name__)
+
+
+class JobDetailView(APIView):
+    def get(self, request, pk):
+        try:
+            job = get_object_or_404(Job, pk=pk)
+            return Response(JobSerializer(job).data)
+        except Job.DoesNotExist:
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            logger.exception("Error retrieving job")
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
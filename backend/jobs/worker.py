@@ -0,0 +1,76 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from . import queue, runner
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Polls the job table and runs due jobs on a thread or process pool.
+
+    A worker with ``concurrency`` 1 in thread mode runs jobs inline, which keeps
+    single-slot workers and tests free of extra threads and DB connections.
+    """
+
+    def __init__(self, concurrency=1, use_processes=False, poll_interval=1.0):
+        """Configure the pool size, pool kind and idle polling interval."""
+        self.concurrency = max(concurrency, 1)
+        self.use_processes = use_processes
+        self.poll_interval = poll_interval
+        self.stop_event = threading.Event()
+        self._executor = None
+
+    @property
+    def inline(self):
+        return self.concurrency == 1 and not self.use_processes
+
+    def executor(self):
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.concurrency,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=runner.setup_django,
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        return self._executor
+
+    def run_once(self):
+        """Run every job that is due right now and return how many ran."""
+        job_ids = queue.claim(self.concurrency)
+        if self.inline:
+            for job_id in job_ids:
+                queue.execute(job_id)
+        else:
+            wait([self.executor().submit(runner.run, job_id) for job_id in job_ids])
+        return len(job_ids)
+
+    def run_forever(self):
+        inflight = set()
+        while not self.stop_event.is_set():
+            claimed = queue.claim(self.concurrency - len(inflight))
+            for job_id in claimed:
+                if self.inline:
+                    queue.execute(job_id)
+                else:
+                    inflight.add(self.executor().submit(runner.run, job_id))
+
+            if inflight:
+                done, inflight = wait(
+                    inflight, timeout=self.poll_interval, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    if future.exception() is not None:
+                        logger.error("Job runner crashed: %s", future.exception())
+            elif not claimed:
+                self.stop_event.wait(self.poll_interval)
+        self.shutdown()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
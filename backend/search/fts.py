@@ -0,0 +1,93 @@
+"""Querying the SQLite FTS5 index.
+
+``search_text`` indexes ``Entry.body`` with the entry table as its external
+content (see migration 0001). Matches are ranked by BM25, with field label
+hits weighted above page text: a label is short and names exactly what the
+operator is looking for. Only SQLite has FTS5; elsewhere ``available`` is
+False and nothing is indexed or searched.
+"""
+
+import html
+import re
+
+from app.models import Upload
+from django.db import connection
+from templates.models import Template
+
+from .models import Entry
+
+TABLE = "search_text"
+FIELD_WEIGHT = 2.0
+SNIPPET_TOKENS = 16
+ELLIPSIS = "…"
+
+# Control characters mark the matches in snippets, so the text around them can
+# be HTML-escaped before they are turned into <mark> tags
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+_TERM = re.compile(r"\w+")
+
+
+def available():
+    return connection.vendor == "sqlite"
+
+
+def match_expression(text):
+    """Turn free text into an FTS5 query matching every word, the last one as a prefix.
+
+    Words are quoted, so FTS5 syntax in ``text`` is taken literally. Returns
+    None when ``text`` holds no words.
+    """
+    terms = [f'"{term}"' for term in _TERM.findall(text)]
+    if not terms:
+        return None
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search(expression, kind=None, limit=20, offset=0):
+    """Return ranked matches of an FTS5 ``expression`` as dicts, best first."""
+    entry = Entry._meta.db_table
+    upload = Upload._meta.db_table
+    template = Template._meta.db_table
+    sql = (
+        f"SELECT u.upload_id, u.filename, t.id, e.kind, e.page, e.field_id, "
+        f"snippet({TABLE}, 0, %s, %s, %s, %s), "
+        f"bm25({TABLE}) * CASE e.kind WHEN %s THEN %s ELSE 1.0 END AS score "
+        f"FROM {TABLE} "
+        f"JOIN {entry} e ON e.id = {TABLE}.rowid "
+        f"JOIN {upload} u ON u.id = e.upload_id "
+        f"LEFT JOIN {template} t ON t.upload_id = u.upload_id "
+        f"WHERE {TABLE} MATCH %s"
+    )
+    params = [_MARK_START, _MARK_END, ELLIPSIS, SNIPPET_TOKENS, Entry.FIELD, FIELD_WEIGHT]
+    params.append(expression)
+    if kind is not None:
+        sql += " AND e.kind = %s"
+        params.append(kind)
+    sql += " ORDER BY score, e.id LIMIT %s OFFSET %s"
+    params += [limit, offset]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [
+        {
+            "upload_id": upload_id,
+            "filename": filename,
+            "template_id": template_id,
+            "kind": kind,
+            "page": page,
+            "field_id": field_id or None,
+            "snippet": highlight(snippet),
+            # bm25() is negative, lower is better
+            "score": round(-score, 4),
+        }
+        for upload_id, filename, template_id, kind, page, field_id, snippet, score in rows
+    ]
+
+
+def highlight(snippet):
+    """HTML-escape a snippet and wrap its matches in ``<mark>``."""
+    escaped = html.escape(" ".join(snippet.split()))
+    return escaped.replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
@@ -0,0 +1,129 @@
+"""Incremental indexing of uploads for search.
+
+``IndexedUpload`` records what the index holds for each upload, so work is
+only done for what changed:
+
+- Page text is extracted once per upload. An upload of content that is
+  already indexed under another upload (same blob) copies those entries
+  instead of parsing the PDF again.
+- Field labels are re-read when the template version moves, but the field
+  entries are only rewritten when the labels themselves changed; value
+  edits also bump the version and cost a single digest comparison.
+
+Indexing runs in ``index_upload`` jobs queued by ``search.signals``, and
+``update_index`` (the ``update_search_index`` command) catches up on
+anything those missed, such as uploads made before search existed.
+"""
+
+import hashlib
+import json
+import logging
+
+from app.models import Upload
+from app.storage import blob_path
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from pypdfium2 import PdfiumError
+from templates.models import Field, Template
+
+from .models import Entry, IndexedUpload
+from .text import page_texts
+
+logger = logging.getLogger(__name__)
+
+
+def index_upload(upload):
+    """Bring the entries of ``upload`` up to date; return what was written.
+
+    The PDF is read before the write transaction starts, so the database is
+    not locked while it is parsed.
+    """
+    state = IndexedUpload.objects.filter(upload=upload).first()
+    pages = None
+    if state is None or state.pages is None:
+        pages = _page_entries(upload)
+
+    template = Template.objects.filter(upload_id=upload.upload_id).values("pk", "version").first()
+    version = template["version"] if template else None
+    labels = digest = None
+    if state is None or state.template_version != version:
+        labels = _labels(template["pk"]) if template else []
+        digest = _digest(labels)
+
+    written = {"pages": 0, "fields": 0}
+    with transaction.atomic():
+        state, _ = IndexedUpload.objects.get_or_create(upload=upload)
+        if pages is not None and state.pages is None:
+            Entry.objects.filter(upload=upload, kind=Entry.PAGE).delete()
+            Entry.objects.bulk_create(pages)
+            state.pages = written["pages"] = len(pages)
+        if labels is not None and state.template_version != version:
+            if digest != state.labels_digest:
+                Entry.objects.filter(upload=upload, kind=Entry.FIELD).delete()
+                Entry.objects.bulk_create(
+                    Entry(upload=upload, kind=Entry.FIELD, page=page, field_id=field_id, body=label)
+                    for field_id, page, label in labels
+                )
+                state.labels_digest = digest
+                written["fields"] = len(labels)
+            state.template_version = version
+        state.save()
+    return written
+
+
+def pending():
+    """Return the uploads whose page text is not indexed or whose template changed since."""
+    versions = Template.objects.filter(upload_id=OuterRef("upload_id")).values("version")[:1]
+    indexed_version = "search_state__template_version"
+    return Upload.objects.annotate(template_version=Subquery(versions)).filter(
+        Q(search_state__isnull=True)
+        | Q(search_state__pages__isnull=True)
+        | Q(template_version__isnull=False, **{f"{indexed_version}__isnull": True})
+        | Q(template_version__isnull=True, **{f"{indexed_version}__isnull": False})
+        | Q(**{f"{indexed_version}__lt": F("template_version")})
+        | Q(**{f"{indexed_version}__gt": F("template_version")})
+    )
+
+
+def update_index(limit=None):
+    """Index every pending upload, oldest first; return how many were indexed."""
+    uploads = pending().select_related("blob").order_by("id")
+    if limit is not None:
+        uploads = uploads[:limit]
+    count = 0
+    for upload in uploads:
+        index_upload(upload)
+        count += 1
+    return count
+
+
+def _page_entries(upload):
+    """Unsaved page entries for ``upload``, copied from a twin upload when possible."""
+    twin = (
+        IndexedUpload.objects.filter(upload__blob_id=upload.blob_id, pages__isnull=False)
+        .exclude(upload=upload)
+        .values_list("upload_id", flat=True)
+        .first()
+    )
+    if twin is not None:
+        rows = Entry.objects.filter(upload_id=twin, kind=Entry.PAGE).values_list("page", "body")
+    else:
+        try:
+            texts = page_texts(blob_path(upload.blob.sha256))
+        except PdfiumError as e:
+            # Not going to parse on a retry either; index the upload as having no text
+            logger.warning("Cannot extract text of upload %s: %s", upload.upload_id, e)
+            texts = []
+        rows = [(number, text.strip()) for number, text in enumerate(texts, start=1)]
+    return [
+        Entry(upload=upload, kind=Entry.PAGE, page=page, body=body) for page, body in rows if body
+    ]
+
+
+def _labels(template_id):
+    fields = Field.objects.filter(template_id=template_id).exclude(label="")
+    return list(fields.order_by("id").values_list("field_id", "page_number", "label"))
+
+
+def _digest(labels):
+    return hashlib.sha256(json.dumps(labels).encode()).hexdigest()
@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from search import fts, indexing
+
+
+class Command(BaseCommand):
+    help = "Index the page text and field labels of uploads the search index is missing"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Index at most this many uploads per pass",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep indexing every --interval seconds",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.SEARCH_INDEX_INTERVAL,
+            help="Seconds between passes with --loop",
+        )
+
+    def handle(self, *args, **options):
+        if not fts.available():
+            raise CommandError("Search needs SQLite with FTS5")
+        while True:
+            count = indexing.update_index(limit=options["limit"])
+            self.stdout.write(f"Indexed {count} upload(s)")
+            if not options["loop"]:
+                return
+            try:
+                time.sleep(options["interval"])
+            except KeyboardInterrupt:
+                return
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# FTS5 index over search_entry.body, used as external content so the text is
+# stored once. Only SQLite has FTS5; on other databases search is unavailable.
+FTS_STATEMENTS = [
+    "CREATE VIRTUAL TABLE search_text USING fts5("
+    "body, content='search_entry', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER search_entry_ai AFTER INSERT ON search_entry BEGIN "
+    "INSERT INTO search_text(rowid, body) VALUES (new.id, new.body); END",
+    "CREATE TRIGGER search_entry_ad AFTER DELETE ON search_entry BEGIN "
+    "INSERT INTO search_text(search_text, rowid, body) VALUES ('delete', old.id, old.body); END",
+    "CREATE TRIGGER search_entry_au AFTER UPDATE ON search_entry BEGIN "
+    "INSERT INTO search_text(search_text, rowid, body) VALUES ('delete', old.id, old.body); "
+    "INSERT INTO search_text(rowid, body) VALUES (new.id, new.body); END",
+]
+
+DROP_STATEMENTS = [
+    "DROP TRIGGER IF EXISTS search_entry_au",
+    "DROP TRIGGER IF EXISTS search_entry_ad",
+    "DROP TRIGGER IF EXISTS search_entry_ai",
+    "DROP TABLE IF EXISTS search_text",
+]
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in FTS_STATEMENTS:
+            schema_editor.execute(statement)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in DROP_STATEMENTS:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('app', '0003_blob_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Entry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('page', 'Page'), ('field', 'Field')], max_length=8)),
+                ('page', models.IntegerField()),
+                ('field_id', models.CharField(blank=True, max_length=32)),
+                ('body', models.TextField()),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='app.upload')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['upload', 'kind'], name='search_entry_upload_kind')],
+            },
+        ),
+        migrations.CreateModel(
+            name='IndexedUpload',
+            fields=[
+                ('upload', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_state', serialize=False, to='app.upload')),
+                ('pages', models.PositiveIntegerField(null=True)),
+                ('template_version', models.PositiveIntegerField(null=True)),
+                ('labels_digest', models.CharField(blank=True, max_length=64)),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,45 @@
+from django.db import models
+
+
+class Entry(models.Model):
+    """A piece of indexed text: the text of one page, or one field label.
+
+    The ``search_text`` FTS5 table (created by migration 0001, SQLite only)
+    indexes ``body`` with this table as its external content, and triggers
+    keep it in step with every insert, update and delete here.
+    """
+
+    PAGE = "page"
+    FIELD = "field"
+    KIND_CHOICES = [(PAGE, "Page"), (FIELD, "Field")]
+
+    upload = models.ForeignKey(
+        "app.Upload", related_name="search_entries", on_delete=models.CASCADE
+    )
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES)
+    page = models.IntegerField()
+    field_id = models.CharField(max_length=32, blank=True)
+    body = models.TextField()
+
+    class Meta:
+        indexes = [models.Index(fields=["upload", "kind"], name="search_entry_upload_kind")]
+
+    def __str__(self):
+        return f"{self.kind} {self.page} of upload {self.upload_id}"
+
+
+class IndexedUpload(models.Model):
+    """What of an upload the index already holds, see ``search.indexing``."""
+
+    upload = models.OneToOneField(
+        "app.Upload", primary_key=True, related_name="search_state", on_delete=models.CASCADE
+    )
+    # Page entries written, None until the page text has been indexed
+    pages = models.PositiveIntegerField(null=True)
+    # Template version and digest of the labels the field entries were built from
+    template_version = models.PositiveIntegerField(null=True)
+    labels_digest = models.CharField(max_length=64, blank=True)
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Search state of upload {self.upload_id}"
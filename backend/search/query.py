@@ -0,0 +1,51 @@
+"""Parameters of ``GET /api/search/``."""
+
+from . import fts
+from .models import Entry
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+KINDS = (Entry.PAGE, Entry.FIELD)
+
+
+def parse_int(params, name, default, minimum, maximum=None):
+    value = params.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid value for {name}: {value}") from None
+    if number < minimum or (maximum is not None and number > maximum):
+        bounds = f"between {minimum} and {maximum}" if maximum is not None else f">= {minimum}"
+        raise ValueError(f"{name} must be {bounds}")
+    return number
+
+
+class SearchQuery:
+    """One page of results for ``?q=&kind=&limit=&offset=``.
+
+    Results are ranked, so pages are addressed by offset; deep offsets are
+    rare for a search box and stay cheap next to the MATCH itself.
+    """
+
+    def __init__(self, params):
+        """Validate ``params``; raises ``ValueError`` for bad input."""
+        self.text = params.get("q", "").strip()
+        if not self.text:
+            raise ValueError("q is required")
+        self.expression = fts.match_expression(self.text)
+        self.kind = params.get("kind") or None
+        if self.kind is not None and self.kind not in KINDS:
+            raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+        self.limit = parse_int(params, "limit", PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        self.offset = parse_int(params, "offset", 0, 0)
+
+    def fetch(self):
+        """Return ``(results, next_offset)``; ``next_offset`` is None on the last page."""
+        if self.expression is None:
+            return [], None
+        results = fts.search(self.expression, self.kind, self.limit + 1, self.offset)
+        if len(results) > self.limit:
+            return results[: self.limit], self.offset + self.limit
+        return results, None
@@ -0,0 +1,35 @@
+"""Keep the search index current as uploads and templates change.
+
+Every new upload, and every saved or deleted template, queues an
+``index_upload`` job once the transaction commits; the job works out what
+changed. Deleting an upload removes its entries through the foreign key.
+"""
+
+from app.models import Upload
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from jobs.queue import enqueue
+from templates.models import Template
+
+from . import fts
+
+
+def connect():
+    post_save.connect(upload_saved, sender=Upload, dispatch_uid="search.upload_saved")
+    post_save.connect(template_changed, sender=Template, dispatch_uid="search.template_saved")
+    post_delete.connect(template_changed, sender=Template, dispatch_uid="search.template_deleted")
+
+
+def upload_saved(sender, instance, created, **kwargs):
+    if created:
+        schedule(instance.upload_id)
+
+
+def template_changed(sender, instance, **kwargs):
+    schedule(instance.upload_id)
+
+
+def schedule(upload_id):
+    """Queue indexing of ``upload_id`` after the current transaction commits."""
+    if fts.available():
+        transaction.on_commit(lambda: enqueue("index_upload", {"upload_id": upload_id}))
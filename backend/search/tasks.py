@@ -0,0 +1,13 @@
+from app.models import Upload
+from jobs.queue import task
+
+from . import indexing
+
+
+@task("index_upload")
+def index_upload(upload_id):
+    upload = Upload.objects.select_related("blob").filter(upload_id=upload_id).first()
+    if upload is None:
+        # Deleted before the job ran; its entries went with it
+        return {"pages": 0, "fields": 0}
+    return indexing.index_upload(upload)
@@ -0,0 +1,221 @@
+import io
+import os
+
+import pytest
+from app.models import Blob, Upload
+from app.storage import blob_path
+from django.core.management import call_command
+from django.urls import reverse
+from jobs.models import Job
+from jobs.queue import claim, execute
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+from search import indexing
+from search.models import Entry, IndexedUpload
+from templates.models import Field, Template
+
+
+def text_pdf(*pages):
+    """Return a PDF with one page per string, each line drawn as text."""
+    writer = PdfWriter()
+    for text in pages:
+        page = writer.add_blank_page(612, 792)
+        font = DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})}
+        )
+        content = DecodedStreamObject()
+        lines = [
+            f"BT /F1 12 Tf 72 {700 - 20 * i} Td ({line}) Tj ET".encode()
+            for i, line in enumerate(text.splitlines())
+        ]
+        content.set_data(b"\n".join(lines))
+        page[NameObject("/Contents")] = writer._add_object(content)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+FORM = text_pdf("Patient intake form", "Emergency contact\nDate of birth", "Signature")
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.PDF_TMP_DIR = str(tmp_path / "pdf")
+    os.makedirs(settings.PDF_TMP_DIR)
+    return settings
+
+
+def store(content, sha256, upload_id="upload-1"):
+    os.makedirs(os.path.dirname(blob_path(sha256)), exist_ok=True)
+    with open(blob_path(sha256), "wb") as f:
+        f.write(content)
+    blob, _ = Blob.objects.get_or_create(sha256=sha256, defaults={"size": len(content)})
+    return Upload.objects.create(upload_id=upload_id, blob=blob)
+
+
+def make_template(upload, labels):
+    template = Template.objects.create(upload_id=upload.upload_id)
+    Field.objects.bulk_create(
+        Field(
+            template=template,
+            field_id=f"field{i}",
+            type="text",
+            label=label,
+            page_number=page,
+            x=10.0,
+            y=20.0 * i,
+            width=100.0,
+            height=20.0,
+        )
+        for i, (page, label) in enumerate(labels)
+    )
+    return template
+
+
+def search(client, **params):
+    response = client.get(reverse("search:search"), params)
+    assert response.status_code == 200, response.content
+    return response.json()
+
+
+@pytest.mark.django_db
+class TestIndexing:
+    def test_page_text_is_indexed_and_searchable(self, client, media):
+        upload = store(FORM, "a" * 64)
+        Upload.objects.filter(pk=upload.pk).update(filename="intake.pdf")
+
+        assert indexing.index_upload(upload) == {"pages": 3, "fields": 0}
+
+        data = search(client, q="date of birth")
+        assert data["next_offset"] is None
+        [result] = data["results"]
+        assert result["upload_id"] == upload.upload_id
+        assert result["filename"] == "intake.pdf"
+        assert result["kind"] == "page"
+        assert result["page"] == 2
+        assert result["template_id"] is None
+        assert "<mark>Date</mark> <mark>of</mark> <mark>birth</mark>" in result["snippet"]
+
+    def test_last_word_matches_as_a_prefix(self, client, media):
+        indexing.index_upload(store(FORM, "a" * 64))
+        assert [r["page"] for r in search(client, q="emerg")["results"]] == [2]
+        assert search(client, q="emerg contact sig")["results"] == []
+
+    def test_field_labels_rank_above_page_text(self, client, media):
+        upload = store(FORM, "a" * 64)
+        template = make_template(upload, [(2, "Date of birth"), (3, "Signature")])
+        indexing.index_upload(upload)
+
+        results = search(client, q="birth")["results"]
+        assert [(r["kind"], r["page"]) for r in results] == [("field", 2), ("page", 2)]
+        assert results[0]["field_id"] == "field0"
+        assert results[0]["template_id"] == template.pk
+        only_fields = search(client, q="signature", kind="field")["results"]
+        assert [r["kind"] for r in only_fields] == ["field"]
+
+    def test_labels_are_only_rewritten_when_they_change(self, client, media):
+        upload = store(FORM, "a" * 64)
+        template = make_template(upload, [(2, "Date of birth")])
+        indexing.index_upload(upload)
+        entry_ids = set(Entry.objects.values_list("pk", flat=True))
+
+        # A value edit bumps the version but leaves the labels alone
+        Template.objects.filter(pk=template.pk).update(version=2)
+        assert indexing.index_upload(upload) == {"pages": 0, "fields": 0}
+        assert set(Entry.objects.values_list("pk", flat=True)) == entry_ids
+
+        Field.objects.filter(template=template).update(label="Place of birth")
+        Template.objects.filter(pk=template.pk).update(version=3)
+        assert indexing.index_upload(upload) == {"pages": 0, "fields": 1}
+        assert search(client, q="place", kind="field")["results"][0]["page"] == 2
+
+        template.delete()
+        indexing.index_upload(upload)
+        assert search(client, q="place")["results"] == []
+        assert IndexedUpload.objects.get(upload=upload).template_version is None
+
+    def test_duplicate_content_copies_entries_instead_of_parsing(self, client, media, monkeypatch):
+        indexing.index_upload(store(FORM, "a" * 64, upload_id="first"))
+
+        def fail(path):
+            raise AssertionError("page text extracted again")
+
+        monkeypatch.setattr(indexing, "page_texts", fail)
+        indexing.index_upload(store(FORM, "a" * 64, upload_id="second"))
+
+        results = search(client, q="signature")["results"]
+        assert sorted(r["upload_id"] for r in results) == ["first", "second"]
+
+    def test_unreadable_pdf_is_indexed_without_text(self, media):
+        upload = store(b"%PDF-1.4 broken", "b" * 64)
+        assert indexing.index_upload(upload) == {"pages": 0, "fields": 0}
+        assert IndexedUpload.objects.get(upload=upload).pages == 0
+
+    def test_deleted_uploads_leave_the_index(self, client, media):
+        upload = store(FORM, "a" * 64)
+        indexing.index_upload(upload)
+        upload.delete()
+        assert search(client, q="signature")["results"] == []
+        assert not Entry.objects.exists()
+
+    def test_update_index_only_touches_pending_uploads(self, media):
+        first = store(FORM, "a" * 64, upload_id="first")
+        store(text_pdf("Invoice"), "b" * 64, upload_id="second")
+
+        call_command("update_search_index", stdout=io.StringIO())
+        assert not indexing.pending().exists()
+        assert indexing.update_index() == 0
+
+        make_template(first, [(1, "Name")])
+        assert list(indexing.pending().values_list("upload_id", flat=True)) == ["first"]
+        assert indexing.update_index() == 1
+
+    def test_new_uploads_and_template_changes_queue_index_jobs(
+        self, media, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            upload = store(FORM, "a" * 64)
+            make_template(upload, [(1, "Patient name")])
+
+        jobs = Job.objects.filter(kind="index_upload")
+        assert [job.payload for job in jobs] == [{"upload_id": upload.upload_id}] * 2
+        for job_id in claim(10):
+            assert execute(job_id) == Job.SUCCEEDED
+        assert Entry.objects.filter(kind=Entry.FIELD).count() == 1
+        assert Entry.objects.filter(kind=Entry.PAGE).count() == 3
+
+
+@pytest.mark.django_db
+class TestSearchEndpoint:
+    def test_pages_by_offset(self, client, media):
+        for i in range(3):
+            indexing.index_upload(store(FORM, f"{i}" * 64, upload_id=f"upload-{i}"))
+
+        first = search(client, q="signature", limit=2)
+        assert len(first["results"]) == 2
+        assert first["next_offset"] == 2
+        rest = search(client, q="signature", limit=2, offset=2)
+        assert len(rest["results"]) == 1
+        assert rest["next_offset"] is None
+
+    def test_query_syntax_and_markup_are_taken_literally(self, client, media):
+        indexing.index_upload(store(text_pdf("Terms <b> and conditions"), "a" * 64))
+
+        assert search(client, q='NEAR(" OR body:*')["results"] == []
+        [result] = search(client, q="terms")["results"]
+        assert "&lt;b&gt;" in result["snippet"]
+        assert search(client, q="!!!")["results"] == []
+
+    def test_invalid_parameters(self, client):
+        url = reverse("search:search")
+        assert client.get(url).status_code == 400
+        assert client.get(url, {"q": "x", "kind": "blob"}).status_code == 400
+        assert client.get(url, {"q": "x", "limit": "0"}).status_code == 400
+        assert client.get(url, {"q": "x", "offset": "-1"}).status_code == 400
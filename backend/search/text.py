@@ -0,0 +1,25 @@
+"""Page text extraction.
+
+Kept free of Django imports, like ``app.rasterize``, so it can run anywhere
+a blob path is at hand.
+"""
+
+import pypdfium2 as pdfium
+
+
+def page_texts(pdf_path):
+    """Return the text of every page, in page order."""
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        texts = []
+        for index in range(len(pdf)):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            try:
+                texts.append(textpage.get_text_range())
+            finally:
+                textpage.close()
+                page.close()
+        return texts
+    finally:
+        pdf.close()
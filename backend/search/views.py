@@ -0,0 +1,30 @@
+import logging
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import fts
+from .query import SearchQuery
+
+logger = logging.getLogger(__name__)
+
+
+class SearchView(APIView):
+    """Ranked full-text search over uploaded PDF page text and field labels."""
+
+    def get(self, request):
+        try:
+            if not fts.available():
+                return Response(
+                    {"error": "Search needs SQLite with FTS5"},
+                    status=status.HTTP_501_NOT_IMPLEMENTED,
+                )
+            query = SearchQuery(request.query_params)
+            results, next_offset = query.fetch()
+            return Response({"query": query.text, "results": results, "next_offset": next_offset})
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.exception("Error searching")
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,102 @@
+"""Async versions of the template list, create and detail endpoints, used under ASGI.
+
+Responses match ``TemplateListCreateView`` and ``TemplateDetailView``. Template
+creation writes the template and its fields in one transaction, which the
+async ORM cannot do, so ``serializer.save`` runs through ``sync_to_async``.
+"""
+
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from . import payloads
+from .cache import template_cache
+from .columnar import MEDIA_TYPE, MalformedPayload
+from .listing import TemplatePage
+from .models import Template
+from .parsers import template_data
+from .responses import (
+    detail_format,
+    detail_response,
+    etag_matches,
+    json_response,
+    not_modified,
+    page_payload,
+)
+from .serializers import TemplateSerializer
+
+logger = logging.getLogger(__name__)
+
+
+@csrf_exempt
+async def template_collection(request):
+    if request.method == "GET":
+        return await template_list(request)
+    if request.method == "POST":
+        return await template_create(request)
+    return HttpResponseNotAllowed(["GET", "POST"])
+
+
+@require_GET
+async def template_list(request):
+    try:
+        results, cursor = await TemplatePage(request.GET).afetch()
+        return json_response(payloads.render(page_payload(request, results, cursor)))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except Exception as e:
+        logger.exception("Error listing templates")
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@csrf_exempt
+@require_POST
+async def template_create(request):
+    try:
+        if request.content_type == MEDIA_TYPE:
+            data = template_data(request.body, request.GET.get("upload_id"))
+        else:
+            data = json.loads(request.body)
+    except MalformedPayload as e:
+        return JsonResponse({"error": f"Malformed columnar payload: {e}"}, status=400)
+    except ValueError:
+        return JsonResponse({"error": "Request body must be JSON"}, status=400)
+    try:
+        serializer = TemplateSerializer(data=data)
+        # Validation queries the database for the unique upload_id
+        if not await sync_to_async(serializer.is_valid)():
+            logger.error(f"Validation error: {serializer.errors}")
+            return JsonResponse(serializer.errors, status=400)
+
+        obj = await sync_to_async(serializer.save)()
+        return JsonResponse({"template_id": obj.id}, status=201)
+    except Exception as e:
+        logger.exception("Error creating template")
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@require_GET
+async def template_detail(request, pk):
+    try:
+        fmt = detail_format(request)
+        version = await template_cache.acurrent_version(pk)
+        if version is not None and etag_matches(request, template_cache.etag(pk, version, fmt)):
+            return not_modified(pk, version, fmt)
+
+        body = await template_cache.aget(pk, version, fmt) if version is not None else None
+        if body is None:
+            version, body = await payloads.adetail(pk, fmt)
+            await template_cache.astore(pk, version, body, fmt)
+            if etag_matches(request, template_cache.etag(pk, version, fmt)):
+                return not_modified(pk, version, fmt)
+
+        return detail_response(body, pk, version, fmt)
+    except Template.DoesNotExist:
+        return JsonResponse({"error": "Template not found"}, status=404)
+    except Exception as e:
+        logger.exception("Error retrieving template")
+        return JsonResponse({"error": str(e)}, status=500)
@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+
+from app.pages import cache_dir, get_executor
+from app.storage import blob_path
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from . import extraction
+from .models import Template
+from .persistence import bulk_create_fields
+
+
+def layout_path(sha256):
+    return os.path.join(cache_dir(sha256), f"fields-v{extraction.EXTRACTOR_VERSION}.json")
+
+
+def cached_layout(sha256):
+    try:
+        with open(layout_path(sha256)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def extract_layout(sha256):
+    """Detect the fields of a blob, reusing the result cached for its digest.
+
+    Large documents are split into runs of ``FIELD_EXTRACTION_PAGES_PER_TASK``
+    pages that are processed in parallel on the shared render pool.
+    """
+    layout = cached_layout(sha256)
+    if layout is not None:
+        return layout
+
+    pdf_path = blob_path(sha256)
+    use_widgets = extraction.has_acroform(pdf_path)
+    count = extraction.page_count(pdf_path)
+    step = settings.FIELD_EXTRACTION_PAGES_PER_TASK
+    chunks = [list(range(start, min(start + step, count))) for start in range(0, count, step)]
+
+    executor = get_executor() if len(chunks) > 1 else None
+    if executor is None:
+        results = [extraction.extract_pages(pdf_path, chunk, use_widgets) for chunk in chunks]
+    else:
+        futures = [
+            executor.submit(extraction.extract_pages, pdf_path, chunk, use_widgets)
+            for chunk in chunks
+        ]
+        results = [future.result() for future in futures]
+
+    fields = extraction.assign_field_ids([field for result in results for field in result])
+    layout = {"source": "acroform" if use_widgets else "geometry", "fields": fields}
+    _write_json(layout_path(sha256), layout)
+    return layout
+
+
+def create_template(upload, layout=None):
+    """Create the template of an upload from its detected fields.
+
+    Returns the existing template when the upload already has one, including
+    one a concurrent extraction created first.
+    """
+    existing = Template.objects.filter(upload_id=upload.upload_id).first()
+    if existing is not None:
+        return existing
+
+    layout = layout or extract_layout(upload.blob.sha256)
+    try:
+        with transaction.atomic():
+            template = Template.objects.create(upload_id=upload.upload_id)
+            bulk_create_fields(template, layout["fields"])
+    except IntegrityError:
+        return Template.objects.get(upload_id=upload.upload_id)
+    return template
+
+
+def _write_json(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,292 @@
+"""Fill one template with many value sets.
+
+Renders run on a long-lived process pool shared with page rendering. Each
+worker keeps the last few source PDFs it parsed, so a batch pays for parsing
+once per worker; a render task carries only the field geometry and one value
+set and returns the small update section, which the parent appends to the
+shared source bytes. At most ``window`` renders are in flight at any time, so
+memory stays bounded however long the input is.
+
+Records that cannot be parsed or rendered do not stop a batch: they come
+through as ``InvalidRecord`` and are reported in ``errors.jsonl`` like records
+failing validation, since by the time they are read the response is already
+streaming.
+
+Like ``templates.filling`` this module avoids Django imports, since worker
+processes are started with ``spawn``.
+"""
+
+import csv
+import io
+import json
+import multiprocessing
+import os
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from app.blobstore import mapped
+
+from . import filling
+
+NAME_KEY = "_name"
+ERRORS_NAME = "errors.jsonl"
+# Source documents each pool worker keeps parsed
+WORKER_DOCUMENTS = 4
+
+_worker_documents = OrderedDict()
+
+
+class InvalidRecord:
+    """A record of the input that could not be read as a value set, or rendered."""
+
+    def __init__(self, message):
+        """Describe why the record was not usable."""
+        self.message = message
+
+
+def read_value_sets(lines, fmt):
+    """Yield one ``{field_id: value}`` dict per JSONL line or CSV row.
+
+    ``lines`` is an iterable of byte lines, e.g. an open file or a request.
+    Records that are not valid UTF-8, JSON objects or CSV rows are yielded
+    as ``InvalidRecord`` in their place.
+    """
+    if fmt == "csv":
+        yield from _read_csv(lines)
+        return
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            values = json.loads(line.decode("utf-8"))
+        except UnicodeDecodeError:
+            yield InvalidRecord("Record is not valid UTF-8")
+        except ValueError as e:
+            yield InvalidRecord(f"Invalid JSON: {e}")
+        else:
+            yield (
+                values
+                if isinstance(values, dict)
+                else InvalidRecord("Record must be a JSON object")
+            )
+
+
+def _read_csv(lines):
+    # Bytes that are not UTF-8 survive decoding as lone surrogates, so only the
+    # rows holding them are rejected and the reader keeps going
+    reader = csv.DictReader(line.decode("utf-8", "surrogateescape") for line in lines)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield InvalidRecord(f"Invalid CSV row: {e}")
+            continue
+        if any(_undecodable(value) for value in row.values() if isinstance(value, str)):
+            yield InvalidRecord("Record is not valid UTF-8")
+        else:
+            yield row
+
+
+def _undecodable(text):
+    try:
+        text.encode("utf-8")
+    except UnicodeEncodeError:
+        return True
+    return False
+
+
+def process_pool(workers):
+    """Return a process pool ``render_batch`` can run on."""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _worker_document(pdf_path):
+    document = _worker_documents.pop(pdf_path, None)
+    if document is None:
+        document = filling.SourceDocument(pdf_path)
+    _worker_documents[pdf_path] = document
+    while len(_worker_documents) > WORKER_DOCUMENTS:
+        _worker_documents.popitem(last=False)
+    return document
+
+
+def _render(pdf_path, fields, values):
+    return render_values(_worker_document(pdf_path), fields, values)
+
+
+def render_values(document, fields, values):
+    """Return the update section filling ``fields`` with ``values``.
+
+    Fields missing from ``values`` are left blank.
+    """
+    pages = {}
+    for field in fields:
+        value = values.get(field["field_id"])
+        if value in (None, ""):
+            continue
+        pages.setdefault(field["page_number"], []).append({**field, "value": str(value)})
+
+    overlays = {}
+    for page_number, page_fields in pages.items():
+        if 1 <= page_number <= len(document.pages):
+            overlays[page_number - 1] = filling.overlay_content(document, page_fields)
+    return filling.build_update(document, overlays) if overlays else b""
+
+
+def render_batch(pdf_path, fields, value_sets, executor=None, window=None):
+    """Yield ``(value_set, update_bytes)`` in input order.
+
+    Renders run on ``executor``, a pool from ``process_pool`` that is left
+    running; without one everything runs in the calling process. A value set
+    that fails to render yields an ``InvalidRecord`` in place of its update.
+    """
+    if executor is None:
+        document = filling.SourceDocument(pdf_path)
+        for values in value_sets:
+            try:
+                update = render_values(document, fields, values)
+            except Exception as e:
+                update = _render_failed(e)
+            yield values, update
+        return
+
+    window = window or 2 * (os.cpu_count() or 1)
+    pending = deque()
+    try:
+        for values in value_sets:
+            pending.append((values, executor.submit(_render, pdf_path, fields, values)))
+            if len(pending) >= window:
+                values, future = pending.popleft()
+                yield values, _result(future)
+        while pending:
+            values, future = pending.popleft()
+            yield values, _result(future)
+    finally:
+        # A client that stops reading leaves nothing queued on the shared pool
+        for _, future in pending:
+            future.cancel()
+
+
+def _result(future):
+    try:
+        return future.result()
+    except Exception as e:
+        return _render_failed(e)
+
+
+def _render_failed(error):
+    return InvalidRecord(f"Render failed: {error}")
+
+
+def output_name(index, values):
+    """Name output files by position, plus the optional ``_name`` column."""
+    name = str(values.get(NAME_KEY) or "")
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)[:100]
+    return f"{index:05d}-{safe}.pdf" if safe else f"{index:05d}.pdf"
+
+
+def filled_documents(
+    pdf_path, fields, value_sets, executor=None, validate=None, rejected=None, window=None
+):
+    """Yield ``(file_name, update_bytes)`` for every value set.
+
+    With ``validate``, a callable returning the errors of a value set, sets
+    with errors are skipped and appended to ``rejected`` as
+    ``{"record": index, "errors": errors}``. ``InvalidRecord`` entries, and
+    value sets that fail to render, are skipped as
+    ``{"record": index, "error": message}``; without ``rejected`` they raise
+    ``ValueError``. Output files keep the index of their record either way.
+    """
+    indexes = deque()
+
+    def reject(index, record):
+        if rejected is None:
+            raise ValueError(f"Record {index}: {record.message}")
+        rejected.append({"record": index, "error": record.message})
+
+    def accepted():
+        for index, values in enumerate(value_sets, start=1):
+            if isinstance(values, InvalidRecord):
+                reject(index, values)
+                continue
+            errors = validate(values) if validate is not None else None
+            if errors:
+                rejected.append({"record": index, "errors": errors})
+                continue
+            indexes.append(index)
+            yield values
+
+    # render_batch yields in input order, after taking the value set from accepted()
+    renders = render_batch(pdf_path, fields, accepted(), executor=executor, window=window)
+    for values, update in renders:
+        index = indexes.popleft()
+        if isinstance(update, InvalidRecord):
+            reject(index, update)
+            continue
+        yield output_name(index, values), update
+
+
+def rejected_lines(rejected):
+    """Render rejected records as JSON lines."""
+    return "".join(json.dumps(record) + "\n" for record in rejected).encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable file object collecting what ZipFile writes until drained."""
+
+    def __init__(self):
+        """Start with nothing buffered."""
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(source_path, documents, rejected=None):
+    """Yield a ZIP archive of filled PDFs chunk by chunk, one entry at a time.
+
+    Records in ``rejected`` once ``documents`` is exhausted are added as
+    ``errors.jsonl``.
+    """
+    sink = _ChunkSink()
+    with mapped(source_path) as source:
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+            for name, update in documents:
+                with archive.open(name, "w") as entry:
+                    entry.write(source)
+                    entry.write(update)
+                yield sink.drain()
+            if rejected:
+                archive.writestr(ERRORS_NAME, rejected_lines(rejected))
+    yield sink.drain()
+
+
+def write_directory(source_path, documents, output_dir, rejected=None):
+    """Write every filled PDF into ``output_dir`` and return how many were written.
+
+    Records in ``rejected`` are written to ``errors.jsonl`` next to them.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    count = 0
+    with mapped(source_path) as source:
+        for name, update in documents:
+            with open(os.path.join(output_dir, name), "wb") as out:
+                out.write(source)
+                out.write(update)
+            count += 1
+    if rejected:
+        with open(os.path.join(output_dir, ERRORS_NAME), "wb") as out:
+            out.write(rejected_lines(rejected))
+    return count
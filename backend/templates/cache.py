@@ -0,0 +1,205 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Template
+
+
+class LRUCache:
+    """A small thread-safe, size-bounded least-recently-used mapping."""
+
+    def __init__(self, maxsize):
+        """Create an empty cache holding at most ``maxsize`` entries."""
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return None
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TemplateCache:
+    """Rendered template payloads keyed by template id, version and format.
+
+    Payloads never change for a given id, version and format, so they live in
+    an in-process LRU and, when ``TEMPLATE_CACHE_ALIAS`` names a Django cache,
+    in that backend as well. The pointer from a template id to its current
+    version is what lets a conditional GET be answered without touching the
+    database. With a shared backend the pointer is only kept there, so an
+    invalidation by any worker is seen by all of them; without one it is per
+    process, which is only correct for a single worker.
+    """
+
+    _local = None
+
+    @property
+    def local(self):
+        if self._local is None:
+            self._local = LRUCache(settings.TEMPLATE_CACHE_SIZE)
+        return self._local
+
+    @property
+    def backend(self):
+        alias = settings.TEMPLATE_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    @staticmethod
+    def etag(pk, version, fmt="json"):
+        # Each representation needs its own validator; JSON keeps the original one
+        suffix = "" if fmt == "json" else f"-{fmt}"
+        return f'"template-{pk}-v{version}{suffix}"'
+
+    def current_version(self, pk):
+        key = self._version_key(pk)
+        return self.backend.get(key) if self.backend is not None else self.local.get(key)
+
+    def get(self, pk, version, fmt="json"):
+        return self._get(self._payload_key(pk, version, fmt))
+
+    def store(self, pk, version, payload, fmt="json"):
+        """Cache ``payload`` and point ``pk`` at ``version``.
+
+        A write that committed, and invalidated, after the caller read
+        ``version`` would leave the pointer stale, so it is dropped again
+        unless the database still holds ``version``.
+        """
+        self._set(self._payload_key(pk, version, fmt), payload)
+        self._set_version(pk, version)
+        if Template.objects.filter(pk=pk).values_list("version", flat=True).first() != version:
+            self.invalidate(pk)
+
+    async def acurrent_version(self, pk):
+        key = self._version_key(pk)
+        if self.backend is not None:
+            return await self.backend.aget(key)
+        return self.local.get(key)
+
+    async def aget(self, pk, version, fmt="json"):
+        return await self._aget(self._payload_key(pk, version, fmt))
+
+    async def astore(self, pk, version, payload, fmt="json"):
+        await self._aset(self._payload_key(pk, version, fmt), payload)
+        key = self._version_key(pk)
+        if self.backend is not None:
+            await self.backend.aset(key, version)
+        else:
+            self.local.set(key, version)
+        current = await Template.objects.filter(pk=pk).values_list("version", flat=True).afirst()
+        if current != version:
+            self.local.delete(key)
+            if self.backend is not None:
+                await self.backend.adelete(key)
+
+    def invalidate(self, pk):
+        key = self._version_key(pk)
+        self.local.delete(key)
+        if self.backend is not None:
+            self.backend.delete(key)
+
+    def clear(self):
+        self.local.clear()
+
+    def _get(self, key):
+        value = self.local.get(key)
+        if value is None and self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    async def _aget(self, key):
+        value = self.local.get(key)
+        if value is None and self.backend is not None:
+            value = await self.backend.aget(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    def _set(self, key, value):
+        self.local.set(key, value)
+        if self.backend is not None:
+            self.backend.set(key, value)
+
+    async def _aset(self, key, value):
+        self.local.set(key, value)
+        if self.backend is not None:
+            await self.backend.aset(key, value)
+
+    def _set_version(self, pk, version):
+        key = self._version_key(pk)
+        if self.backend is not None:
+            self.backend.set(key, version)
+        else:
+            self.local.set(key, version)
+
+    @staticmethod
+    def _version_key(pk):
+        return f"template:{pk}:version"
+
+    @staticmethod
+    def _payload_key(pk, version, fmt):
+        return f"template:{pk}:v{version}:{fmt}"
+
+
+class VersionedIndexCache:
+    """In-process cache of structures derived from a template's fields.
+
+    ``build(template_id, version)`` is called on a miss. Entries are keyed by
+    template id, creation time and version, so saving new fields (which bumps
+    the version) or recreating a template under a reused id builds afresh.
+    """
+
+    def __init__(self, size_setting, build):
+        """Read the capacity from ``size_setting`` once the cache is first used."""
+        self.size_setting = size_setting
+        self.build = build
+        self._local = None
+
+    def get(self, template_id):
+        """Return the entry for the template's current version.
+
+        Raises ``Template.DoesNotExist`` for an unknown template.
+        """
+        row = Template.objects.filter(pk=template_id).values_list("version", "created_at").first()
+        if row is None:
+            raise Template.DoesNotExist(f"Template {template_id} does not exist")
+        version, created_at = row
+        if self._local is None:
+            self._local = LRUCache(getattr(settings, self.size_setting))
+        key = (template_id, created_at, version)
+        value = self._local.get(key)
+        if value is None:
+            value = self.build(template_id, version)
+            self._local.set(key, value)
+        return value
+
+    def clear(self):
+        self._local = None
+
+
+template_cache = TemplateCache()
@@ -0,0 +1,210 @@
+"""Compact columnar encoding of a template and its fields.
+
+The JSON detail payload repeats every key for every field, so a form with
+a thousand fields spends most of its bytes, and most of the client's parse
+time, on key names. Here each field attribute is one column instead:
+
+- numbers (``id``, ``page_number``, ``x``, ``y``, ``width``, ``height``) are
+  packed little-endian arrays, each in the narrowest type that holds all of
+  its values exactly, so they can be read as typed arrays without parsing;
+- strings (``field_id``, ``type``, ``label``, ``placeholder``, ``value`` and
+  ``validation`` as JSON text) are indexes into one shared string table, so
+  a repeated type, label or rule set is stored once.
+
+Layout, all integers little-endian::
+
+    4s   magic b"V2PT"
+    u16  format version (1)
+    u16  reserved (0)
+    u32  length of the header JSON
+    ...  header JSON, UTF-8, padded with spaces to a multiple of 8 bytes
+    ...  column data; every column starts at a multiple of 8 bytes
+
+The header holds ``template`` (id, upload_id, created_at, version),
+``count``, the ``strings`` table and ``columns``, a list of
+``[name, dtype, offset]`` with offsets from the start of the column data.
+``dtype`` is one of ``u1 u2 u4 u8 i1 i2 i4 i8 f4 f8``; string columns are
+unsigned and index ``strings``.
+
+Like ``templates.batch`` this module avoids Django imports.
+"""
+
+import json
+import struct
+import sys
+from array import array
+
+MEDIA_TYPE = "application/vnd.voice2pdf.template+columns"
+MAGIC = b"V2PT"
+FORMAT_VERSION = 1
+
+NUMBER_COLUMNS = ("id", "page_number", "x", "y", "width", "height")
+STRING_COLUMNS = ("field_id", "type", "label", "placeholder", "validation", "value")
+FLOAT_COLUMNS = ("x", "y", "width", "height")
+
+_PREAMBLE = struct.Struct("<4sHHI")
+# One encoder for every rule set: json.dumps builds a new one per call when given options
+_RULES_ENCODER = json.JSONEncoder(separators=(",", ":"))
+_ALIGNMENT = 8
+_TYPECODES = {
+    "u1": "B",
+    "u2": "H",
+    "u4": "I",
+    "u8": "Q",
+    "i1": "b",
+    "i2": "h",
+    "i4": "i",
+    "i8": "q",
+    "f4": "f",
+    "f8": "d",
+}
+_INTEGER_DTYPES = (
+    ("u1", 0, 2**8 - 1),
+    ("i1", -(2**7), 2**7 - 1),
+    ("u2", 0, 2**16 - 1),
+    ("i2", -(2**15), 2**15 - 1),
+    ("u4", 0, 2**32 - 1),
+    ("i4", -(2**31), 2**31 - 1),
+    ("i8", -(2**63), 2**63 - 1),
+)
+
+
+class MalformedPayload(ValueError):
+    pass
+
+
+def encode(template, columns):
+    """Return the encoding of ``template`` and its fields as bytes.
+
+    ``template`` maps id, upload_id, created_at (already a string) and
+    version. ``columns`` maps every name in ``NUMBER_COLUMNS`` and
+    ``STRING_COLUMNS`` to a sequence with one value per field, in field
+    order; ``validation`` values are JSON-serializable objects.
+    """
+    count = len(columns["id"])
+    codes = {}
+    packed = []
+    for name in NUMBER_COLUMNS:
+        values = columns[name]
+        dtype = _float_dtype(values) if name in FLOAT_COLUMNS else _integer_dtype(values)
+        packed.append((name, dtype, values))
+    for name in STRING_COLUMNS:
+        values = columns[name]
+        if name == "validation":
+            values = [_RULES_ENCODER.encode(rules) for rules in values]
+        indexes = [codes.setdefault(text, len(codes)) for text in values]
+        packed.append((name, None, indexes))
+    strings = list(codes)
+    string_dtype = _integer_dtype([len(strings)])
+
+    descriptors, chunks, offset = [], [], 0
+    for name, dtype, values in packed:
+        dtype = dtype or string_dtype
+        data = _pack(dtype, values)
+        descriptors.append([name, dtype, offset])
+        chunks.append(data + b"\0" * _padding(len(data)))
+        offset += len(chunks[-1])
+
+    header = json.dumps(
+        {
+            "template": template,
+            "count": count,
+            "strings": strings,
+            "columns": descriptors,
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode()
+    header += b" " * _padding(_PREAMBLE.size + len(header))
+    preamble = _PREAMBLE.pack(MAGIC, FORMAT_VERSION, 0, len(header))
+    return b"".join([preamble, header, *chunks])
+
+
+def decode(data):
+    """Return ``(template, columns)`` as passed to ``encode``.
+
+    Numbers come back as lists of ints and floats, strings as lists of
+    str, and ``validation`` as decoded objects. Raises ``MalformedPayload``
+    for anything that is not a complete encoding.
+    """
+    data = memoryview(data)
+    template, count, strings, descriptors, start = _read_header(data)
+    columns = {}
+    for name in NUMBER_COLUMNS + STRING_COLUMNS:
+        if name not in descriptors:
+            raise MalformedPayload(f"Missing column {name}")
+        values = _unpack(data, start, count, name, *descriptors[name])
+        if name in STRING_COLUMNS:
+            try:
+                values = [strings[index] for index in values]
+            except IndexError:
+                raise MalformedPayload(f"Column {name} indexes past the string table") from None
+        columns[name] = values
+    try:
+        columns["validation"] = [json.loads(text) for text in columns["validation"]]
+    except ValueError:
+        raise MalformedPayload("Invalid validation rules") from None
+    return template, columns
+
+
+def _read_header(data):
+    try:
+        magic, version, _, header_length = _PREAMBLE.unpack_from(data)
+    except struct.error:
+        raise MalformedPayload("Payload is too short") from None
+    if magic != MAGIC:
+        raise MalformedPayload("Not a columnar template payload")
+    if version != FORMAT_VERSION:
+        raise MalformedPayload(f"Unsupported format version {version}")
+    start = _PREAMBLE.size + header_length
+    try:
+        header = json.loads(bytes(data[_PREAMBLE.size : start]))
+        template, count, strings = header["template"], header["count"], header["strings"]
+        descriptors = {name: (dtype, offset) for name, dtype, offset in header["columns"]}
+    except (ValueError, KeyError, TypeError) as e:
+        raise MalformedPayload(f"Invalid header: {e}") from None
+    if not isinstance(count, int) or count < 0 or not isinstance(strings, list):
+        raise MalformedPayload("Invalid header")
+    return template, count, strings, descriptors, start
+
+
+def _pack(dtype, values):
+    packed = array(_TYPECODES[dtype], values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack(data, start, count, name, dtype, offset):
+    typecode = _TYPECODES.get(dtype)
+    if typecode is None:
+        raise MalformedPayload(f"Unknown type {dtype!r} of column {name}")
+    values = array(typecode)
+    if not isinstance(offset, int) or offset < 0:
+        raise MalformedPayload(f"Invalid offset of column {name}")
+    begin = start + offset
+    end = begin + count * values.itemsize
+    if end > len(data):
+        raise MalformedPayload(f"Column {name} runs past the end of the payload")
+    values.frombytes(data[begin:end])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+def _integer_dtype(values):
+    low, high = (min(values), max(values)) if len(values) else (0, 0)
+    for dtype, minimum, maximum in _INTEGER_DTYPES:
+        if minimum <= low and high <= maximum:
+            return dtype
+    raise ValueError(f"Integer out of range: {low if low < 0 else high}")
+
+
+def _float_dtype(values):
+    """Return ``f4`` when every value survives the round trip through it, else ``f8``."""
+    values = list(values)
+    return "f4" if array("f", values).tolist() == values else "f8"
+
+
+def _padding(length):
+    return -length % _ALIGNMENT
@@ -0,0 +1,332 @@
+"""Detect fillable fields in a PDF.
+
+Fields come from AcroForm widgets when the document has any, and otherwise
+from page geometry: short horizontal rules become text fields, small squares
+checkboxes and wide boxes text fields. Coordinates are PDF points with the
+origin at the top-left corner of the page, like the rest of the API.
+
+This module only depends on pypdf and ``app.blobstore`` so pages can be
+processed in worker processes started with ``spawn``. Files are read through
+a memory map rather than copied into memory by pypdf.
+"""
+
+import re
+
+from app.blobstore import mapped
+from pypdf import PdfReader
+from pypdf.generic import ContentStream
+
+# Bump when the detection rules change so cached results are recomputed
+EXTRACTOR_VERSION = 1
+
+FIELD_ID_LENGTH = 32
+LABEL_LENGTH = 128
+
+WIDGET_TYPES = {"/Tx": "text", "/Btn": "checkbox", "/Ch": "select", "/Sig": "signature"}
+RADIO_FLAG = 1 << 15
+REQUIRED_FLAG = 1 << 1
+
+MIN_LINE_LENGTH = 36
+LINE_FIELD_HEIGHT = 14
+CHECKBOX_SIZE = (6, 24)
+TEXT_BOX_HEIGHT = (10, 60)
+LABEL_DISTANCE = 200
+
+PAINT_OPERATORS = {b"S", b"s", b"f", b"F", b"f*", b"B", b"B*", b"b", b"b*"}
+
+
+def has_acroform(pdf_path):
+    with mapped(pdf_path) as content:
+        reader = PdfReader(content)
+        acroform = reader.trailer["/Root"].get("/AcroForm")
+        return bool(acroform and acroform.get_object().get("/Fields"))
+
+
+def page_count(pdf_path):
+    with mapped(pdf_path) as content:
+        return len(PdfReader(content).pages)
+
+
+def extract_pages(pdf_path, page_indices, use_widgets):
+    """Extract field dicts for the given 0-based pages."""
+    fields = []
+    with mapped(pdf_path) as content:
+        reader = PdfReader(content)
+        for index in page_indices:
+            page = reader.pages[index]
+            if use_widgets:
+                fields.extend(_widget_fields(page, index + 1))
+            else:
+                fields.extend(_geometry_fields(page, index + 1))
+    return fields
+
+
+def assign_field_ids(fields):
+    """Make ``field_id`` unique and short enough for the ``Field`` model."""
+    seen = set()
+    for position, field in enumerate(fields, start=1):
+        base = re.sub(r"[^A-Za-z0-9_.-]+", "_", field["field_id"])[:FIELD_ID_LENGTH] or "field"
+        field_id = base
+        suffix = 2
+        while field_id in seen:
+            tail = f"-{suffix}"
+            field_id = base[: FIELD_ID_LENGTH - len(tail)] + tail
+            suffix += 1
+        seen.add(field_id)
+        field["field_id"] = field_id
+        field["label"] = field["label"][:LABEL_LENGTH] or f"Field {position}"
+    return fields
+
+
+def _page_box(page):
+    box = page.mediabox
+    return float(box.left), float(box.bottom), float(box.width), float(box.height)
+
+
+def _make_field(field_id, field_type, label, page_number, box, page_box, **extra):
+    left, bottom, _, height = page_box
+    x0, y0, x1, y1 = box
+    field = {
+        "field_id": field_id,
+        "type": field_type,
+        "label": label,
+        "placeholder": "",
+        "page_number": page_number,
+        "x": round(x0 - left, 2),
+        "y": round(height - (y1 - bottom), 2),
+        "width": round(x1 - x0, 2),
+        "height": round(y1 - y0, 2),
+        "validation": {},
+        "value": "",
+    }
+    field.update(extra)
+    return field
+
+
+def _inherited(widget, key):
+    node = widget
+    while node is not None:
+        if key in node:
+            return node[key]
+        parent = node.get("/Parent")
+        node = parent.get_object() if parent is not None else None
+    return None
+
+
+def _full_name(widget):
+    parts = []
+    node = widget
+    while node is not None:
+        if "/T" in node:
+            parts.append(str(node["/T"]))
+        parent = node.get("/Parent")
+        node = parent.get_object() if parent is not None else None
+    return ".".join(reversed(parts))
+
+
+def _widget_fields(page, page_number):
+    page_box = _page_box(page)
+    fields = []
+    for annotation in page.get("/Annots") or []:
+        widget = annotation.get_object()
+        if widget.get("/Subtype") != "/Widget" or "/Rect" not in widget:
+            continue
+        x0, y0, x1, y1 = (float(v) for v in widget["/Rect"])
+        box = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+
+        flags = int(_inherited(widget, "/Ff") or 0)
+        field_type = WIDGET_TYPES.get(_inherited(widget, "/FT"), "text")
+        if field_type == "checkbox" and flags & RADIO_FLAG:
+            field_type = "radio"
+
+        validation = {}
+        if flags & REQUIRED_FLAG:
+            validation["required"] = True
+        max_length = _inherited(widget, "/MaxLen")
+        if max_length is not None:
+            validation["max_length"] = int(max_length)
+
+        name = _full_name(widget)
+        label = str(_inherited(widget, "/TU") or name.rsplit(".", 1)[-1])
+        value = _inherited(widget, "/V")
+        fields.append(
+            _make_field(
+                name or f"p{page_number}_{len(fields) + 1}",
+                field_type,
+                label,
+                page_number,
+                box,
+                page_box,
+                validation=validation,
+                value=str(value) if isinstance(value, str) else "",
+            )
+        )
+    return fields
+
+
+def _multiply(a, b):
+    return (
+        a[0] * b[0] + a[1] * b[2],
+        a[0] * b[1] + a[1] * b[3],
+        a[2] * b[0] + a[3] * b[2],
+        a[2] * b[1] + a[3] * b[3],
+        a[4] * b[0] + a[5] * b[2] + b[4],
+        a[4] * b[1] + a[5] * b[3] + b[5],
+    )
+
+
+def _apply(matrix, x, y):
+    return (
+        matrix[0] * x + matrix[2] * y + matrix[4],
+        matrix[1] * x + matrix[3] * y + matrix[5],
+    )
+
+
+class _PathCollector:
+    """Walks a content stream and collects stroked or filled rectangles and lines."""
+
+    PATH_OPERATORS = {
+        b"q": "push",
+        b"Q": "pop",
+        b"cm": "transform",
+        b"m": "move_to",
+        b"l": "line_to",
+        b"re": "rectangle",
+    }
+
+    def __init__(self):
+        """Start with the identity transform and no collected shapes."""
+        self.ctm = (1, 0, 0, 1, 0, 0)
+        self.stack = []
+        self.pending = []
+        self.current = None
+        self.rects = []
+        self.lines = []
+
+    def feed(self, operands, operator):
+        if operator in self.PATH_OPERATORS:
+            getattr(self, self.PATH_OPERATORS[operator])(*(float(v) for v in operands))
+        elif operator in PAINT_OPERATORS:
+            self._commit()
+        elif operator == b"n":
+            # End of a clipping path, nothing is drawn
+            self.pending = []
+
+    def push(self):
+        self.stack.append(self.ctm)
+
+    def pop(self):
+        if self.stack:
+            self.ctm = self.stack.pop()
+
+    def transform(self, *matrix):
+        self.ctm = _multiply(matrix, self.ctm)
+
+    def move_to(self, x, y):
+        self.current = _apply(self.ctm, x, y)
+
+    def line_to(self, x, y):
+        end = _apply(self.ctm, x, y)
+        if self.current is not None:
+            self.pending.append(("line", self.current, end))
+        self.current = end
+
+    def rectangle(self, x, y, w, h):
+        corners = [_apply(self.ctm, x + dx, y + dy) for dx in (0, w) for dy in (0, h)]
+        xs = [c[0] for c in corners]
+        ys = [c[1] for c in corners]
+        self.pending.append(("rect", (min(xs), min(ys)), (max(xs), max(ys))))
+
+    def _commit(self):
+        for kind, start, end in self.pending:
+            if kind == "rect":
+                self.rects.append((start[0], start[1], end[0], end[1]))
+            else:
+                self.lines.append((start, end))
+        self.pending = []
+
+
+def _text_runs(page):
+    runs = []
+
+    def visitor(text, cm, tm, font_dict, font_size):
+        if text.strip():
+            x, y = _apply(_multiply(tm, cm), 0, 0)
+            runs.append((x, y, text.strip()))
+
+    page.extract_text(visitor_text=visitor)
+    return runs
+
+
+def _nearest_label(runs, box):
+    """Text to the left on the same row, or else just above, closest first."""
+    x0, y0, x1, y1 = box
+    best = None
+    for x, y, text in runs:
+        same_row = x < x0 and y0 - 4 <= y <= y1 + 4
+        above = x0 - 10 <= x <= x1 and y1 <= y <= y1 + 24
+        if not (same_row or above):
+            continue
+        distance = (x0 - x) if same_row else (y - y1)
+        if distance <= LABEL_DISTANCE and (best is None or distance < best[0]):
+            best = (distance, text)
+    return best[1] if best else ""
+
+
+def _classify_rect(rect, page_width, page_height):
+    x0, y0, x1, y1 = rect
+    width, height = x1 - x0, y1 - y0
+    if height < 2 and width >= MIN_LINE_LENGTH:
+        # A filled hairline is drawn as a thin rectangle
+        return "line"
+    if CHECKBOX_SIZE[0] <= width <= CHECKBOX_SIZE[1] and abs(width - height) < 3:
+        return "checkbox"
+    if TEXT_BOX_HEIGHT[0] <= height <= TEXT_BOX_HEIGHT[1] and width >= 40 and width >= 2 * height:
+        if width < 0.9 * page_width or height < 0.5 * page_height:
+            return "text"
+    return None
+
+
+def _geometry_boxes(page):
+    collector = _PathCollector()
+    contents = page.get_contents()
+    if contents is None:
+        return []
+    if not isinstance(contents, ContentStream):
+        contents = ContentStream(contents, page.pdf)
+    for operands, operator in contents.operations:
+        collector.feed(operands, operator)
+
+    _, _, page_width, page_height = _page_box(page)
+    boxes = []
+    for rect in collector.rects:
+        kind = _classify_rect(rect, page_width, page_height)
+        if kind == "line":
+            x0, _, x1, y1 = rect
+            boxes.append(("text", (x0, y1, x1, y1 + LINE_FIELD_HEIGHT)))
+        elif kind:
+            boxes.append((kind, rect))
+    for (sx, sy), (ex, ey) in collector.lines:
+        if abs(ey - sy) < 0.5 and abs(ex - sx) >= MIN_LINE_LENGTH:
+            x0, x1 = sorted((sx, ex))
+            boxes.append(("text", (x0, sy, x1, sy + LINE_FIELD_HEIGHT)))
+    # Reading order: top to bottom, then left to right
+    boxes.sort(key=lambda item: (-item[1][3], item[1][0]))
+    return boxes
+
+
+def _geometry_fields(page, page_number):
+    page_box = _page_box(page)
+    boxes = _geometry_boxes(page)
+    runs = _text_runs(page) if boxes else []
+    return [
+        _make_field(
+            f"p{page_number}_{index}",
+            kind,
+            _nearest_label(runs, box),
+            page_number,
+            box,
+            page_box,
+        )
+        for index, (kind, box) in enumerate(boxes, start=1)
+    ]
@@ -0,0 +1,227 @@
+"""Write field values into a PDF as an incremental update.
+
+The original file is never rewritten: the filled document is the original
+bytes followed by an update section holding one overlay content stream per
+filled page, new versions of those page objects and a cross-reference
+section chained to the original one with ``/Prev``. Values are drawn as page
+content inside each field's box, so the result looks the same in every
+viewer whether or not the source had AcroForm widgets.
+"""
+
+import io
+import re
+
+from app.blobstore import map_file
+from pypdf import PdfReader
+from pypdf.errors import PyPdfError
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+
+FONT_NAME = "/V2PHelv"
+MAX_FONT_SIZE = 10
+CHECKED_VALUES = {"1", "true", "yes", "on", "x", "checked"}
+
+_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+
+
+class SourceDocument:
+    """The facts about a source PDF needed to append updates to it.
+
+    Building one parses the file once; instances are cached per blob digest
+    (see ``templates.rendering``) so repeated renders skip the parsing. The
+    file is only mapped while it is parsed, so a cached instance holds no
+    file handle or map; renders map the file again to stream it.
+    """
+
+    def __init__(self, path):
+        """Parse ``path`` and serialize the page objects an update will replace.
+
+        Raises ``ValueError`` for an empty, encrypted or unreadable PDF.
+        """
+        try:
+            content = map_file(path)
+        except ValueError:
+            raise ValueError("PDF is empty") from None
+        with content:
+            self.path = path
+            self.size = len(content)
+            try:
+                self._parse(content)
+            except PyPdfError as e:
+                raise ValueError(f"Unreadable PDF: {e}") from None
+
+    def _parse(self, content):
+        reader = PdfReader(content)
+        if reader.is_encrypted:
+            raise ValueError("Encrypted PDFs are not supported")
+
+        tail = content[max(self.size - 2048, 0) :]
+        matches = _STARTXREF.findall(tail)
+        if not matches:
+            raise ValueError("PDF has no startxref")
+        self.startxref = int(matches[-1])
+
+        trailer = reader.trailer
+        self.root = trailer.raw_get("/Root")
+        self.info = trailer.raw_get("/Info") if "/Info" in trailer else None
+        self.file_id = trailer.get("/ID")
+        self.next_number = int(trailer["/Size"])
+
+        # Object numbers for the update are fixed per document, so page
+        # objects can be serialized once and reused by every render.
+        self.font_number = self.next_number
+        self.open_number = self.next_number + 1
+        self.pages = []
+        self._page_objects = []
+        for index, page in enumerate(reader.pages):
+            box = page.mediabox
+            overlay_number = self.next_number + 2 + index
+            self.pages.append(
+                {
+                    "ref": page.indirect_reference,
+                    "overlay_number": overlay_number,
+                    "origin": (float(box.left), float(box.bottom)),
+                    "height": float(box.height),
+                }
+            )
+            self._page_objects.append(self._updated_page(page, overlay_number))
+
+    def page_object(self, index):
+        """Return the serialized replacement for page ``index``."""
+        return self._page_objects[index]
+
+    def _updated_page(self, page, overlay_number):
+        """Serialize the page dictionary with the overlay appended to its content."""
+        contents = page.raw_get("/Contents") if "/Contents" in page else ArrayObject()
+        resolved = contents.get_object() if isinstance(contents, IndirectObject) else contents
+        if isinstance(resolved, ArrayObject):
+            streams = list(resolved)
+        else:
+            streams = [contents]
+        new_page = DictionaryObject(page)
+        # Wrap the original content in q/Q so its graphics state cannot leak
+        new_page[NameObject("/Contents")] = ArrayObject(
+            [IndirectObject(self.open_number, 0, None)]
+            + streams
+            + [IndirectObject(overlay_number, 0, None)]
+        )
+
+        resources = DictionaryObject(page.get("/Resources") or {})
+        fonts = DictionaryObject(resources.get("/Font") or {})
+        fonts[NameObject(FONT_NAME)] = IndirectObject(self.font_number, 0, None)
+        resources[NameObject("/Font")] = fonts
+        new_page[NameObject("/Resources")] = resources
+
+        buffer = io.BytesIO()
+        new_page.write_to_stream(buffer)
+        return buffer.getvalue()
+
+
+def field_box(document, field):
+    """Convert a field's top-left based API box to ``(x, y, w, h)`` in PDF user space."""
+    page = document.pages[field["page_number"] - 1]
+    left, bottom = page["origin"]
+    x0 = left + field["x"]
+    y1 = bottom + page["height"] - field["y"]
+    return x0, y1 - field["height"], field["width"], field["height"]
+
+
+def overlay_content(document, fields):
+    """Build the content stream drawing the values of the given fields of one page."""
+    commands = [b"Q"]
+    for field in fields:
+        text = _display_text(field)
+        if not text:
+            continue
+        x, y, width, height = field_box(document, field)
+        size = max(min(MAX_FONT_SIZE, height * 0.7), 4)
+        baseline = y + (height - size) / 2 + size * 0.2
+        # Clip to the field box so long values do not spill over the page
+        commands.append(
+            b"q %.2f %.2f %.2f %.2f re W n BT %s %.2f Tf %.2f %.2f Td (%s) Tj ET Q"
+            % (x, y, width, height, FONT_NAME.encode(), size, x + 1, baseline, _escape(text))
+        )
+    return b"\n".join(commands)
+
+
+def build_update(document, overlays):
+    """Build the update section for ``{page_index: overlay_content}``.
+
+    Returns bytes to append to the original file.
+    """
+    out = io.BytesIO()
+    out.write(b"\n")
+    offsets = {}
+
+    def write_object(number, generation, body):
+        offsets[number] = (document.size + out.tell(), generation)
+        out.write(b"%d %d obj\n" % (number, generation))
+        out.write(body)
+        out.write(b"\nendobj\n")
+
+    write_object(
+        document.font_number,
+        0,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    )
+    write_object(document.open_number, 0, _stream(b"q"))
+    for index, content in sorted(overlays.items()):
+        page = document.pages[index]
+        write_object(page["overlay_number"], 0, _stream(content))
+        write_object(page["ref"].idnum, page["ref"].generation, document.page_object(index))
+
+    xref_offset = document.size + out.tell()
+    out.write(b"xref\n")
+    for start, entries in _subsections(sorted(offsets.items())):
+        out.write(b"%d %d\n" % (start, len(entries)))
+        for offset, generation in entries:
+            out.write(b"%010d %05d n\r\n" % (offset, generation))
+
+    size = document.next_number + 2 + len(document.pages)
+    out.write(b"trailer\n")
+    out.write(_trailer(document, size))
+    out.write(b"\nstartxref\n%d\n%%%%EOF\n" % xref_offset)
+    return out.getvalue()
+
+
+def _trailer(document, size):
+    trailer = DictionaryObject(
+        {
+            NameObject("/Size"): NumberObject(size),
+            NameObject("/Root"): document.root,
+            NameObject("/Prev"): NumberObject(document.startxref),
+        }
+    )
+    if document.info is not None:
+        trailer[NameObject("/Info")] = document.info
+    if document.file_id is not None:
+        trailer[NameObject("/ID")] = document.file_id
+    buffer = io.BytesIO()
+    trailer.write_to_stream(buffer)
+    return buffer.getvalue()
+
+
+def _subsections(entries):
+    """Group ``[(number, entry), ...]`` into runs of consecutive object numbers."""
+    runs = []
+    for number, entry in entries:
+        if runs and runs[-1][0] + len(runs[-1][1]) == number:
+            runs[-1][1].append(entry)
+        else:
+            runs.append((number, [entry]))
+    return runs
+
+
+def _stream(content):
+    return b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content)
+
+
+def _display_text(field):
+    value = (field.get("value") or "").strip()
+    if field.get("type") in ("checkbox", "radio"):
+        return "X" if value.lower() in CHECKED_VALUES else ""
+    return " ".join(value.split())
+
+
+def _escape(text):
+    data = text.encode("cp1252", errors="replace")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
@@ -0,0 +1,141 @@
+"""Keyset-paginated template listing.
+
+Pages are ordered newest first on ``(created_at, id)`` and continue from an
+opaque cursor holding the last row's key, so every page is an index range
+scan however deep the client pages; there is no OFFSET. Only the requested
+columns are selected. ``field_count`` is a correlated count and nested
+``fields`` are loaded with one extra query for the whole page, only when
+asked for.
+"""
+
+import base64
+import json
+
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_datetime
+
+from . import payloads
+from .models import Field, Template
+
+COLUMNS = ("id", "upload_id", "created_at", "version", "field_count", "fields")
+DEFAULT_COLUMNS = ("id", "upload_id", "created_at", "version", "field_count")
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def parse_columns(value):
+    """Parse ``?fields=`` into a tuple of columns, in ``COLUMNS`` order."""
+    if not value:
+        return DEFAULT_COLUMNS
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = requested - set(COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(column for column in COLUMNS if column in requested)
+
+
+def parse_limit(value):
+    if value in (None, ""):
+        return PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid value for limit: {value}") from None
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def encode_cursor(created_at, pk):
+    raw = json.dumps([created_at.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return the ``(created_at, id)`` key a cursor continues after."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, pk = json.loads(raw)
+        created_at = parse_datetime(created_at)
+    except (ValueError, TypeError):
+        created_at = pk = None
+    if created_at is None or not isinstance(pk, int):
+        raise ValueError("Invalid cursor")
+    return created_at, pk
+
+
+class TemplatePage:
+    """One page of the listing for ``GET /api/templates/`` query parameters."""
+
+    def __init__(self, params):
+        """Validate ``params``; raises ``ValueError`` for bad input."""
+        self.columns = parse_columns(params.get("fields"))
+        self.limit = parse_limit(params.get("limit"))
+        self.after = decode_cursor(params["cursor"]) if params.get("cursor") else None
+
+    def queryset(self):
+        """Rows of the page plus one, which tells whether another page follows."""
+        templates = Template.objects.order_by("-created_at", "-id")
+        if self.after is not None:
+            created_at, pk = self.after
+            # The OR alone is not sargable; the bound on created_at lets the
+            # index range start at the cursor instead of the newest row
+            templates = templates.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk),
+                created_at__lte=created_at,
+            )
+        if "field_count" in self.columns:
+            templates = templates.annotate(field_count=_field_count())
+        selected = {"id", "created_at"} | set(self.columns) - {"fields"}
+        return templates.values(*(column for column in COLUMNS if column in selected))[
+            : self.limit + 1
+        ]
+
+    def field_queryset(self, rows):
+        templates = Field.objects.filter(template_id__in=[row["id"] for row in rows])
+        return payloads.field_rows(templates)
+
+    def build(self, rows, fields=()):
+        """Shape fetched rows into ``(results, next_cursor)``."""
+        rows = list(rows)
+        more = len(rows) > self.limit
+        rows = rows[: self.limit]
+        nested = {}
+        for field in payloads.field_dicts(fields):
+            nested.setdefault(field["template"], []).append(field)
+
+        results = []
+        for row in rows:
+            result = {column: row[column] for column in self.columns if column != "fields"}
+            if "created_at" in result:
+                result["created_at"] = payloads.format_datetime(result["created_at"])
+            if "fields" in self.columns:
+                result["fields"] = nested.get(row["id"], [])
+            results.append(result)
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"]) if more else None
+        return results, next_cursor
+
+    def fetch(self):
+        rows = list(self.queryset())
+        fields = self.field_queryset(rows) if "fields" in self.columns and rows else ()
+        return self.build(rows, fields)
+
+    async def afetch(self):
+        rows = [row async for row in self.queryset()]
+        fields = []
+        if "fields" in self.columns and rows:
+            fields = [field async for field in self.field_queryset(rows)]
+        return self.build(rows, fields)
+
+
+def _field_count():
+    # A correlated count keeps the page an ordered index scan, unlike a GROUP BY join
+    counts = (
+        Field.objects.filter(template=OuterRef("pk"))
+        .order_by()
+        .values("template")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
@@ -0,0 +1,84 @@
+import sys
+
+from app.pages import render_workers
+from app.storage import blob_path
+from django.core.management.base import BaseCommand, CommandError
+from templates import batch, rendering
+from templates.models import Template
+from templates.validation import template_validator
+
+
+class Command(BaseCommand):
+    help = "Fill a template once per JSONL line or CSV row of value sets"
+
+    def add_arguments(self, parser):
+        parser.add_argument("template_id", type=int)
+        parser.add_argument("input", help="JSONL or CSV file with one value set per record, or -")
+        parser.add_argument("--format", choices=["jsonl", "csv"], help="Defaults to the extension")
+        output = parser.add_mutually_exclusive_group(required=True)
+        output.add_argument("--output-dir", help="Write one PDF per value set into this directory")
+        output.add_argument("--zip", help="Write all PDFs into this ZIP file")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Render processes (default: one per core, 0 renders in this process)",
+        )
+
+    def handle(self, *args, **options):
+        template = Template.objects.filter(pk=options["template_id"]).first()
+        if template is None:
+            raise CommandError(f"Template {options['template_id']} does not exist")
+        sha256 = rendering.template_source(template)
+        if sha256 is None:
+            raise CommandError(f"Template {template.pk} has no uploaded PDF")
+
+        fmt = options["format"] or ("csv" if options["input"].endswith(".csv") else "jsonl")
+        workers = render_workers() if options["workers"] is None else options["workers"]
+        source = blob_path(sha256)
+        try:
+            rendering.source_document(sha256)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot fill the uploaded PDF: {e}") from None
+        fields = rendering.field_geometry(template)
+
+        rejected = []
+        stream = sys.stdin.buffer if options["input"] == "-" else open(options["input"], "rb")
+        executor = batch.process_pool(workers) if workers > 0 else None
+        try:
+            with stream:
+                documents = batch.filled_documents(
+                    source,
+                    fields,
+                    batch.read_value_sets(stream, fmt),
+                    executor=executor,
+                    validate=template_validator(template.pk).validate,
+                    rejected=rejected,
+                    window=2 * workers,
+                )
+                if options["output_dir"]:
+                    count = batch.write_directory(
+                        source, documents, options["output_dir"], rejected
+                    )
+                else:
+                    count = self._write_zip(source, documents, options["zip"], rejected)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(f"Rendered {count} document(s)")
+        if rejected:
+            self.stdout.write(f"Skipped {len(rejected)} invalid record(s), see {batch.ERRORS_NAME}")
+
+    def _write_zip(self, source, documents, path, rejected):
+        count = 0
+
+        def counted():
+            nonlocal count
+            for item in documents:
+                count += 1
+                yield item
+
+        with open(path, "wb") as out:
+            for chunk in batch.stream_zip(source, counted(), rejected):
+                out.write(chunk)
+        return count
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('templates', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='template',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
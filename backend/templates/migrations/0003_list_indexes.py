@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('templates', '0002_template_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='field',
+            index=models.Index(fields=['template', 'page_number'], name='field_template_page'),
+        ),
+        migrations.AddIndex(
+            model_name='template',
+            index=models.Index(fields=['-created_at', '-id'], name='template_created_id'),
+        ),
+    ]
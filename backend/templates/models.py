@@ -6,6 +6,11 @@ from django.db import models
 class Template(models.Model):
     upload_id = models.CharField(max_length=64, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        # Keyset pagination of the template list, newest first
+        indexes = [models.Index(fields=["-created_at", "-id"], name="template_created_id")]
 
     def __str__(self):
         return f"Template {self.upload_id}"
@@ -25,5 +30,8 @@ class Field(models.Model):
     validation = models.JSONField(default=dict)
     value = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["template", "page_number"], name="field_template_page")]
+
     def __str__(self):
         return f"{self.label} ({self.type})"
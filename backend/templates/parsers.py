@@ -0,0 +1,38 @@
+"""Reading templates sent in the ``columnar`` encoding.
+
+A client that downloaded a template as columns can create a template from
+the same bytes: ``ColumnarParser`` turns them into the data
+``TemplateSerializer`` takes, so an import is validated exactly like a JSON
+create. Read-only values in the payload (ids, ``created_at``, ``version``)
+are ignored, and the ``upload_id`` can be replaced with a query parameter
+to copy a template onto another upload.
+"""
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from . import columnar, payloads
+
+
+def template_data(body, upload_id=None):
+    """Return ``TemplateSerializer`` input for a ``columnar`` body.
+
+    Raises ``columnar.MalformedPayload``.
+    """
+    template, columns = columnar.decode(body)
+    if not isinstance(template, dict):
+        raise columnar.MalformedPayload("Invalid header")
+    data = payloads.decoded_detail(template, columns)
+    return {"upload_id": upload_id or data.get("upload_id"), "fields": data["fields"]}
+
+
+class ColumnarParser(BaseParser):
+    media_type = columnar.MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get("request")
+        upload_id = request.query_params.get("upload_id") if request is not None else None
+        try:
+            return template_data(stream.read() if stream is not None else b"", upload_id)
+        except columnar.MalformedPayload as e:
+            raise ParseError(f"Malformed columnar payload: {e}") from None
@@ -0,0 +1,160 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, TextField, Value, When
+
+from .cache import template_cache
+from .models import Field, Template
+from .validation import TemplateValidator
+
+# Keeps each INSERT/UPDATE statement well under SQLite's bound-parameter limit.
+BULK_BATCH_SIZE = 500
+
+FIELD_COLUMNS = (
+    "field_id",
+    "type",
+    "label",
+    "placeholder",
+    "page_number",
+    "x",
+    "y",
+    "width",
+    "height",
+    "validation",
+    "value",
+)
+
+
+def bulk_create_fields(template, fields_data):
+    """Insert all fields of ``template`` with batched INSERT statements."""
+    rows = [Field(template=template, **field_data) for field_data in fields_data]
+    return Field.objects.bulk_create(rows, batch_size=BULK_BATCH_SIZE)
+
+
+def sync_fields(template, fields_data):
+    """Make the fields of ``template`` match ``fields_data``, touching only changed rows.
+
+    Existing rows are matched to the incoming data by ``field_id``. Matched rows
+    are updated only when at least one column differs, unmatched incoming fields
+    are inserted and unmatched existing rows are deleted. Returns a
+    ``(created, updated, deleted)`` tuple of row counts.
+    """
+    existing = defaultdict(list)
+    for field in template.fields.order_by("id"):
+        existing[field.field_id].append(field)
+
+    to_create = []
+    to_update = []
+    changed_columns = set()
+    for field_data in fields_data:
+        candidates = existing.get(field_data["field_id"])
+        if not candidates:
+            to_create.append(Field(template=template, **field_data))
+            continue
+        field = candidates.pop(0)
+        changed = _apply_changes(field, field_data)
+        if changed:
+            to_update.append(field)
+            changed_columns.update(changed)
+
+    stale_ids = [field.pk for fields in existing.values() for field in fields]
+    if stale_ids:
+        Field.objects.filter(pk__in=stale_ids).delete()
+    if to_update:
+        Field.objects.bulk_update(to_update, sorted(changed_columns), batch_size=BULK_BATCH_SIZE)
+    if to_create:
+        Field.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+
+    # A prefetched ``template.fields`` would otherwise keep serving the old rows
+    getattr(template, "_prefetched_objects_cache", {}).pop("fields", None)
+    return len(to_create), len(to_update), len(stale_ids)
+
+
+class VersionConflict(Exception):
+    """The template changed since the version the client last saw."""
+
+    def __init__(self, current):
+        """Remember the ``current`` version so it can be reported back."""
+        super().__init__(f"Template is at version {current}")
+        self.current = current
+
+
+class UnknownFields(Exception):
+    pass
+
+
+class InvalidValues(Exception):
+    """Values failing their field's validation rules."""
+
+    def __init__(self, errors):
+        """Keep the ``{field_id: [errors]}`` so they can be reported back."""
+        super().__init__("Invalid field values")
+        self.errors = errors
+
+
+@transaction.atomic
+def update_field_values(template_id, version, values):
+    """Set ``Field.value`` for a ``{field_id: value}`` batch if ``version`` is current.
+
+    The template version is bumped with a compare-and-set, and all changed
+    values go out in one UPDATE. Values equal to the stored ones are skipped;
+    when nothing changes the version stays as it is. Returns
+    ``(version, {field_id: value})`` with the changed values only.
+
+    Raises ``Template.DoesNotExist``, ``VersionConflict`` for a stale
+    ``version``, ``UnknownFields`` for field ids the template lacks and
+    ``InvalidValues`` for values failing their field's validation rules.
+    """
+    current = Template.objects.filter(pk=template_id).values_list("version", flat=True).first()
+    if current is None:
+        raise Template.DoesNotExist
+    if current != version:
+        raise VersionConflict(current)
+
+    rows = list(
+        Field.objects.filter(template_id=template_id, field_id__in=values).values(
+            "field_id", "value", "type", "validation"
+        )
+    )
+    stored = {row["field_id"]: row["value"] for row in rows}
+    missing = sorted(set(values) - set(stored))
+    if missing:
+        raise UnknownFields(f"Unknown fields: {', '.join(missing)}")
+    # Rules are compiled once and shared, so this costs no more than the lookups
+    errors = TemplateValidator(rows).validate(values, partial=True)
+    if errors:
+        raise InvalidValues(errors)
+    changed = {field_id: value for field_id, value in values.items() if stored[field_id] != value}
+    if not changed:
+        return version, changed
+
+    # Guards against a writer that committed between the read above and now
+    bumped = Template.objects.filter(pk=template_id, version=version).update(
+        version=F("version") + 1
+    )
+    if not bumped:
+        raise VersionConflict(
+            Template.objects.filter(pk=template_id).values_list("version", flat=True).first()
+        )
+    Field.objects.filter(template_id=template_id, field_id__in=changed).update(
+        value=Case(
+            *(When(field_id=field_id, then=Value(value)) for field_id, value in changed.items()),
+            output_field=TextField(),
+        )
+    )
+
+    template_cache.invalidate(template_id)
+    transaction.on_commit(lambda: template_cache.invalidate(template_id))
+    return version + 1, changed
+
+
+def _apply_changes(field, field_data):
+    changed = []
+    for column in FIELD_COLUMNS:
+        if column not in field_data:
+            continue
+        value = field_data[column]
+        if getattr(field, column) != value:
+            setattr(field, column, value)
+            changed.append(column)
+    return changed
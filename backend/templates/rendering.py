@@ -0,0 +1,94 @@
+from itertools import groupby
+
+from app.blobstore import map_file
+from app.models import Upload
+from app.storage import blob_path
+from django.conf import settings
+
+from . import filling
+from .cache import LRUCache
+
+FIELD_GEOMETRY = ("field_id", "type", "page_number", "x", "y", "width", "height")
+FIELD_VALUES = FIELD_GEOMETRY + ("value",)
+
+_documents = None
+_overlays = None
+
+
+def _caches():
+    global _documents, _overlays
+    if _documents is None:
+        _documents = LRUCache(settings.RENDER_DOCUMENT_CACHE_SIZE)
+        _overlays = LRUCache(settings.RENDER_OVERLAY_CACHE_SIZE)
+    return _documents, _overlays
+
+
+def clear_caches():
+    global _documents, _overlays
+    _documents = _overlays = None
+
+
+def template_source(template):
+    """Return the blob digest of the PDF a template was built from, or None."""
+    return (
+        Upload.objects.filter(upload_id=template.upload_id)
+        .values_list("blob__sha256", flat=True)
+        .first()
+    )
+
+
+def field_geometry(template):
+    return list(template.fields.order_by("page_number", "id").values(*FIELD_GEOMETRY))
+
+
+def source_document(sha256):
+    documents, _ = _caches()
+    document = documents.get(sha256)
+    if document is None:
+        document = filling.SourceDocument(blob_path(sha256))
+        documents.set(sha256, document)
+    return document
+
+
+def render_update(template, sha256):
+    """Return ``(document, update_bytes)`` for the template's current values.
+
+    Overlay streams are cached per page on the page's field geometry and
+    values, so after a small edit only the pages that changed are redrawn.
+    An empty update means there is nothing to fill in.
+    """
+    _, overlays_cache = _caches()
+    document = source_document(sha256)
+    fields = template.fields.order_by("page_number", "id").values(*FIELD_VALUES)
+
+    overlays = {}
+    for page_number, page_fields in groupby(fields, key=lambda field: field["page_number"]):
+        if not 1 <= page_number <= len(document.pages):
+            continue
+        page_fields = list(page_fields)
+        key = (sha256, page_number, tuple(tuple(field.values()) for field in page_fields))
+        content = overlays_cache.get(key)
+        if content is None:
+            content = filling.overlay_content(document, page_fields)
+            overlays_cache.set(key, content)
+        if content != b"Q":
+            overlays[page_number - 1] = content
+
+    return document, filling.build_update(document, overlays) if overlays else b""
+
+
+def stream_filled(document, update, chunk_size=256 * 1024):
+    """Return an iterator over the original file followed by the update section.
+
+    The file is mapped right away, so a missing blob fails here rather than
+    halfway through a response; the map is closed when the iterator is
+    exhausted or closed.
+    """
+    return _filled_chunks(map_file(document.path), document.size, update, chunk_size)
+
+
+def _filled_chunks(content, size, update, chunk_size):
+    with content:
+        for offset in range(0, size, chunk_size):
+            yield content[offset : offset + chunk_size]
+    yield update
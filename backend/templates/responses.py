@@ -0,0 +1,47 @@
+"""Request parsing and response building shared by the sync and async template views."""
+
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from rest_framework.utils.urls import replace_query_param
+
+from . import payloads
+from .cache import template_cache
+
+
+def json_response(body, **kwargs):
+    """Respond with JSON already rendered by ``payloads.render``."""
+    return HttpResponse(body, content_type="application/json", **kwargs)
+
+
+def page_payload(request, results, cursor):
+    next_url = None
+    if cursor is not None:
+        next_url = replace_query_param(request.build_absolute_uri(), "cursor", cursor)
+    return {"results": results, "next": next_url}
+
+
+def detail_format(request):
+    """Return the template detail format the ``Accept`` header prefers, JSON by default."""
+    preferred = request.get_preferred_type(list(payloads.MEDIA_TYPES.values()))
+    for fmt, media_type in payloads.MEDIA_TYPES.items():
+        if media_type == preferred:
+            return fmt
+    return payloads.JSON
+
+
+def detail_response(body, pk, version, fmt):
+    headers = {"ETag": template_cache.etag(pk, version, fmt), "Vary": "Accept"}
+    return HttpResponse(body, content_type=payloads.MEDIA_TYPES[fmt], headers=headers)
+
+
+def not_modified(pk, version, fmt=payloads.JSON):
+    headers = {"ETag": template_cache.etag(pk, version, fmt), "Vary": "Accept"}
+    return HttpResponse(status=304, headers=headers)
+
+
+def etag_matches(request, etag):
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return "*" in etags or etag in etags
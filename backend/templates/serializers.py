@@ -1,6 +1,11 @@
+from django.db import transaction
+from django.db.models import F
 from rest_framework import serializers
 
+from .cache import template_cache
 from .models import Field, Template
+from .persistence import BULK_BATCH_SIZE, bulk_create_fields, sync_fields
+from .validation import InvalidRule, compile_rules
 
 
 class FieldSerializer(serializers.ModelSerializer):
@@ -9,36 +14,63 @@ class FieldSerializer(serializers.ModelSerializer):
         fields = "__all__"
         read_only_fields = ("template",)
 
+    def validate_validation(self, value):
+        # Rules that would not compile are rejected here rather than ignored later
+        try:
+            compile_rules(value)
+        except InvalidRule as e:
+            raise serializers.ValidationError(str(e)) from None
+        return value
+
 
 class TemplateSerializer(serializers.ModelSerializer):
     fields = FieldSerializer(many=True)
 
     class Meta:
         model = Template
-        fields = ["id", "upload_id", "created_at", "fields"]
-        read_only_fields = ("id", "created_at")
+        fields = ["id", "upload_id", "created_at", "version", "fields"]
+        read_only_fields = ("id", "created_at", "version")
 
+    @transaction.atomic
     def create(self, validated_data):
         fields_data = validated_data.pop("fields")
         template = Template.objects.create(**validated_data)
-        for field_data in fields_data:
-            field_data["template"] = template
-            Field.objects.create(**field_data)
+        bulk_create_fields(template, fields_data)
         return template
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         fields_data = validated_data.pop("fields", None)
         if fields_data is not None:
-            # Delete existing fields
-            instance.fields.all().delete()
-            # Create new fields
-            for field_data in fields_data:
-                field_data["template"] = instance
-                Field.objects.create(**field_data)
+            # Only insert, update or delete the fields that actually changed
+            sync_fields(instance, fields_data)
 
         # Update template fields
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
+        instance.version = F("version") + 1
         instance.save()
+        instance.refresh_from_db(fields=["version"])
+
+        # Drop the cached detail response now and again once the new version is visible
+        template_cache.invalidate(instance.pk)
+        transaction.on_commit(lambda: template_cache.invalidate(instance.pk))
 
         return instance
+
+
+class FieldValuesSerializer(serializers.Serializer):
+    """A batch of ``{field_id: value}`` changes against a known template version."""
+
+    version = serializers.IntegerField(min_value=1)
+    values = serializers.DictField(
+        child=serializers.CharField(allow_blank=True, trim_whitespace=False),
+        allow_empty=False,
+    )
+
+    def validate_values(self, values):
+        if len(values) > BULK_BATCH_SIZE:
+            raise serializers.ValidationError(
+                f"At most {BULK_BATCH_SIZE} fields can be changed at once."
+            )
+        return values
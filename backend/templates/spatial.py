@@ -0,0 +1,159 @@
+"""Per-page spatial index over field boxes.
+
+Boxes are kept as NumPy arrays of ``(x0, y0, x1, y1)`` in the API's top-left
+based page coordinates. Point queries look up candidates in a uniform grid;
+boxes too large for it, or with non-finite coordinates, are kept in a short
+list every point query checks, so stray geometry cannot blow up the grid.
+Nearest-field queries compute all distances on the page in one vectorized
+pass, and overlap reports use a sort-and-sweep along x. Indexes are cached
+per template id and version, so any field edit builds a fresh one.
+"""
+
+import math
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+
+from .cache import VersionedIndexCache
+from .models import Field
+
+# Boxes covering more grid cells than this are checked on every point query
+MAX_BOX_CELLS = 256
+
+
+class PageIndex:
+    """The fields of one page and a uniform grid over their boxes."""
+
+    def __init__(self, field_ids, boxes, cell_size):
+        """Index ``boxes``, an ``(n, 4)`` array of ``(x0, y0, x1, y1)`` rows."""
+        self.field_ids = field_ids
+        self.boxes = boxes
+        self.cell_size = cell_size
+        cells = defaultdict(list)
+        spanning = []
+        for position, box in enumerate(boxes.tolist()):
+            if not all(math.isfinite(coordinate) for coordinate in box):
+                spanning.append(position)
+                continue
+            x0, y0, x1, y1 = box
+            columns = range(self._cell(x0), self._cell(x1) + 1)
+            rows = range(self._cell(y0), self._cell(y1) + 1)
+            if len(columns) * len(rows) > MAX_BOX_CELLS:
+                spanning.append(position)
+                continue
+            for cx in columns:
+                for cy in rows:
+                    cells[(cx, cy)].append(position)
+        self.cells = {key: np.array(value, dtype=np.intp) for key, value in cells.items()}
+        self.spanning = np.array(spanning, dtype=np.intp)
+
+    def _cell(self, coordinate):
+        return math.floor(coordinate / self.cell_size)
+
+    def field(self, position, **extra):
+        x0, y0, x1, y1 = self.boxes[position].tolist()
+        return {
+            "field_id": self.field_ids[position],
+            "x": x0,
+            "y": y0,
+            "width": x1 - x0,
+            "height": y1 - y0,
+            **extra,
+        }
+
+    def hit_test(self, x, y):
+        """Return positions of the boxes containing the point, smallest box first."""
+        candidates = self.cells.get((self._cell(x), self._cell(y)))
+        if len(self.spanning):
+            if candidates is None:
+                candidates = self.spanning
+            else:
+                candidates = np.union1d(candidates, self.spanning)
+        if candidates is None:
+            return []
+        boxes = self.boxes[candidates]
+        inside = (boxes[:, 0] <= x) & (x <= boxes[:, 2]) & (boxes[:, 1] <= y) & (y <= boxes[:, 3])
+        hits = candidates[inside]
+        areas = _areas(self.boxes[hits])
+        return hits[np.argsort(areas, kind="stable")].tolist()
+
+    def nearest(self, x, y, limit=1, max_distance=None):
+        """Return ``[(position, distance)]`` of the closest boxes, closest first.
+
+        The distance is 0 for a box containing the point.
+        """
+        if not self.field_ids:
+            return []
+        boxes = self.boxes
+        dx = np.maximum(np.maximum(boxes[:, 0] - x, x - boxes[:, 2]), 0)
+        dy = np.maximum(np.maximum(boxes[:, 1] - y, y - boxes[:, 3]), 0)
+        distances = np.hypot(dx, dy)
+        limit = min(limit, len(distances))
+        closest = np.argpartition(distances, limit - 1)[:limit]
+        closest = closest[np.lexsort((closest, distances[closest]))]
+        if max_distance is not None:
+            closest = closest[distances[closest] <= max_distance]
+        return [(int(position), float(distances[position])) for position in closest]
+
+    def overlaps(self):
+        """Return ``[(a, b, area)]`` for every pair of boxes sharing a positive area."""
+        order = np.argsort(self.boxes[:, 0], kind="stable")
+        boxes = self.boxes[order]
+        # Boxes starting before box i ends along x are its only candidates
+        ends = np.searchsorted(boxes[:, 0], boxes[:, 2], side="left")
+        pairs = []
+        for i in range(len(boxes)):
+            others = boxes[i + 1 : ends[i]]
+            if not len(others):
+                continue
+            width = np.minimum(others[:, 2], boxes[i, 2]) - np.maximum(others[:, 0], boxes[i, 0])
+            height = np.minimum(others[:, 3], boxes[i, 3]) - np.maximum(others[:, 1], boxes[i, 1])
+            for offset in np.flatnonzero((width > 0) & (height > 0)).tolist():
+                a, b = sorted((int(order[i]), int(order[i + 1 + offset])))
+                pairs.append((a, b, float(width[offset] * height[offset])))
+        pairs.sort()
+        return pairs
+
+
+class TemplateIndex:
+    """Page indexes for one version of a template."""
+
+    def __init__(self, version, pages):
+        """Keep ``pages``, a ``{page_number: PageIndex}`` mapping."""
+        self.version = version
+        self.pages = pages
+
+    @classmethod
+    def build(cls, template_id, version, cell_size=None):
+        cell_size = cell_size or settings.SPATIAL_INDEX_CELL_SIZE
+        rows = (
+            Field.objects.filter(template_id=template_id)
+            .order_by("page_number", "id")
+            .values_list("page_number", "field_id", "x", "y", "width", "height")
+        )
+        grouped = defaultdict(lambda: ([], []))
+        for page_number, field_id, x, y, width, height in rows:
+            field_ids, boxes = grouped[page_number]
+            field_ids.append(field_id)
+            boxes.append((x, y, x + width, y + height))
+        pages = {
+            page_number: PageIndex(field_ids, np.array(boxes, dtype=np.float64), cell_size)
+            for page_number, (field_ids, boxes) in grouped.items()
+        }
+        return cls(version, pages)
+
+    def page(self, page_number):
+        return self.pages.get(page_number) or PageIndex([], np.empty((0, 4)), 1)
+
+
+def _areas(boxes):
+    return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+
+index_cache = VersionedIndexCache("SPATIAL_INDEX_CACHE_SIZE", TemplateIndex.build)
+
+
+def template_index(template_id):
+    """Return the index for the template's current version, building it on a miss."""
+    return index_cache.get(template_id)
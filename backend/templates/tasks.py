@@ -0,0 +1,11 @@
+from app.models import Upload
+from jobs.queue import task
+
+from . import autodetect
+
+
+@task("extract_template")
+def extract_template(upload_id):
+    upload = Upload.objects.select_related("blob").get(upload_id=upload_id)
+    template = autodetect.create_template(upload)
+    return {"template_id": template.pk, "fields": template.fields.count()}
@@ -0,0 +1,30 @@
+"""Factories shared by the template tests."""
+
+from .serializers import TemplateSerializer
+
+
+def make_field(index, **overrides):
+    """Return serializer input for a text field, with ``overrides`` applied."""
+    field = {
+        "field_id": f"field{index}",
+        "type": "text",
+        "label": f"Label {index}",
+        "placeholder": "",
+        "page_number": 1,
+        "x": 10.0 * index,
+        "y": 20.0,
+        "width": 100.0,
+        "height": 20.0,
+        "validation": {},
+        "value": "",
+    }
+    field.update(overrides)
+    return field
+
+
+def save_template(fields, instance=None):
+    """Create the ``bulk-upload`` template, or update ``instance``, through the serializer."""
+    data = {"upload_id": "bulk-upload", "fields": fields}
+    serializer = TemplateSerializer(instance, data=data)
+    assert serializer.is_valid(), serializer.errors
+    return serializer.save()
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from django.test import AsyncClient
+from templates.models import Template
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+PAYLOAD = {
+    "upload_id": "async-upload",
+    "fields": [
+        {
+            "field_id": "name",
+            "type": "text",
+            "label": "Name",
+            "page_number": 1,
+            "x": 10,
+            "y": 20,
+            "width": 100,
+            "height": 20,
+            "validation": {},
+        }
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def asgi_urls(settings):
+    settings.ROOT_URLCONF = "backend.asgi_urls"
+
+
+def request(method, path, **kwargs):
+    return asyncio.run(getattr(AsyncClient(), method)(path, **kwargs))
+
+
+def test_create_then_fetch_with_etag():
+    response = request("post", "/api/templates/", data=PAYLOAD, content_type="application/json")
+    assert response.status_code == 201
+    pk = response.json()["template_id"]
+    assert Template.objects.get(pk=pk).fields.count() == 1
+
+    response = request("get", f"/api/templates/{pk}/")
+    assert response.status_code == 200
+    assert response.json()["fields"][0]["field_id"] == "name"
+    etag = response["ETag"]
+
+    response = request("get", f"/api/templates/{pk}/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+
+
+def test_create_validation_errors():
+    response = request("post", "/api/templates/", data="{", content_type="application/json")
+    assert response.status_code == 400
+    response = request(
+        "post", "/api/templates/", data={"fields": []}, content_type="application/json"
+    )
+    assert response.status_code == 400
+    assert "upload_id" in response.json()
+
+
+def test_missing_template_is_404():
+    assert request("get", "/api/templates/999/").status_code == 404
+
+
+def test_list_matches_sync_view(api_client):
+    for i in range(3):
+        payload = {**PAYLOAD, "upload_id": f"async-upload-{i}"}
+        request("post", "/api/templates/", data=payload, content_type="application/json")
+
+    response = request("get", "/api/templates/", data={"limit": 2, "fields": "id,fields"})
+    assert response.status_code == 200
+    first = response.json()
+    assert len(first["results"]) == 2
+    assert first["results"][0]["fields"][0]["field_id"] == "name"
+
+    rest = request("get", first["next"]).json()
+    assert rest["next"] is None
+    ids = [row["id"] for row in first["results"] + rest["results"]]
+    synced = api_client.get("/api/templates/", {"fields": "id"}).json()["results"]
+    assert ids == [row["id"] for row in synced]
+
+
+def test_list_rejects_bad_cursor_and_other_methods():
+    assert request("get", "/api/templates/", data={"cursor": "x"}).status_code == 400
+    assert request("delete", "/api/templates/").status_code == 405
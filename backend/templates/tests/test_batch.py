@@ -0,0 +1,288 @@
+import io
+import json
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from app import pages
+from app.models import Blob, Upload
+from app.storage import blob_path
+from app.testing import make_pdf
+from django.core.management import call_command
+from pypdf import PdfReader
+from rest_framework.test import APIClient
+from templates import batch, rendering
+from templates.models import Field, Template
+
+VALUE_SETS = [
+    {"_name": "jane", "name": "Jane Doe", "agree": "yes"},
+    {"name": "John Roe", "city": "Basel"},
+    {"_name": "empty"},
+]
+
+
+@pytest.fixture
+def batch_template(settings, tmp_path):
+    settings.PDF_TMP_DIR = str(tmp_path)
+    settings.PAGE_RENDER_WORKERS = 0
+    rendering.clear_caches()
+    source = make_pdf()
+    sha256 = "b" * 64
+    os.makedirs(os.path.dirname(blob_path(sha256)), exist_ok=True)
+    with open(blob_path(sha256), "wb") as f:
+        f.write(source)
+    blob = Blob.objects.create(sha256=sha256, size=len(source))
+    Upload.objects.create(upload_id="batch-upload", blob=blob)
+    template = Template.objects.create(upload_id="batch-upload")
+    for field_id, page, field_type in [
+        ("name", 1, "text"),
+        ("agree", 1, "checkbox"),
+        ("city", 2, "text"),
+    ]:
+        Field.objects.create(
+            template=template,
+            field_id=field_id,
+            type=field_type,
+            label=field_id,
+            page_number=page,
+            x=72,
+            y=100,
+            width=300,
+            height=20,
+        )
+    return template, source
+
+
+def jsonl(value_sets):
+    return "".join(json.dumps(values) + "\n" for values in value_sets).encode()
+
+
+def fail_on_boom(monkeypatch):
+    render_values = batch.render_values
+
+    def failing(document, fields, values):
+        if values.get("name") == "boom":
+            raise ValueError("cannot draw boom")
+        return render_values(document, fields, values)
+
+    monkeypatch.setattr(batch, "render_values", failing)
+
+
+def read_zip(body):
+    with zipfile.ZipFile(io.BytesIO(body)) as archive:
+        return {name: archive.read(name) for name in archive.namelist()}
+
+
+@pytest.mark.django_db
+class TestBatchEndpoint:
+    def test_streams_one_pdf_per_value_set_in_order(self, batch_template):
+        template, source = batch_template
+        response = APIClient().post(
+            f"/api/templates/{template.pk}/batch/",
+            jsonl(VALUE_SETS),
+            content_type="application/x-ndjson",
+        )
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/zip"
+        files = read_zip(b"".join(response.streaming_content))
+
+        assert list(files) == ["00001-jane.pdf", "00002.pdf", "00003-empty.pdf"]
+        assert all(body.startswith(source) for body in files.values())
+        first = PdfReader(io.BytesIO(files["00001-jane.pdf"]))
+        assert "Jane Doe" in first.pages[0].extract_text()
+        second = PdfReader(io.BytesIO(files["00002.pdf"]))
+        assert "John Roe" in second.pages[0].extract_text()
+        assert "Basel" in second.pages[1].extract_text()
+        assert files["00003-empty.pdf"] == source
+
+    def test_accepts_csv(self, batch_template):
+        template, _ = batch_template
+        response = APIClient().post(
+            f"/api/templates/{template.pk}/batch/",
+            b"name,city\nAda,Bern\nBob,\n",
+            content_type="text/csv",
+        )
+        files = read_zip(b"".join(response.streaming_content))
+        assert list(files) == ["00001.pdf", "00002.pdf"]
+        assert "Bern" in PdfReader(io.BytesIO(files["00001.pdf"])).pages[1].extract_text()
+
+    def test_skips_records_failing_validation(self, batch_template):
+        template, _ = batch_template
+        Field.objects.filter(template=template, field_id="name").update(
+            validation={"required": True}
+        )
+        response = APIClient().post(
+            f"/api/templates/{template.pk}/batch/",
+            jsonl([{"name": "Ada"}, {"city": "Basel"}, {"name": "Bob"}]),
+            content_type="application/x-ndjson",
+        )
+        files = read_zip(b"".join(response.streaming_content))
+
+        assert list(files) == ["00001.pdf", "00003.pdf", "errors.jsonl"]
+        assert [json.loads(line) for line in files["errors.jsonl"].splitlines()] == [
+            {
+                "record": 2,
+                "errors": {"name": [{"code": "required", "message": "This field is required"}]},
+            }
+        ]
+
+    def test_reports_unreadable_records_in_the_archive(self, batch_template):
+        template, _ = batch_template
+        body = b'{"name": "Ada"}\n{"name": \n["a list"]\n{"name": "\xff"}\n{"name": "Bob"}\n'
+        response = APIClient().post(
+            f"/api/templates/{template.pk}/batch/", body, content_type="application/x-ndjson"
+        )
+        files = read_zip(b"".join(response.streaming_content))
+
+        assert list(files) == ["00001.pdf", "00005.pdf", "errors.jsonl"]
+        errors = [json.loads(line) for line in files["errors.jsonl"].splitlines()]
+        assert [error["record"] for error in errors] == [2, 3, 4]
+        assert errors[0]["error"].startswith("Invalid JSON")
+        assert errors[1]["error"] == "Record must be a JSON object"
+        assert errors[2]["error"] == "Record is not valid UTF-8"
+
+    def test_reports_undecodable_csv_rows(self, batch_template):
+        template, _ = batch_template
+        body = b"name,city\nJane,Basel\nJ\xf6rg,Bern\nAda,Zurich\n"
+        response = APIClient().post(
+            f"/api/templates/{template.pk}/batch/", body, content_type="text/csv"
+        )
+        files = read_zip(b"".join(response.streaming_content))
+
+        assert list(files) == ["00001.pdf", "00003.pdf", "errors.jsonl"]
+        assert json.loads(files["errors.jsonl"]) == {
+            "record": 2,
+            "error": "Record is not valid UTF-8",
+        }
+
+    def test_requests_share_the_render_pool(self, batch_template, settings):
+        template, _ = batch_template
+        settings.PAGE_RENDER_WORKERS = 1
+        try:
+            bodies, executors = [], []
+            for _ in range(2):
+                response = APIClient().post(
+                    f"/api/templates/{template.pk}/batch/",
+                    jsonl(VALUE_SETS),
+                    content_type="application/x-ndjson",
+                )
+                bodies.append(read_zip(b"".join(response.streaming_content)))
+                executors.append(pages.get_executor())
+            assert executors[0] is not None and executors[0] is executors[1]
+            assert bodies[0] == bodies[1]
+            assert len(bodies[0]) == len(VALUE_SETS)
+        finally:
+            pages.shutdown_executor()
+
+    def test_unusable_source_is_a_json_error(self, batch_template):
+        template, _ = batch_template
+        with open(blob_path("b" * 64), "wb") as f:
+            f.write(b"%PDF-1.4\nnot really a pdf\n")
+        response = APIClient().post(
+            f"/api/templates/{template.pk}/batch/",
+            jsonl(VALUE_SETS),
+            content_type="application/x-ndjson",
+        )
+        assert response.status_code == 422
+        assert "Cannot fill the uploaded PDF" in response.json()["error"]
+
+    def test_reports_records_that_fail_to_render(self, batch_template, monkeypatch):
+        template, _ = batch_template
+        fail_on_boom(monkeypatch)
+        response = APIClient().post(
+            f"/api/templates/{template.pk}/batch/",
+            jsonl([{"name": "Ada"}, {"name": "boom"}, {"name": "Bob"}]),
+            content_type="application/x-ndjson",
+        )
+        files = read_zip(b"".join(response.streaming_content))
+
+        assert list(files) == ["00001.pdf", "00003.pdf", "errors.jsonl"]
+        assert json.loads(files["errors.jsonl"]) == {
+            "record": 2,
+            "error": "Render failed: cannot draw boom",
+        }
+
+    def test_reports_records_that_fail_to_render_on_a_pool(self, batch_template, monkeypatch):
+        template, _ = batch_template
+        fail_on_boom(monkeypatch)
+        fields = rendering.field_geometry(template)
+        value_sets = [{"name": "boom"}, {"name": "Ada"}]
+        rejected = []
+        with ThreadPoolExecutor(2) as executor:
+            documents = batch.filled_documents(
+                blob_path("b" * 64), fields, value_sets, executor=executor, rejected=rejected
+            )
+            assert [name for name, _ in documents] == ["00002.pdf"]
+        assert rejected == [{"record": 1, "error": "Render failed: cannot draw boom"}]
+
+    def test_unknown_template_is_404(self, batch_template):
+        response = APIClient().post("/api/templates/999/batch/", b"{}\n", content_type="text/csv")
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestBatchFillCommand:
+    def test_writes_directory(self, batch_template, tmp_path):
+        template, source = batch_template
+        input_path = tmp_path / "values.jsonl"
+        input_path.write_bytes(jsonl(VALUE_SETS))
+        output_dir = tmp_path / "out"
+
+        call_command(
+            "batch_fill",
+            template.pk,
+            str(input_path),
+            output_dir=str(output_dir),
+            stdout=io.StringIO(),
+        )
+        assert sorted(p.name for p in output_dir.iterdir()) == [
+            "00001-jane.pdf",
+            "00002.pdf",
+            "00003-empty.pdf",
+        ]
+
+    def test_writes_rejected_records_next_to_the_pdfs(self, batch_template, tmp_path):
+        template, _ = batch_template
+        Field.objects.filter(template=template, field_id="city").update(
+            validation={"choices": ["Basel", "Bern"]}
+        )
+        input_path = tmp_path / "values.jsonl"
+        input_path.write_bytes(jsonl(VALUE_SETS + [{"city": "Paris"}]))
+        output_dir = tmp_path / "out"
+        stdout = io.StringIO()
+
+        call_command(
+            "batch_fill", template.pk, str(input_path), output_dir=str(output_dir), stdout=stdout
+        )
+        assert sorted(p.name for p in output_dir.iterdir()) == [
+            "00001-jane.pdf",
+            "00002.pdf",
+            "00003-empty.pdf",
+            "errors.jsonl",
+        ]
+        assert json.loads((output_dir / "errors.jsonl").read_text())["record"] == 4
+        assert "Skipped 1 invalid record(s)" in stdout.getvalue()
+
+    def test_process_pool_matches_inline_rendering(self, batch_template, tmp_path):
+        template, _ = batch_template
+        input_path = tmp_path / "values.jsonl"
+        input_path.write_bytes(jsonl(VALUE_SETS * 3))
+        zip_path = tmp_path / "out.zip"
+
+        call_command(
+            "batch_fill",
+            template.pk,
+            str(input_path),
+            zip=str(zip_path),
+            workers=2,
+            stdout=io.StringIO(),
+        )
+        fields = list(
+            template.fields.values("field_id", "type", "page_number", "x", "y", "width", "height")
+        )
+        inline = dict(batch.filled_documents(blob_path("b" * 64), fields, VALUE_SETS * 3))
+        pooled = read_zip(zip_path.read_bytes())
+        assert len(pooled) == 9
+        for name, update in inline.items():
+            assert pooled[name].endswith(update)
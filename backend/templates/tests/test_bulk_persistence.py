@@ -0,0 +1,46 @@
+import pytest
+from templates.models import Template
+from templates.serializers import TemplateSerializer
+from templates.testing import make_field, save_template
+
+
+@pytest.mark.django_db
+class TestBulkFieldPersistence:
+    def test_create_uses_constant_number_of_queries(self, django_assert_max_num_queries):
+        fields = [make_field(i) for i in range(300)]
+        # SQLite caps bound parameters per statement, so inserts go out in a few batches
+        with django_assert_max_num_queries(10):
+            template = save_template(fields)
+        assert template.fields.count() == 300
+
+    def test_update_without_changes_does_not_touch_fields(self, django_assert_num_queries):
+        fields = [make_field(i) for i in range(50)]
+        template = save_template(fields)
+        # Unique check, SAVEPOINT, SELECT fields, UPDATE template, SELECT version,
+        # RELEASE SAVEPOINT
+        with django_assert_num_queries(6):
+            save_template(fields, instance=template)
+
+    def test_update_diffs_by_field_id(self):
+        template = save_template([make_field(i) for i in range(5)])
+        original_ids = dict(template.fields.values_list("field_id", "id"))
+
+        fields = [make_field(i) for i in range(5)]
+        fields[1]["value"] = "changed"
+        del fields[3]
+        fields.append(make_field(9))
+        save_template(fields, instance=template)
+
+        current = {field.field_id: field for field in template.fields.all()}
+        assert set(current) == {"field0", "field1", "field2", "field4", "field9"}
+        assert current["field1"].value == "changed"
+        # Unchanged and updated rows keep their primary keys
+        for field_id in ("field0", "field1", "field2", "field4"):
+            assert current[field_id].id == original_ids[field_id]
+
+    def test_update_refreshes_prefetched_fields(self):
+        template = save_template([make_field(i) for i in range(3)])
+        template = Template.objects.prefetch_related("fields").get(pk=template.pk)
+        save_template([make_field(0, label="Renamed")], instance=template)
+        data = TemplateSerializer(template).data
+        assert [field["label"] for field in data["fields"]] == ["Renamed"]
@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+from templates import columnar
+from templates.models import Template
+from templates.payloads import decoded_detail as detail_data
+from templates.serializers import TemplateSerializer
+
+COLUMNS = columnar.MEDIA_TYPE
+
+
+def make_payload(upload_id="columnar-upload", count=30):
+    return {
+        "upload_id": upload_id,
+        "fields": [
+            {
+                "field_id": f"f{i}",
+                "type": "checkbox" if i % 3 == 0 else "text",
+                "label": f"Label {i % 5}",
+                "placeholder": "",
+                "page_number": 1 + i // 10,
+                "x": 10.5 * i,
+                "y": 0.1 * i,
+                "width": 120.0,
+                "height": 18.0,
+                "validation": {"required": True} if i % 2 else {},
+                "value": "Zoë" if i == 1 else "",
+            }
+            for i in range(count)
+        ],
+    }
+
+
+@pytest.fixture
+def template():
+    serializer = TemplateSerializer(data=make_payload())
+    assert serializer.is_valid(), serializer.errors
+    return serializer.save()
+
+
+def decoded_detail(body):
+    return detail_data(*columnar.decode(body))
+
+
+class TestEncoding:
+    def test_round_trip_uses_narrow_types_and_shares_strings(self):
+        columns = {
+            "id": [1, 2, 300],
+            "page_number": [1, 1, 2],
+            "x": [1.5, 2.0, 3.25],
+            "y": [0.1, 0.2, 0.3],
+            "width": [10.0] * 3,
+            "height": [5.0] * 3,
+            "field_id": ["a", "b", "c"],
+            "type": ["text"] * 3,
+            "label": ["Name", "Name", "Date"],
+            "placeholder": [""] * 3,
+            "validation": [{}, {"required": True}, {}],
+            "value": ["", "Zoë", ""],
+        }
+        template = {"id": 7, "upload_id": "u", "created_at": "now", "version": 2}
+        body = columnar.encode(template, columns)
+
+        assert columnar.decode(body) == (template, columns)
+        header = body[12:]
+        assert header.count(b'"text"') == 1
+        assert b'["id","u2",0]' in header
+        assert b'["x","f4",' in header
+        assert b'["y","f8",' in header
+
+    def test_empty_template(self):
+        columns = {name: [] for name in columnar.NUMBER_COLUMNS + columnar.STRING_COLUMNS}
+        body = columnar.encode({"id": 1}, columns)
+        assert columnar.decode(body) == ({"id": 1}, columns)
+
+    @pytest.mark.parametrize(
+        "mangle",
+        [
+            lambda body: body[:6],
+            lambda body: b"XXXX" + body[4:],
+            lambda body: body[:-8],
+            lambda body: body[:12] + b"[" + body[13:],
+        ],
+    )
+    def test_malformed_payloads(self, mangle):
+        columns = {name: [0] for name in columnar.NUMBER_COLUMNS}
+        columns.update({name: ["{}"] for name in columnar.STRING_COLUMNS})
+        with pytest.raises(columnar.MalformedPayload):
+            columnar.decode(mangle(columnar.encode({}, columns)))
+
+
+@pytest.mark.django_db
+class TestColumnarDetail:
+    def test_negotiated_detail_matches_json(self, template):
+        client = APIClient()
+        json_response = client.get(f"/api/templates/{template.id}/")
+        response = client.get(f"/api/templates/{template.id}/", HTTP_ACCEPT=COLUMNS)
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == COLUMNS
+        assert "Accept" in response["Vary"]
+        assert response["ETag"] == f'"template-{template.id}-v1-columns"'
+        assert decoded_detail(response.content) == json_response.json()
+        assert len(response.content) < len(json_response.content) / 2
+
+    def test_json_is_the_default(self, template):
+        for accept in ("*/*", "text/html", f"application/json, {COLUMNS};q=0.5"):
+            response = APIClient().get(f"/api/templates/{template.id}/", HTTP_ACCEPT=accept)
+            assert response["Content-Type"] == "application/json"
+
+    def test_etags_are_per_format(self, template):
+        client = APIClient()
+        url = f"/api/templates/{template.id}/"
+        etag = client.get(url, HTTP_ACCEPT=COLUMNS)["ETag"]
+
+        assert client.get(url, HTTP_ACCEPT=COLUMNS, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_unknown_template_is_404_json(self):
+        response = APIClient().get("/api/templates/999/", HTTP_ACCEPT=COLUMNS)
+        assert response.status_code == 404
+        assert response.json() == {"error": "Template not found"}
+
+
+@pytest.mark.django_db
+class TestColumnarImport:
+    def test_export_then_import(self, template):
+        client = APIClient()
+        body = client.get(f"/api/templates/{template.id}/", HTTP_ACCEPT=COLUMNS).content
+
+        response = client.post("/api/templates/?upload_id=copy", data=body, content_type=COLUMNS)
+
+        assert response.status_code == 201
+        copy = client.get(f"/api/templates/{response.json()['template_id']}/").json()
+        original = client.get(f"/api/templates/{template.id}/").json()
+        assert copy["upload_id"] == "copy"
+        strip = ("id", "template")
+        assert [{k: v for k, v in f.items() if k not in strip} for f in copy["fields"]] == [
+            {k: v for k, v in f.items() if k not in strip} for f in original["fields"]
+        ]
+
+    def test_import_is_validated_like_json(self, template):
+        client = APIClient()
+        body = client.get(f"/api/templates/{template.id}/", HTTP_ACCEPT=COLUMNS).content
+
+        response = client.post("/api/templates/", data=body, content_type=COLUMNS)
+
+        assert response.status_code == 400
+        assert "upload_id" in response.json()
+        assert Template.objects.count() == 1
+
+    def test_malformed_import(self):
+        response = APIClient().post("/api/templates/", data=b"V2PT", content_type=COLUMNS)
+        assert response.status_code == 400
+        assert "Malformed columnar payload" in response.json()["error"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_detail_and_import(settings):
+    settings.ROOT_URLCONF = "backend.asgi_urls"
+    serializer = TemplateSerializer(data=make_payload())
+    assert serializer.is_valid()
+    pk = serializer.save().pk
+    client = AsyncClient()
+
+    response = asyncio.run(client.get(f"/api/templates/{pk}/", headers={"Accept": COLUMNS}))
+    assert response.status_code == 200
+    assert response["Content-Type"] == COLUMNS
+    assert decoded_detail(response.content)["upload_id"] == "columnar-upload"
+
+    post = client.post("/api/templates/?upload_id=async-copy", response.content, COLUMNS)
+    response = asyncio.run(post)
+    assert response.status_code == 201
+    assert Template.objects.get(pk=response.json()["template_id"]).fields.count() == 30
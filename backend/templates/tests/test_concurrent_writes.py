@@ -0,0 +1,49 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import OperationalError, connection
+from templates.models import Field, Template
+from templates.serializers import TemplateSerializer
+from templates.testing import make_field
+
+WRITERS = 8
+ROUNDS = 10
+FIELDS = 40
+
+
+def write_template(writer, start):
+    """Create a template, then rewrite its values ``ROUNDS`` times; return lock errors."""
+    errors = []
+    try:
+        start.wait()
+        instance = None
+        for round_number in range(ROUNDS + 1):
+            fields = [make_field(i, value=f"{writer}-{round_number}") for i in range(FIELDS)]
+            serializer = TemplateSerializer(
+                instance, data={"upload_id": f"stress-{writer}", "fields": fields}
+            )
+            assert serializer.is_valid(), serializer.errors
+            try:
+                instance = serializer.save()
+            except OperationalError as e:
+                errors.append(str(e))
+    finally:
+        connection.close()
+    return errors
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_serializer_writers_do_not_hit_lock_errors():
+    start = threading.Barrier(WRITERS)
+    with ThreadPoolExecutor(WRITERS) as pool:
+        results = list(pool.map(write_template, range(WRITERS), [start] * WRITERS))
+
+    assert [error for errors in results for error in errors] == []
+    assert Template.objects.count() == WRITERS
+    assert set(Template.objects.values_list("version", flat=True)) == {ROUNDS + 1}
+    assert Field.objects.count() == WRITERS * FIELDS
+    for template in Template.objects.all():
+        writer = template.upload_id.removeprefix("stress-")
+        values = set(template.fields.values_list("value", flat=True))
+        assert values == {f"{writer}-{ROUNDS}"}
@@ -0,0 +1,125 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from templates import payloads
+from templates.cache import LRUCache, TemplateCache, template_cache
+from templates.models import Template
+from templates.serializers import TemplateSerializer
+
+
+def make_payload(value="John Doe"):
+    return {
+        "upload_id": "cached-upload",
+        "fields": [
+            {
+                "field_id": "field1",
+                "type": "text",
+                "label": "Name",
+                "placeholder": "",
+                "page_number": 1,
+                "x": 100.0,
+                "y": 200.0,
+                "width": 300.0,
+                "height": 50.0,
+                "validation": {},
+                "value": value,
+            }
+        ],
+    }
+
+
+@pytest.fixture
+def template():
+    serializer = TemplateSerializer(data=make_payload())
+    assert serializer.is_valid()
+    return serializer.save()
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+@pytest.mark.django_db
+class TestTemplateDetailCache:
+    def test_detail_returns_etag(self, template):
+        resp = APIClient().get(f"/api/templates/{template.id}/")
+        assert resp.status_code == 200
+        assert resp["ETag"] == f'"template-{template.id}-v1"'
+        assert resp.json()["version"] == 1
+
+    def test_cached_read_skips_database(self, template, django_assert_num_queries):
+        client = APIClient()
+        first = client.get(f"/api/templates/{template.id}/")
+        with django_assert_num_queries(0):
+            second = client.get(f"/api/templates/{template.id}/")
+        assert second.json() == first.json()
+
+    def test_if_none_match_returns_304_without_queries(self, template, django_assert_num_queries):
+        client = APIClient()
+        etag = client.get(f"/api/templates/{template.id}/")["ETag"]
+        with django_assert_num_queries(0):
+            resp = client.get(f"/api/templates/{template.id}/", HTTP_IF_NONE_MATCH=etag)
+        assert resp.status_code == 304
+        assert resp["ETag"] == etag
+
+    def test_update_invalidates_cached_response(self, template):
+        client = APIClient()
+        etag = client.get(f"/api/templates/{template.id}/")["ETag"]
+
+        serializer = TemplateSerializer(template, data=make_payload(value="Jane Roe"))
+        assert serializer.is_valid()
+        serializer.save()
+
+        resp = client.get(f"/api/templates/{template.id}/", HTTP_IF_NONE_MATCH=etag)
+        assert resp.status_code == 200
+        assert resp["ETag"] != etag
+        assert resp.json()["version"] == 2
+        assert resp.json()["fields"][0]["value"] == "Jane Roe"
+
+    def test_shared_backend_is_populated(self, template, settings):
+        from django.core.cache import caches
+
+        settings.TEMPLATE_CACHE_ALIAS = "default"
+        caches["default"].clear()
+        APIClient().get(f"/api/templates/{template.id}/")
+        assert caches["default"].get(f"template:{template.id}:version") == 1
+        assert Template.objects.get(pk=template.id).version == 1
+
+    def test_workers_share_the_version_pointer(self, template, settings):
+        from django.core.cache import caches
+
+        settings.TEMPLATE_CACHE_ALIAS = "default"
+        caches["default"].clear()
+        worker_a, worker_b = TemplateCache(), TemplateCache()
+        worker_a.store(template.id, 1, b"body")
+        assert worker_b.current_version(template.id) == 1
+
+        worker_b.invalidate(template.id)
+        assert worker_a.current_version(template.id) is None
+        # Payloads are immutable per version, so the local copy stays usable
+        assert worker_a.get(template.id, 1) == b"body"
+
+    def test_store_after_a_newer_write_leaves_no_pointer(self, template):
+        version, body = payloads.detail(template.id)
+        serializer = TemplateSerializer(template, data=make_payload(value="Jane Roe"))
+        assert serializer.is_valid()
+        serializer.save()
+
+        template_cache.store(template.id, version, body)
+        assert template_cache.current_version(template.id) is None
+        resp = APIClient().get(f"/api/templates/{template.id}/")
+        assert resp.json()["version"] == 2
+
+    def test_detail_reads_version_and_fields_in_one_transaction(self, template):
+        with CaptureQueriesContext(connection) as queries:
+            payloads.detail(template.id)
+        statements = [query["sql"].split()[0] for query in queries.captured_queries]
+        assert statements == ["SAVEPOINT", "SELECT", "SELECT", "RELEASE"]
@@ -0,0 +1,182 @@
+import io
+import os
+
+import pytest
+from app import pages
+from app.models import Blob, Upload
+from app.storage import blob_path
+from jobs.models import Job
+from jobs.worker import Worker
+from pypdf import PdfWriter
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    FloatObject,
+    NameObject,
+    NumberObject,
+    TextStringObject,
+)
+from rest_framework.test import APIClient
+from templates import autodetect, extraction
+from templates.models import Template
+
+
+def acroform_pdf():
+    writer = PdfWriter()
+    page = writer.add_blank_page(612, 792)
+    widget = DictionaryObject(
+        {
+            NameObject("/Type"): NameObject("/Annot"),
+            NameObject("/Subtype"): NameObject("/Widget"),
+            NameObject("/FT"): NameObject("/Tx"),
+            NameObject("/T"): TextStringObject("full_name"),
+            NameObject("/TU"): TextStringObject("Full name"),
+            NameObject("/Ff"): NumberObject(2),
+            NameObject("/MaxLen"): NumberObject(40),
+            NameObject("/Rect"): ArrayObject([FloatObject(v) for v in (100, 700, 300, 720)]),
+        }
+    )
+    ref = writer._add_object(widget)
+    page[NameObject("/Annots")] = ArrayObject([ref])
+    writer._root_object[NameObject("/AcroForm")] = DictionaryObject(
+        {NameObject("/Fields"): ArrayObject([ref])}
+    )
+    return _to_bytes(writer)
+
+
+def drawn_pdf(page_count=1):
+    writer = PdfWriter()
+    for _ in range(page_count):
+        page = writer.add_blank_page(612, 792)
+        font = DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})}
+        )
+        content = DecodedStreamObject()
+        content.set_data(
+            b"BT /F1 12 Tf 72 700 Td (Name) Tj ET\n"
+            b"150 698 m 350 698 l S\n"
+            b"BT /F1 12 Tf 72 600 Td (Married) Tj ET\n"
+            b"150 598 12 12 re S\n"
+        )
+        page[NameObject("/Contents")] = writer._add_object(content)
+    return _to_bytes(writer)
+
+
+def _to_bytes(writer):
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.PDF_TMP_DIR = str(tmp_path / "pdf")
+    settings.PAGE_RENDER_DIR = str(tmp_path / "pages")
+    settings.PAGE_RENDER_WORKERS = 0
+    os.makedirs(settings.PDF_TMP_DIR)
+    return settings
+
+
+def store(content, sha256, upload_id="upload-1"):
+    os.makedirs(os.path.dirname(blob_path(sha256)), exist_ok=True)
+    with open(blob_path(sha256), "wb") as f:
+        f.write(content)
+    blob, _ = Blob.objects.get_or_create(sha256=sha256, defaults={"size": len(content)})
+    return Upload.objects.create(upload_id=upload_id, blob=blob)
+
+
+def test_acroform_widgets_become_fields(media):
+    path = os.path.join(media.PDF_TMP_DIR, "form.pdf")
+    with open(path, "wb") as f:
+        f.write(acroform_pdf())
+
+    assert extraction.has_acroform(path)
+    [field] = extraction.extract_pages(path, [0], use_widgets=True)
+    assert field["field_id"] == "full_name"
+    assert field["label"] == "Full name"
+    assert field["validation"] == {"required": True, "max_length": 40}
+    # Top-left origin: the widget's top edge is 792 - 720 points from the top
+    assert (field["x"], field["y"], field["width"], field["height"]) == (100, 72, 200, 20)
+
+
+def test_geometry_fallback_detects_lines_boxes_and_labels(media):
+    path = os.path.join(media.PDF_TMP_DIR, "drawn.pdf")
+    with open(path, "wb") as f:
+        f.write(drawn_pdf())
+
+    assert not extraction.has_acroform(path)
+    fields = extraction.extract_pages(path, [0], use_widgets=False)
+    assert [(f["type"], f["label"]) for f in fields] == [("text", "Name"), ("checkbox", "Married")]
+    assert fields[0]["width"] == 200
+
+
+def test_assign_field_ids_makes_ids_unique_and_short():
+    fields = [{"field_id": "x" * 40, "label": ""}, {"field_id": "x" * 40, "label": "B"}]
+    ids = [f["field_id"] for f in extraction.assign_field_ids(fields)]
+    assert len(set(ids)) == 2
+    assert all(len(field_id) <= 32 for field_id in ids)
+    assert fields[0]["label"] == "Field 1"
+
+
+def test_large_documents_are_split_across_the_pool(media):
+    media.PAGE_RENDER_WORKERS = 2
+    media.FIELD_EXTRACTION_PAGES_PER_TASK = 1
+    sha256 = "b" * 64
+    os.makedirs(os.path.dirname(blob_path(sha256)), exist_ok=True)
+    with open(blob_path(sha256), "wb") as f:
+        f.write(drawn_pdf(page_count=3))
+    try:
+        layout = autodetect.extract_layout(sha256)
+    finally:
+        pages.shutdown_executor()
+    assert layout["source"] == "geometry"
+    assert [f["page_number"] for f in layout["fields"]] == [1, 1, 2, 2, 3, 3]
+    assert len({f["field_id"] for f in layout["fields"]}) == 6
+
+
+@pytest.mark.django_db
+class TestTemplateExtractEndpoint:
+    def test_unknown_form_is_extracted_by_a_job(self, media):
+        upload = store(acroform_pdf(), "c" * 64)
+        response = APIClient().post("/api/templates/extract/", {"upload_id": upload.upload_id})
+        assert response.status_code == 202
+
+        Worker().run_once()
+        job = Job.objects.get(pk=response.json()["job_id"])
+        assert job.status == Job.SUCCEEDED
+        template = Template.objects.get(pk=job.result["template_id"])
+        assert list(template.fields.values_list("field_id", flat=True)) == ["full_name"]
+
+    def test_known_form_creates_template_instantly(self, media):
+        first = store(drawn_pdf(), "d" * 64)
+        autodetect.create_template(first)
+        again = Upload.objects.create(upload_id="upload-2", blob=first.blob)
+
+        response = APIClient().post("/api/templates/extract/", {"upload_id": again.upload_id})
+        assert response.status_code == 201
+        template = Template.objects.get(pk=response.json()["template_id"])
+        assert template.upload_id == "upload-2"
+        assert template.fields.count() == 2
+
+    def test_losing_a_concurrent_extraction_returns_the_winners_template(self, media, monkeypatch):
+        upload = store(drawn_pdf(), "e" * 64)
+        winner = Template.objects.create(upload_id=upload.upload_id)
+        # The loser looked for a template before the winner committed
+        filter_templates = Template.objects.filter
+        monkeypatch.setattr(
+            Template.objects, "filter", lambda **lookups: filter_templates(**lookups).none()
+        )
+
+        assert autodetect.create_template(upload, {"fields": []}) == winner
+
+    def test_unknown_upload_is_404(self, media):
+        response = APIClient().post("/api/templates/extract/", {"upload_id": "missing"})
+        assert response.status_code == 404
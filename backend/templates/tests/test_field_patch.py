@@ -0,0 +1,92 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from templates.models import Field, Template
+from templates.testing import make_field, save_template
+
+
+@pytest.fixture
+def template():
+    return save_template([make_field(i) for i in range(1, 4)])
+
+
+def patch(api_client, template, values, version=1):
+    url = reverse("templates:template-fields", args=[template.id])
+    return api_client.patch(url, {"version": version, "values": values}, format="json")
+
+
+def stored_values(template):
+    return dict(Field.objects.filter(template=template).values_list("field_id", "value"))
+
+
+@pytest.mark.django_db
+class TestFieldPatch:
+    def test_returns_only_changed_fields_and_bumps_version(self, api_client, template):
+        response = patch(api_client, template, {"field1": "Jane", "field2": ""})
+
+        assert response.status_code == 200
+        assert response.json() == {"version": 2, "fields": {"field1": "Jane"}}
+        assert response["ETag"] == f'"template-{template.id}-v2"'
+        assert stored_values(template) == {"field1": "Jane", "field2": "", "field3": ""}
+        template.refresh_from_db()
+        assert template.version == 2
+
+    def test_writes_batch_with_single_update(self, api_client, template):
+        with CaptureQueriesContext(connection) as queries:
+            patch(api_client, template, {"field1": "a", "field2": "b", "field3": "c"})
+
+        statements = [q["sql"] for q in queries if "SAVEPOINT" not in q["sql"]]
+        # Version check, value read, version bump and one UPDATE for all fields
+        assert len(statements) == 4
+        assert len([sql for sql in statements if sql.startswith('UPDATE "templates_field"')]) == 1
+        assert stored_values(template) == {"field1": "a", "field2": "b", "field3": "c"}
+
+    def test_stale_version_is_rejected(self, api_client, template):
+        assert patch(api_client, template, {"field1": "first"}).status_code == 200
+
+        response = patch(api_client, template, {"field2": "second"}, version=1)
+
+        assert response.status_code == 409
+        assert response.json()["version"] == 2
+        assert stored_values(template)["field2"] == ""
+
+    def test_unchanged_values_keep_version(self, api_client, template):
+        response = patch(api_client, template, {"field1": ""})
+
+        assert response.json() == {"version": 1, "fields": {}}
+        assert Template.objects.get(pk=template.pk).version == 1
+
+    def test_unknown_field_changes_nothing(self, api_client, template):
+        response = patch(api_client, template, {"field1": "Jane", "nope": "x"})
+
+        assert response.status_code == 400
+        assert "nope" in response.json()["error"]
+        assert stored_values(template)["field1"] == ""
+
+    def test_invalid_body(self, api_client, template):
+        assert patch(api_client, template, {}).status_code == 400
+        response = api_client.patch(
+            reverse("templates:template-fields", args=[template.id]),
+            {"values": {"field1": "x"}},
+            format="json",
+        )
+        assert response.status_code == 400
+
+    def test_unknown_template(self, api_client):
+        response = api_client.patch(
+            reverse("templates:template-fields", args=[999]),
+            {"version": 1, "values": {"field1": "x"}},
+            format="json",
+        )
+        assert response.status_code == 404
+
+    def test_detail_reflects_patch(self, api_client, template):
+        url = reverse("templates:template-detail", args=[template.id])
+        api_client.get(url)
+
+        patch(api_client, template, {"field3": "cached?"})
+
+        data = api_client.get(url).json()
+        assert data["version"] == 2
+        assert {f["field_id"]: f["value"] for f in data["fields"]}["field3"] == "cached?"
@@ -0,0 +1,100 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from templates.listing import TemplatePage
+from templates.models import Template
+from templates.serializers import TemplateSerializer
+from templates.testing import make_field
+
+
+def create_templates(count, fields=2):
+    templates = []
+    for i in range(count):
+        serializer = TemplateSerializer(
+            data={"upload_id": f"list-{i}", "fields": [make_field(j) for j in range(fields)]}
+        )
+        assert serializer.is_valid(), serializer.errors
+        templates.append(serializer.save())
+    return templates
+
+
+def list_all(api_client, **params):
+    pages = []
+    response = api_client.get(reverse("templates:template-create"), params)
+    while True:
+        assert response.status_code == 200, response.json()
+        pages.append(response.json()["results"])
+        if response.json()["next"] is None:
+            return pages
+        response = api_client.get(response.json()["next"])
+
+
+@pytest.mark.django_db
+class TestTemplateList:
+    def test_pages_newest_first_without_gaps(self, api_client):
+        templates = create_templates(7)
+        # Equal timestamps must still page deterministically on id
+        Template.objects.filter(pk__in=[t.pk for t in templates[2:5]]).update(
+            created_at=timezone.now()
+        )
+        expected = list(
+            Template.objects.order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+
+        pages = list_all(api_client, limit=3)
+
+        assert [len(page) for page in pages] == [3, 3, 1]
+        assert [row["id"] for page in pages for row in page] == expected
+
+    def test_default_columns_and_field_count(self, api_client):
+        template = create_templates(1, fields=3)[0]
+
+        row = api_client.get(reverse("templates:template-create")).json()["results"][0]
+
+        assert set(row) == {"id", "upload_id", "created_at", "version", "field_count"}
+        assert row["id"] == template.id
+        assert row["field_count"] == 3
+
+    def test_sparse_fields(self, api_client):
+        create_templates(2)
+        response = api_client.get(reverse("templates:template-create"), {"fields": "upload_id"})
+        assert response.json()["results"] == [{"upload_id": "list-1"}, {"upload_id": "list-0"}]
+
+    def test_nested_fields_on_request(self, api_client, django_assert_num_queries):
+        templates = create_templates(3, fields=2)
+        detail = TemplateSerializer(templates[0]).data
+
+        with django_assert_num_queries(2):
+            response = api_client.get(reverse("templates:template-create"), {"fields": "id,fields"})
+
+        rows = response.json()["results"]
+        assert [len(row["fields"]) for row in rows] == [2, 2, 2]
+        assert rows[-1]["fields"] == [dict(field) for field in detail["fields"]]
+
+    def test_page_is_one_query(self, api_client, django_assert_num_queries):
+        create_templates(5)
+        with django_assert_num_queries(1):
+            api_client.get(reverse("templates:template-create"), {"limit": 2})
+
+    @pytest.mark.parametrize(
+        "params",
+        [{"cursor": "garbage"}, {"limit": "0"}, {"limit": "x"}, {"fields": "id,secret"}],
+    )
+    def test_invalid_parameters(self, api_client, params):
+        response = api_client.get(reverse("templates:template-create"), params)
+        assert response.status_code == 400
+        assert "error" in response.json()
+
+    @pytest.mark.parametrize("fields", ["id", "field_count"])
+    def test_page_seeks_to_the_cursor_in_the_created_index(self, fields):
+        page = TemplatePage({"fields": fields})
+        page.after = (timezone.now(), 10)
+        sql, params = page.queryset().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = " ".join(str(row) for row in cursor.fetchall())
+        assert "SEARCH templates_template USING COVERING INDEX template_created_id" in plan
+        assert "(created_at<?)" in plan
+        assert "SCAN templates_template" not in plan
+        assert "TEMP B-TREE" not in plan
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from django.test import AsyncClient
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from templates import payloads
+from templates.models import Template
+from templates.serializers import TemplateSerializer
+from templates.testing import make_field, save_template
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def template():
+    fields = [make_field(i) for i in range(1, 40)]
+    fields += [
+        make_field(40, label="Név – “quoted”   line", value="multi\nline\ttext  "),
+        make_field(41, x=0.1 + 0.2, y=1e20, width=3, height=-0.0),
+        make_field(42, validation={"choices": ["a", "é"], "max_length": 5, "nested": {"k": None}}),
+        make_field(43, type="checkbox", placeholder="☐", value="yes"),
+    ]
+    return save_template(fields)
+
+
+def serializer_bytes(pk):
+    template = Template.objects.prefetch_related("fields").get(pk=pk)
+    return JSONRenderer().render(TemplateSerializer(template).data)
+
+
+def test_detail_matches_serializer_output(template):
+    version, body = payloads.detail(template.pk)
+    assert version == template.version
+    assert body == serializer_bytes(template.pk)
+
+
+def test_async_detail_matches_serializer_output(template):
+    _, body = asyncio.run(payloads.adetail(template.pk))
+    assert body == serializer_bytes(template.pk)
+
+
+def test_endpoints_serve_identical_bytes(template, settings):
+    sync = APIClient().get(f"/api/templates/{template.pk}/")
+    cached = APIClient().get(f"/api/templates/{template.pk}/")
+    settings.ROOT_URLCONF = "backend.asgi_urls"
+    asgi = asyncio.run(AsyncClient().get(f"/api/templates/{template.pk}/"))
+
+    expected = serializer_bytes(template.pk)
+    assert sync.content == cached.content == asgi.content == expected
+    assert sync["Content-Type"] == asgi["Content-Type"] == "application/json"
+
+
+def test_list_nests_detail_fields(template):
+    detail = APIClient().get(f"/api/templates/{template.pk}/").json()
+    row = APIClient().get("/api/templates/", {"fields": "created_at,fields"}).json()["results"][0]
+    assert row == {"created_at": detail["created_at"], "fields": detail["fields"]}
@@ -0,0 +1,134 @@
+import io
+import os
+
+import pypdfium2 as pdfium
+import pytest
+from app.models import Blob, Upload
+from app.storage import blob_path
+from app.testing import make_pdf
+from pypdf import PdfReader, PdfWriter
+from rest_framework.test import APIClient
+from templates import rendering
+from templates.models import Field, Template
+
+
+@pytest.fixture
+def filled_template(settings, tmp_path):
+    settings.PDF_TMP_DIR = str(tmp_path)
+    rendering.clear_caches()
+    source = make_pdf()
+    sha256 = "e" * 64
+    os.makedirs(os.path.dirname(blob_path(sha256)), exist_ok=True)
+    with open(blob_path(sha256), "wb") as f:
+        f.write(source)
+    blob = Blob.objects.create(sha256=sha256, size=len(source))
+    Upload.objects.create(upload_id="render-upload", blob=blob)
+    template = Template.objects.create(upload_id="render-upload")
+    for field_id, page, value, field_type in [
+        ("name", 1, "Jane (Q) Doe", "text"),
+        ("agree", 1, "yes", "checkbox"),
+        ("city", 2, "Zürich", "text"),
+    ]:
+        Field.objects.create(
+            template=template,
+            field_id=field_id,
+            type=field_type,
+            label=field_id,
+            page_number=page,
+            x=72,
+            y=100,
+            width=300,
+            height=20,
+            value=value,
+        )
+    yield template, source
+    rendering.clear_caches()
+
+
+def mapped_regions(path):
+    with open("/proc/self/maps") as maps:
+        return sum(line.rstrip().endswith(path) for line in maps)
+
+
+def fetch(template):
+    response = APIClient().get(f"/api/templates/{template.pk}/render/")
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/pdf"
+    body = b"".join(response.streaming_content)
+    assert int(response["Content-Length"]) == len(body)
+    return body
+
+
+@pytest.mark.django_db
+class TestTemplateRender:
+    def test_output_is_an_incremental_update_of_the_source(self, filled_template):
+        template, source = filled_template
+        body = fetch(template)
+
+        assert body.startswith(source)
+        reader = PdfReader(io.BytesIO(body))
+        assert len(reader.pages) == 2
+        assert "Jane (Q) Doe" in reader.pages[0].extract_text()
+        assert "X" in reader.pages[0].extract_text()
+        assert "Zürich" in reader.pages[1].extract_text()
+        # pdfium opens the result too
+        assert len(pdfium.PdfDocument(body)) == 2
+
+    def test_small_edit_only_redraws_changed_page(self, filled_template, monkeypatch):
+        template, _ = filled_template
+        fetch(template)
+
+        drawn = []
+        original = rendering.filling.overlay_content
+        monkeypatch.setattr(
+            rendering.filling,
+            "overlay_content",
+            lambda document, fields: drawn.append(fields[0]["page_number"])
+            or original(document, fields),
+        )
+        template.fields.filter(field_id="city").update(value="Basel")
+        body = fetch(template)
+
+        assert drawn == [2]
+        assert "Basel" in PdfReader(io.BytesIO(body)).pages[1].extract_text()
+
+    def test_template_without_values_returns_source(self, filled_template):
+        template, source = filled_template
+        template.fields.update(value="")
+        assert fetch(template) == source
+
+    @pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="needs /proc")
+    def test_source_is_mapped_only_while_a_render_streams(self, filled_template):
+        template, source = filled_template
+        sha256 = rendering.template_source(template)
+
+        document, update = rendering.render_update(template, sha256)
+        assert rendering.source_document(sha256) is document
+        assert mapped_regions(blob_path(sha256)) == 0
+
+        chunks = rendering.stream_filled(document, update, chunk_size=1024)
+        assert next(chunks) == source[:1024]
+        assert mapped_regions(blob_path(sha256)) == 1
+        assert b"".join(chunks).endswith(update)
+        assert mapped_regions(blob_path(sha256)) == 0
+
+    @pytest.mark.parametrize("encrypted", [False, True])
+    def test_unusable_source_is_a_json_error(self, filled_template, encrypted):
+        template, source = filled_template
+        content = b"%PDF-1.4\nnot really a pdf\n"
+        if encrypted:
+            writer = PdfWriter(clone_from=io.BytesIO(source))
+            writer.encrypt("secret")
+            buffer = io.BytesIO()
+            writer.write(buffer)
+            content = buffer.getvalue()
+        with open(blob_path(rendering.template_source(template)), "wb") as f:
+            f.write(content)
+
+        response = APIClient().get(f"/api/templates/{template.pk}/render/")
+        assert response.status_code == 422
+        assert "Cannot fill the uploaded PDF" in response.json()["error"]
+
+    def test_missing_template_is_404(self, filled_template):
+        assert APIClient().get("/api/templates/999/render/").status_code == 404
+        assert os.path.exists(blob_path("e" * 64))
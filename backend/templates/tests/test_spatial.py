@@ -0,0 +1,153 @@
+import random
+
+import numpy as np
+import pytest
+from rest_framework.test import APIClient
+from templates import spatial
+from templates.models import Field, Template
+from templates.serializers import TemplateSerializer
+
+
+def make_field(template, field_id, x, y, width=100, height=20, page=1):
+    return Field.objects.create(
+        template=template,
+        field_id=field_id,
+        type="text",
+        label=field_id,
+        page_number=page,
+        x=x,
+        y=y,
+        width=width,
+        height=height,
+    )
+
+
+@pytest.fixture
+def template(db):
+    template = Template.objects.create(upload_id="spatial-upload")
+    make_field(template, "outer", 50, 50, width=300, height=100)
+    make_field(template, "inner", 60, 60, width=50, height=20)
+    make_field(template, "right", 400, 60)
+    make_field(template, "other-page", 50, 50, page=2)
+    return template
+
+
+def get(path, **params):
+    return APIClient().get(path, params)
+
+
+class TestPageIndex:
+    def random_page(self, count=400, seed=7):
+        rng = random.Random(seed)
+        boxes = []
+        for _ in range(count):
+            x, y = rng.uniform(0, 600), rng.uniform(0, 780)
+            boxes.append((x, y, x + rng.uniform(2, 150), y + rng.uniform(2, 40)))
+        ids = [f"f{i}" for i in range(count)]
+        return spatial.PageIndex(ids, np.array(boxes), cell_size=48.0), boxes
+
+    def test_hit_test_matches_brute_force(self):
+        page, boxes = self.random_page()
+        rng = random.Random(1)
+        for _ in range(200):
+            x, y = rng.uniform(0, 700), rng.uniform(0, 800)
+            expected = {
+                i for i, (x0, y0, x1, y1) in enumerate(boxes) if x0 <= x <= x1 and y0 <= y <= y1
+            }
+            assert set(page.hit_test(x, y)) == expected
+
+    def test_stray_boxes_stay_out_of_the_grid(self):
+        page, boxes = self.random_page(count=50)
+        nan, inf = float("nan"), float("inf")
+        boxes += [(-1e12, -1e12, 1e12, 1e12), (nan, 10, nan, 30), (0, 0, inf, 5), (5, 5, 1e9, 6)]
+        page = spatial.PageIndex([f"f{i}" for i in range(len(boxes))], np.array(boxes), 48.0)
+
+        assert sum(len(cell) for cell in page.cells.values()) < 50 * spatial.MAX_BOX_CELLS
+        assert page.spanning.tolist() == [50, 51, 52, 53]
+        rng = random.Random(2)
+        for _ in range(100):
+            x, y = rng.uniform(0, 700), rng.uniform(0, 800)
+            expected = {
+                i for i, (x0, y0, x1, y1) in enumerate(boxes) if x0 <= x <= x1 and y0 <= y <= y1
+            }
+            assert set(page.hit_test(x, y)) == expected
+        assert page.hit_test(5e8, 5.5) == [53, 50]
+
+    def test_nearest_matches_brute_force(self):
+        page, boxes = self.random_page()
+        x, y = 1000.0, 1000.0
+        distances = [
+            np.hypot(max(x0 - x, x - x1, 0), max(y0 - y, y - y1, 0)) for x0, y0, x1, y1 in boxes
+        ]
+        expected = sorted(range(len(boxes)), key=lambda i: (distances[i], i))[:5]
+        assert [position for position, _ in page.nearest(x, y, limit=5)] == expected
+
+    def test_overlaps_match_brute_force(self):
+        page, boxes = self.random_page(count=150)
+        expected = set()
+        for a in range(len(boxes)):
+            for b in range(a + 1, len(boxes)):
+                (ax0, ay0, ax1, ay1), (bx0, by0, bx1, by1) = boxes[a], boxes[b]
+                if min(ax1, bx1) > max(ax0, bx0) and min(ay1, by1) > max(ay0, by0):
+                    expected.add((a, b))
+        assert {(a, b) for a, b, _ in page.overlaps()} == expected
+
+
+@pytest.mark.django_db
+class TestSpatialEndpoints:
+    def test_hit_test_returns_innermost_field_first(self, template):
+        response = get(f"/api/templates/{template.pk}/fields/hit/", page=1, x=70, y=70)
+        assert response.status_code == 200
+        assert [f["field_id"] for f in response.data["fields"]] == ["inner", "outer"]
+        assert response.data["fields"][0] == {
+            "field_id": "inner",
+            "x": 60.0,
+            "y": 60.0,
+            "width": 50.0,
+            "height": 20.0,
+        }
+
+    def test_nearest_reports_distances(self, template):
+        url = f"/api/templates/{template.pk}/fields/nearest/"
+        fields = get(url, page=1, x=380, y=70, limit=2).data["fields"]
+        assert [(f["field_id"], f["distance"]) for f in fields] == [
+            ("right", 20.0),
+            ("outer", 30.0),
+        ]
+
+        assert get(url, page=1, x=380, y=70, max_distance=10).data["fields"] == []
+
+    def test_overlap_report(self, template):
+        response = get(f"/api/templates/{template.pk}/overlaps/")
+        assert response.data["overlaps"] == [
+            {"page_number": 1, "fields": ["outer", "inner"], "area": 1000.0}
+        ]
+
+    def test_index_is_cached_until_the_template_changes(self, template, django_assert_num_queries):
+        url = f"/api/templates/{template.pk}/fields/hit/"
+        get(url, page=1, x=420, y=70)
+        with django_assert_num_queries(1):
+            assert get(url, page=1, x=420, y=70).data["fields"][0]["field_id"] == "right"
+
+        data = TemplateSerializer(template).data
+        data["fields"][2]["x"] = 500
+        serializer = TemplateSerializer(template, data=data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        response = get(url, page=1, x=420, y=70)
+        assert response.data["version"] == 2
+        assert response.data["fields"] == []
+
+    def test_bad_parameters(self, template):
+        url = f"/api/templates/{template.pk}/fields/hit/"
+        assert get(url, page=1, x=1).status_code == 400
+        assert get(url, page=1, x="abc", y=1).status_code == 400
+        assert get(url, page=1, x="inf", y=1).status_code == 400
+        assert (
+            get(
+                f"/api/templates/{template.pk}/fields/nearest/", page=1, x=1, y=1, limit=0
+            ).status_code
+            == 400
+        )
+        assert get("/api/templates/999/fields/hit/", page=1, x=1, y=1).status_code == 404
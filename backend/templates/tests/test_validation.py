@@ -0,0 +1,164 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from templates import validation
+from templates.models import Field, Template
+from templates.serializers import TemplateSerializer
+from templates.testing import make_field, save_template
+from templates.validation import InvalidRule, TemplateValidator, compile_rules
+
+
+def codes(check, value):
+    return [error["code"] for error in check(value)]
+
+
+class TestCompileRules:
+    def test_no_rules_compile_to_nothing(self):
+        assert compile_rules({}) is None
+        assert compile_rules({"synonyms": ["surname"], "format": "colour"}) is None
+
+    def test_required(self):
+        check = compile_rules({"required": True, "max_length": 3})
+        assert codes(check, None) == ["required"]
+        assert codes(check, "  ") == ["required"]
+        assert codes(check, "abc") == []
+
+    def test_blank_values_only_fail_required(self):
+        check = compile_rules({"min_length": 3, "format": "email"})
+        assert check("") == []
+        assert check(None) == []
+
+    def test_lengths_and_pattern(self):
+        check = compile_rules({"min_length": 2, "max_length": 4, "pattern": r"[A-Z]+"})
+        assert codes(check, "AB") == []
+        assert codes(check, "A") == ["min_length"]
+        assert codes(check, "abcde") == ["max_length", "pattern"]
+
+    def test_formats(self):
+        email = compile_rules({"format": "email"})
+        assert codes(email, "ada@example.com") == []
+        assert codes(email, "ada@example") == ["email"]
+        phone = compile_rules({"type": "phone"})
+        assert codes(phone, "+41 44 123 45 67") == []
+        assert codes(phone, "call me") == ["phone"]
+        date = compile_rules({"format": "date"})
+        assert codes(date, "1815-12-10") == []
+        assert codes(date, "10/12/1815") == ["date"]
+        swiss = compile_rules({"format": "date", "date_format": "%d.%m.%Y"})
+        assert codes(swiss, "10.12.1815") == []
+
+    def test_numbers(self):
+        age = compile_rules({"format": "integer", "min": 0, "max": 130})
+        assert codes(age, "42") == []
+        assert codes(age, 42) == []
+        assert codes(age, "4.2") == ["integer"]
+        assert codes(age, "-1") == ["min"]
+        assert codes(age, "131") == ["max"]
+        amount = compile_rules({"max": 10.5})
+        assert codes(amount, "10.5") == []
+        assert codes(amount, "nan") == ["number"]
+        assert amount("11")[0]["message"] == "Ensure this value is at most 10.5"
+
+    def test_choices(self):
+        check = compile_rules({"choices": ["New York", "Texas"]})
+        assert codes(check, "Texas") == []
+        assert codes(check, "Ohio") == ["choices"]
+
+    def test_checkboxes_are_only_checked_for_required(self):
+        check = compile_rules({"required": True, "max_length": 1}, "checkbox")
+        assert codes(check, "yes") == []
+        assert codes(check, "") == ["required"]
+
+    @pytest.mark.parametrize(
+        "rules",
+        [
+            {"pattern": "("},
+            {"max_length": "many"},
+            {"min_length": -1},
+            {"min": "zero"},
+            {"choices": "Texas"},
+            {"format": "date", "date_format": 8},
+            ["required"],
+        ],
+    )
+    def test_malformed_rules_are_rejected(self, rules):
+        with pytest.raises(InvalidRule):
+            compile_rules(rules)
+
+
+class TestTemplateValidator:
+    FIELDS = [
+        {"field_id": "name", "type": "text", "validation": {"required": True}},
+        {"field_id": "zip", "type": "text", "validation": {"pattern": r"\d{4}"}},
+        {"field_id": "notes", "type": "text", "validation": {}},
+        {"field_id": "broken", "type": "text", "validation": {"pattern": "["}},
+    ]
+
+    def test_whole_records_and_partial_updates(self):
+        validator = TemplateValidator(self.FIELDS)
+        assert validator.validate({"name": "Ada", "zip": "8001"}) == {}
+        assert validator.validate({"zip": "80"}) == {
+            "name": [{"code": "required", "message": "This field is required"}],
+            "zip": [{"code": "pattern", "message": "Enter a value in the expected format"}],
+        }
+        assert validator.validate({"zip": "8001"}, partial=True) == {}
+        assert list(validator.validate({"name": "", "notes": "x"}, partial=True)) == ["name"]
+
+    def test_uncompilable_rules_are_skipped(self):
+        assert "broken" not in TemplateValidator(self.FIELDS).checks
+
+    def test_identical_rules_share_one_compiled_check(self):
+        first = TemplateValidator(self.FIELDS)
+        second = TemplateValidator([{**field, "field_id": "other"} for field in self.FIELDS[1:2]])
+        assert second.checks["other"] is first.checks["zip"]
+
+
+@pytest.mark.django_db
+class TestTemplateValidation:
+    @pytest.fixture
+    def template(self):
+        return save_template(
+            [
+                make_field(1, validation={"required": True, "max_length": 5}),
+                make_field(2, validation={"format": "integer", "min": 1}),
+                make_field(3),
+            ]
+        )
+
+    def patch(self, template, values, version=1):
+        url = reverse("templates:template-fields", args=[template.id])
+        return APIClient().patch(url, {"version": version, "values": values}, format="json")
+
+    def test_field_patch_rejects_invalid_values(self, template):
+        response = self.patch(template, {"field1": "too long", "field2": "0", "field3": "x"})
+
+        assert response.status_code == 400
+        assert response.json() == {
+            "error": "Invalid field values",
+            "fields": {
+                "field1": [
+                    {"code": "max_length", "message": "Ensure this value has at most 5 characters"}
+                ],
+                "field2": [{"code": "min", "message": "Ensure this value is at least 1"}],
+            },
+        }
+        assert set(Field.objects.values_list("value", flat=True)) == {""}
+        assert Template.objects.get(pk=template.pk).version == 1
+
+    def test_field_patch_accepts_valid_values(self, template):
+        response = self.patch(template, {"field1": "Ada", "field2": "3"})
+        assert response.status_code == 200
+        assert response.json()["version"] == 2
+
+    def test_validator_is_cached_per_version(self, template):
+        validator = validation.template_validator(template.pk)
+        assert validation.template_validator(template.pk) is validator
+
+        Template.objects.filter(pk=template.pk).update(version=2)
+        assert validation.template_validator(template.pk) is not validator
+
+    def test_serializer_rejects_malformed_rules(self):
+        data = {"upload_id": "rules", "fields": [make_field(1, validation={"pattern": "("})]}
+        serializer = TemplateSerializer(data=data)
+        assert not serializer.is_valid()
+        assert "validation" in serializer.errors["fields"][0]
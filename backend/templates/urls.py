@@ -1,10 +1,27 @@
 from django.urls import path
 
-from .views import TemplateCreateView, TemplateDetailView
+from .views import (
+    FieldHitTestView,
+    FieldNearestView,
+    FieldOverlapView,
+    TemplateDetailView,
+    TemplateExtractView,
+    TemplateFieldsView,
+    TemplateListCreateView,
+    template_batch,
+    template_render,
+)
 
 app_name = "templates"
 
 urlpatterns = [
-    path("templates/", TemplateCreateView.as_view(), name="template-create"),
+    path("templates/", TemplateListCreateView.as_view(), name="template-create"),
+    path("templates/extract/", TemplateExtractView.as_view(), name="template-extract"),
     path("templates/<int:pk>/", TemplateDetailView.as_view(), name="template-detail"),
+    path("templates/<int:pk>/render/", template_render, name="template-render"),
+    path("templates/<int:pk>/batch/", template_batch, name="template-batch"),
+    path("templates/<int:pk>/fields/", TemplateFieldsView.as_view(), name="template-fields"),
+    path("templates/<int:pk>/fields/hit/", FieldHitTestView.as_view(), name="field-hit-test"),
+    path("templates/<int:pk>/fields/nearest/", FieldNearestView.as_view(), name="field-nearest"),
+    path("templates/<int:pk>/overlaps/", FieldOverlapView.as_view(), name="field-overlaps"),
 ]
@@ -0,0 +1,259 @@
+"""Checking field values against ``Field.validation`` rules.
+
+Each template version is compiled once into a ``TemplateValidator``, cached
+like the spatial and voice match indexes. The rules of every field become a
+short list of checks with their regexes, limits and choice sets already
+built, so validating a value set costs a dict lookup and a few calls per
+value. Compiled rules are also shared by content (``field_check``): fields
+with the same rules, and the same rules across versions, reuse one compiled
+check, so edits that bump the version rebuild a validator without compiling
+anything. That keeps validation cheap enough for every value edit, every
+dictated utterance and every record of a batch fill.
+
+Rules, all optional:
+
+- ``required``: the value must not be blank
+- ``min_length`` / ``max_length``: length in characters
+- ``pattern``: a regular expression the whole value must match
+- ``format`` (or ``type``): ``email``, ``phone``, ``number``, ``integer`` or ``date``
+- ``min`` / ``max``: numeric bounds, which imply a number
+- ``date_format``: ``strptime`` format of ``date`` values, ``%Y-%m-%d`` by default
+- ``choices``: the values allowed
+
+Other keys, such as the ``synonyms`` used by voice matching, and unknown
+formats are ignored. Blank values only fail ``required``; checkbox and radio
+fields are only checked for ``required``.
+"""
+
+import json
+import logging
+import math
+import re
+from datetime import datetime
+from functools import lru_cache
+
+from .cache import VersionedIndexCache
+from .models import Field
+
+logger = logging.getLogger(__name__)
+
+EMAIL = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s.]+")
+PHONE = re.compile(r"\+?[0-9][0-9 ()./-]{5,}[0-9]")
+ISO_DATE = "%Y-%m-%d"
+UNCHECKED_TYPES = ("checkbox", "radio")
+
+
+class InvalidRule(ValueError):
+    pass
+
+
+def _error(code, message):
+    return {"code": code, "message": message}
+
+
+REQUIRED = _error("required", "This field is required")
+
+
+def compile_rules(rules, field_type="text"):
+    """Compile a field's ``rules`` into ``check(value)``, which returns a list of errors.
+
+    Returns None when the rules check nothing. Raises ``InvalidRule`` for
+    rules that cannot be compiled, such as a malformed pattern.
+    """
+    if not isinstance(rules, dict):
+        raise InvalidRule("Validation rules must be an object")
+    required = bool(rules.get("required"))
+    checks = [] if field_type in UNCHECKED_TYPES else _value_checks(rules)
+    if not required and not checks:
+        return None
+
+    def check(value):
+        text = "" if value is None else str(value)
+        if not text.strip():
+            return [REQUIRED] if required else []
+        errors = []
+        for value_check in checks:
+            error = value_check(text)
+            if error is not None:
+                errors.append(error)
+        return errors
+
+    return check
+
+
+def field_check(rules, field_type="text"):
+    """Return ``compile_rules(rules, field_type)``, compiled once per distinct rules."""
+    return _compiled(json.dumps(rules, sort_keys=True), field_type)
+
+
+@lru_cache(maxsize=1024)
+def _compiled(rules_json, field_type):
+    return compile_rules(json.loads(rules_json), field_type)
+
+
+def _value_checks(rules):
+    hint = rules.get("format") or rules.get("type")
+    checks = _length_checks(rules)
+
+    pattern = rules.get("pattern")
+    if pattern:
+        try:
+            regex = re.compile(pattern)
+        except (re.error, TypeError) as e:
+            raise InvalidRule(f"Invalid pattern {pattern!r}: {e}") from None
+        checks.append(_check("pattern", "Enter a value in the expected format", regex.fullmatch))
+
+    if hint == "email":
+        checks.append(_check("email", "Enter a valid email address", EMAIL.fullmatch))
+    elif hint == "phone":
+        checks.append(_check("phone", "Enter a valid phone number", PHONE.fullmatch))
+    elif hint == "date":
+        checks.append(_date_check(rules.get("date_format") or ISO_DATE))
+
+    minimum, maximum = _number_rule(rules, "min"), _number_rule(rules, "max")
+    if hint in ("number", "integer") or minimum is not None or maximum is not None:
+        checks.append(_number_check(hint == "integer", minimum, maximum))
+
+    choices = rules.get("choices")
+    if choices:
+        if not isinstance(choices, list):
+            raise InvalidRule("choices must be a list")
+        allowed = frozenset(str(choice) for choice in choices)
+        message = "Select one of the available choices"
+        checks.append(_check("choices", message, allowed.__contains__))
+    return checks
+
+
+def _length_checks(rules):
+    checks = []
+    min_length = _integer_rule(rules, "min_length")
+    if min_length is not None:
+        message = f"Ensure this value has at least {min_length} characters"
+        checks.append(_check("min_length", message, lambda text: len(text) >= min_length))
+    max_length = _integer_rule(rules, "max_length")
+    if max_length is not None:
+        message = f"Ensure this value has at most {max_length} characters"
+        checks.append(_check("max_length", message, lambda text: len(text) <= max_length))
+    return checks
+
+
+def _check(code, message, passes):
+    return lambda text: None if passes(text) else _error(code, message)
+
+
+def _date_check(date_format):
+    if not isinstance(date_format, str):
+        raise InvalidRule("date_format must be a string")
+    message = f"Enter a date as {date_format}"
+
+    def check(text):
+        try:
+            datetime.strptime(text.strip(), date_format)
+        except ValueError:
+            return _error("date", message)
+        return None
+
+    return check
+
+
+def _number_check(integer, minimum, maximum):
+    if integer:
+        code, message = "integer", "Enter a whole number"
+    else:
+        code, message = "number", "Enter a number"
+
+    def check(text):
+        number = _parse_number(text, integer)
+        if number is None:
+            return _error(code, message)
+        if minimum is not None and number < minimum:
+            return _error("min", f"Ensure this value is at least {minimum:g}")
+        if maximum is not None and number > maximum:
+            return _error("max", f"Ensure this value is at most {maximum:g}")
+        return None
+
+    return check
+
+
+def _parse_number(text, integer):
+    try:
+        number = int(text) if integer else float(text)
+    except ValueError:
+        return None
+    return number if integer or math.isfinite(number) else None
+
+
+def _integer_rule(rules, name):
+    value = rules.get(name)
+    if value is None:
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = -1
+    if isinstance(value, bool) or number < 0:
+        raise InvalidRule(f"{name} must be a non-negative integer")
+    return number
+
+
+def _number_rule(rules, name):
+    value = rules.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise InvalidRule(f"{name} must be a number")
+    return value
+
+
+class TemplateValidator:
+    """The compiled rules of one template version."""
+
+    def __init__(self, fields, version=None):
+        """Compile ``fields``, dicts with field_id, type and validation.
+
+        Rules that do not compile are logged and skipped: the serializer
+        rejects them on save, so only rows written some other way have them.
+        """
+        self.version = version
+        self.checks = {}
+        for field in fields:
+            try:
+                check = field_check(field.get("validation") or {}, field.get("type"))
+            except InvalidRule as e:
+                logger.warning("Ignoring validation of field %s: %s", field["field_id"], e)
+                continue
+            if check is not None:
+                self.checks[field["field_id"]] = check
+
+    @classmethod
+    def build(cls, template_id, version):
+        fields = Field.objects.filter(template_id=template_id).order_by("page_number", "id")
+        return cls(list(fields.values("field_id", "type", "validation")), version)
+
+    def validate(self, values, partial=False):
+        """Return ``{field_id: [errors]}`` for the fields whose value fails; empty if all pass.
+
+        A field missing from ``values`` counts as blank, unless ``partial``
+        is set, in which case only the fields present are checked.
+        """
+        if partial:
+            pairs = ((field_id, values[field_id]) for field_id in values if field_id in self.checks)
+        else:
+            pairs = ((field_id, values.get(field_id)) for field_id in self.checks)
+        errors = {}
+        for field_id, value in pairs:
+            failed = self.checks[field_id](value)
+            if failed:
+                errors[field_id] = failed
+        return errors
+
+
+validator_cache = VersionedIndexCache("VALIDATOR_CACHE_SIZE", TemplateValidator.build)
+
+
+def template_validator(template_id):
+    """Return the validator for the template's current version.
+
+    Raises ``Template.DoesNotExist`` for an unknown template.
+    """
+    return validator_cache.get(template_id)
@@ -1,19 +1,50 @@
 import logging
+import math
 
+from app import retention
+from app.models import Upload
+from app.pages import get_executor, render_workers
+from app.storage import blob_path
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from jobs.queue import enqueue
 from rest_framework import status
-from rest_framework.generics import get_object_or_404
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from . import autodetect, batch, payloads, rendering, spatial
+from .cache import template_cache
+from .listing import TemplatePage
 from .models import Template
-from .serializers import TemplateSerializer
+from .parsers import ColumnarParser
+from .persistence import InvalidValues, UnknownFields, VersionConflict, update_field_values
+from .responses import detail_format, detail_response, etag_matches, not_modified, page_payload
+from .serializers import FieldValuesSerializer, TemplateSerializer
+from .validation import template_validator
 
 logger = logging.getLogger(__name__)
 
+MAX_NEAREST = 50
+
 # Create your views here.
 
 
-class TemplateCreateView(APIView):
+class TemplateListCreateView(APIView):
+    # Templates exported as columns can be posted back as they are
+    parser_classes = (*APIView.parser_classes, ColumnarParser)
+
+    def get(self, request):
+        try:
+            results, cursor = TemplatePage(request.query_params).fetch()
+            return Response(page_payload(request, results, cursor))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.exception("Error listing templates")
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     def post(self, request):
         try:
             serializer = TemplateSerializer(data=request.data)
@@ -23,19 +54,266 @@ class TemplateCreateView(APIView):
 
             obj = serializer.save()
             return Response({"template_id": obj.id}, status=status.HTTP_201_CREATED)
+        except ParseError as e:
+            return Response({"error": str(e.detail)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.exception("Error creating template")
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class TemplateExtractView(APIView):
+    """Create a template from the fields detected in an uploaded PDF.
+
+    Forms seen before (same blob digest) are created right away from the cached
+    layout. Otherwise detection runs as a background job and the response
+    carries its id; the job result holds the new ``template_id``.
+    """
+
+    def post(self, request):
+        try:
+            upload = Upload.objects.select_related("blob").get(
+                upload_id=request.data.get("upload_id")
+            )
+            template = Template.objects.filter(upload_id=upload.upload_id).first()
+            if template is not None:
+                return Response({"template_id": template.id}, status=status.HTTP_200_OK)
+
+            layout = autodetect.cached_layout(upload.blob.sha256)
+            if layout is not None:
+                template = autodetect.create_template(upload, layout)
+                return Response({"template_id": template.id}, status=status.HTTP_201_CREATED)
+
+            job = enqueue("extract_template", {"upload_id": upload.upload_id})
+            return Response({"job_id": job.id}, status=status.HTTP_202_ACCEPTED)
+        except Upload.DoesNotExist:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            logger.exception("Error extracting template")
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class TemplateDetailView(APIView):
+    """The template and its fields, as JSON or, on request, in the ``columnar`` encoding."""
+
+    def perform_content_negotiation(self, request, force=False):
+        # get picks the body format itself; error responses fall back to JSON
+        return super().perform_content_negotiation(request, force=True)
+
     def get(self, request, pk):
         try:
-            template = get_object_or_404(Template, pk=pk)
-            serializer = TemplateSerializer(template)
-            return Response(serializer.data)
+            fmt = detail_format(request)
+            # Conditional GETs for a cached version are answered without any DB work
+            version = template_cache.current_version(pk)
+            if version is not None and etag_matches(request, template_cache.etag(pk, version, fmt)):
+                return not_modified(pk, version, fmt)
+
+            body = template_cache.get(pk, version, fmt) if version is not None else None
+            if body is None:
+                version, body = payloads.detail(pk, fmt)
+                template_cache.store(pk, version, body, fmt)
+                if etag_matches(request, template_cache.etag(pk, version, fmt)):
+                    return not_modified(pk, version, fmt)
+
+            return detail_response(body, pk, version, fmt)
         except Template.DoesNotExist:
             return Response({"error": "Template not found"}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             logger.exception("Error retrieving template")
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class TemplateFieldsView(APIView):
+    """Change the values of a few fields without sending the whole template.
+
+    The request carries the ``version`` the client last saw; a stale one is
+    answered with 409 and the current version. Values failing their field's
+    validation rules are answered with 400 and the errors per field. The
+    response lists only the fields whose value actually changed.
+    """
+
+    def patch(self, request, pk):
+        try:
+            serializer = FieldValuesSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            version, changed = update_field_values(
+                pk, serializer.validated_data["version"], serializer.validated_data["values"]
+            )
+            return Response(
+                {"version": version, "fields": changed},
+                headers={"ETag": template_cache.etag(pk, version)},
+            )
+        except Template.DoesNotExist:
+            return Response({"error": "Template not found"}, status=status.HTTP_404_NOT_FOUND)
+        except VersionConflict as e:
+            return Response(
+                {"error": str(e), "version": e.current}, status=status.HTTP_409_CONFLICT
+            )
+        except UnknownFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except InvalidValues as e:
+            return Response(
+                {"error": str(e), "fields": e.errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            logger.exception("Error updating field values")
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class SpatialQueryView(APIView):
+    """Base for queries against a template's cached spatial index.
+
+    Subclasses define ``query(index, params)`` returning the response data.
+    """
+
+    def get(self, request, pk):
+        try:
+            index = spatial.template_index(pk)
+            return Response(self.query(index, request.query_params))
+        except Template.DoesNotExist:
+            return Response({"error": "Template not found"}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.exception("Error querying field geometry")
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class FieldHitTestView(SpatialQueryView):
+    """Fields whose box contains a point, innermost first."""
+
+    def query(self, index, params):
+        page_number = _query_param(params, "page", int)
+        x, y = _query_param(params, "x", float), _query_param(params, "y", float)
+        page = index.page(page_number)
+        return {
+            "version": index.version,
+            "fields": [page.field(position) for position in page.hit_test(x, y)],
+        }
+
+
+class FieldNearestView(SpatialQueryView):
+    """The fields closest to a point, with their distance in points."""
+
+    def query(self, index, params):
+        page_number = _query_param(params, "page", int)
+        x, y = _query_param(params, "x", float), _query_param(params, "y", float)
+        limit = _query_param(params, "limit", int, default=1)
+        if not 1 <= limit <= MAX_NEAREST:
+            raise ValueError(f"limit must be between 1 and {MAX_NEAREST}")
+        max_distance = _query_param(params, "max_distance", float, default=None)
+        page = index.page(page_number)
+        matches = page.nearest(x, y, limit=limit, max_distance=max_distance)
+        return {
+            "version": index.version,
+            "fields": [page.field(position, distance=distance) for position, distance in matches],
+        }
+
+
+class FieldOverlapView(SpatialQueryView):
+    """Every pair of overlapping fields, optionally restricted to one page."""
+
+    def query(self, index, params):
+        page_number = _query_param(params, "page", int, default=None)
+        page_numbers = sorted(index.pages) if page_number is None else [page_number]
+        overlaps = []
+        for number in page_numbers:
+            page = index.page(number)
+            for a, b, area in page.overlaps():
+                overlaps.append(
+                    {
+                        "page_number": number,
+                        "fields": [page.field_ids[a], page.field_ids[b]],
+                        "area": area,
+                    }
+                )
+        return {"version": index.version, "overlaps": overlaps}
+
+
+# A plain Django view: DRF content negotiation would refuse a PDF Accept header
+@require_GET
+def template_render(request, pk):
+    template = Template.objects.filter(pk=pk).first()
+    if template is None:
+        return JsonResponse({"error": "Template not found"}, status=404)
+    sha256 = rendering.template_source(template)
+    if sha256 is None:
+        return JsonResponse({"error": "Template has no uploaded PDF"}, status=404)
+
+    retention.touch(sha256)
+    error = _source_error(sha256)
+    if error is not None:
+        return error
+    document, update = rendering.render_update(template, sha256)
+    response = StreamingHttpResponse(
+        rendering.stream_filled(document, update), content_type="application/pdf"
+    )
+    response["Content-Length"] = str(document.size + len(update))
+    response["Content-Disposition"] = f'attachment; filename="template-{template.pk}.pdf"'
+    return response
+
+
+@csrf_exempt
+@require_POST
+def template_batch(request, pk):
+    """Fill a template once per JSONL line or CSV row and stream back a ZIP.
+
+    Records failing the template's validation rules, and records that cannot
+    be parsed, are not rendered; they are listed with their errors in an
+    ``errors.jsonl`` entry at the end. Renders run on the shared render pool.
+    """
+    template = Template.objects.filter(pk=pk).first()
+    if template is None:
+        return JsonResponse({"error": "Template not found"}, status=404)
+    sha256 = rendering.template_source(template)
+    if sha256 is None:
+        return JsonResponse({"error": "Template has no uploaded PDF"}, status=404)
+
+    retention.touch(sha256)
+    # Check the source before the response starts streaming
+    error = _source_error(sha256)
+    if error is not None:
+        return error
+    fmt = "csv" if request.content_type == "text/csv" else "jsonl"
+    pdf_path = blob_path(sha256)
+    rejected = []
+    documents = batch.filled_documents(
+        pdf_path,
+        rendering.field_geometry(template),
+        batch.read_value_sets(request, fmt),
+        executor=get_executor(),
+        window=2 * render_workers(),
+        validate=template_validator(template.pk).validate,
+        rejected=rejected,
+    )
+    response = StreamingHttpResponse(
+        batch.stream_zip(pdf_path, documents, rejected), content_type="application/zip"
+    )
+    response["Content-Disposition"] = f'attachment; filename="template-{template.pk}-batch.zip"'
+    return response
+
+
+def _source_error(sha256):
+    """Return an error response if the source PDF cannot be filled, else None."""
+    try:
+        rendering.source_document(sha256)
+    except FileNotFoundError:
+        return JsonResponse({"error": "File not found"}, status=404)
+    except ValueError as e:
+        return JsonResponse({"error": f"Cannot fill the uploaded PDF: {e}"}, status=422)
+    return None
+
+
+def _query_param(params, name, cast, **kwargs):
+    """Read a required query parameter, or an optional one when ``default`` is given."""
+    if name not in params:
+        if "default" in kwargs:
+            return kwargs["default"]
+        raise ValueError(f"Missing query parameter: {name}")
+    try:
+        value = cast(params[name])
+    except ValueError:
+        value = None
+    if value is None or not math.isfinite(value):
+        raise ValueError(f"Invalid value for {name}: {params[name]}")
+    return value
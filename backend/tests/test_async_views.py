@@ -0,0 +1,85 @@
+import asyncio
+import os
+
+import pytest
+from app.models import Blob, Upload
+from app.storage import blob_path, blob_store
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient
+from jobs.models import Job
+
+# The async views share the database from other threads, so every test commits
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture(autouse=True)
+def asgi_urls(settings, pdf_tmp_dir):
+    settings.ROOT_URLCONF = "backend.asgi_urls"
+    return pdf_tmp_dir
+
+
+def post_pdf(content, name="form.pdf", path="/api/uploads/"):
+    pdf_file = SimpleUploadedFile(name, content, content_type="application/pdf")
+    return asyncio.run(AsyncClient().post(path, {"file": pdf_file}))
+
+
+def test_upload_stores_blob_and_queues_render(asgi_urls):
+    content = b"%PDF-1.4\n%Async form"
+    response = post_pdf(content)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["deduplicated"] is False
+    assert data["pages"] == []
+    assert Job.objects.get(pk=data["job_id"]).kind == "render_pages"
+    assert os.path.exists(blob_path(data["sha256"]))
+    assert Upload.objects.get(upload_id=data["upload_id"]).blob.size == len(content)
+
+
+def test_concurrent_duplicate_uploads_share_one_blob(asgi_urls):
+    content = b"%PDF-1.4\n%Same form"
+
+    async def upload_many():
+        client = AsyncClient()
+        return await asyncio.gather(
+            *(
+                client.post(
+                    "/api/uploads/",
+                    {"file": SimpleUploadedFile(f"f{n}.pdf", content, "application/pdf")},
+                )
+                for n in range(8)
+            )
+        )
+
+    responses = asyncio.run(upload_many())
+    assert {response.status_code for response in responses} == {200}
+    assert Blob.objects.count() == 1
+    assert Upload.objects.count() == 8
+    sha256 = responses[0].json()["sha256"]
+    assert list(blob_store().stored()) == [(sha256, blob_path(sha256))]
+    assert os.listdir(asgi_urls) == [sha256[:2]]
+
+
+def test_rejects_non_pdf(asgi_urls):
+    response = post_pdf(b"GIF89a not a pdf", name="form.pdf")
+    assert response.status_code == 400
+    assert response.json() == {"file": ["Only PDF files are allowed"]}
+    assert Blob.objects.count() == 0
+
+
+def test_simple_upload_endpoint(asgi_urls):
+    response = post_pdf(b"%PDF-1.4\n", path="/api/upload/")
+    assert response.status_code == 201
+    assert response.json() == {"message": "File uploaded successfully"}
+
+
+def test_other_routes_fall_through_to_sync_views(asgi_urls):
+    response = asyncio.run(AsyncClient().get("/api/health/"))
+    assert response.json() == {"status": "healthy"}
+
+
+def test_asgi_settings_route_to_async_views():
+    from backend import asgi_settings, settings
+
+    assert asgi_settings.ROOT_URLCONF == "backend.asgi_urls"
+    assert asgi_settings.INSTALLED_APPS == settings.INSTALLED_APPS
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+import pytest
+from django.db import connection
+
+from backend.database import database_config
+
+
+@pytest.mark.django_db
+def test_sqlite_connections_are_tuned():
+    with connection.cursor() as cursor:
+        assert cursor.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert cursor.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert cursor.execute("PRAGMA busy_timeout").fetchone()[0] == 20000
+        assert cursor.execute("PRAGMA mmap_size").fetchone()[0] == 256 * 1024 * 1024
+    assert connection.transaction_mode == "IMMEDIATE"
+
+
+def test_sqlite_is_the_default():
+    config = database_config(Path("/srv/app"), {})
+    assert config["ENGINE"] == "django.db.backends.sqlite3"
+    assert config["NAME"] == "/srv/app/db.sqlite3"
+    assert config["TEST"]["NAME"] == "/srv/app/db_test.sqlite3"
+    assert "PRAGMA journal_mode=WAL" in config["OPTIONS"]["init_command"]
+
+
+def test_sqlite_tuning_comes_from_the_environment():
+    config = database_config(
+        Path("/srv/app"),
+        {"DATABASE_NAME": "/data/v2p.db", "SQLITE_BUSY_TIMEOUT": "2.5", "SQLITE_MMAP_SIZE": "0"},
+    )
+    assert config["NAME"] == "/data/v2p.db"
+    assert "PRAGMA busy_timeout=2500" in config["OPTIONS"]["init_command"]
+    assert "PRAGMA mmap_size=0" in config["OPTIONS"]["init_command"]
+
+
+def test_server_databases_keep_checked_connections():
+    config = database_config(
+        Path("/srv/app"),
+        {
+            "DATABASE_ENGINE": "postgresql",
+            "DATABASE_NAME": "v2p",
+            "DATABASE_HOST": "db",
+            "DATABASE_CONN_MAX_AGE": "60",
+        },
+    )
+    assert config["ENGINE"] == "django.db.backends.postgresql"
+    assert config["HOST"] == "db"
+    assert config["CONN_MAX_AGE"] == 60
+    assert config["CONN_HEALTH_CHECKS"] is True
+
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(ValueError, match="DATABASE_ENGINE"):
+        database_config(Path("/srv/app"), {"DATABASE_ENGINE": "oracle"})
@@ -1,3 +1,4 @@
+import pytest
 from django.urls import reverse
 
 
@@ -6,3 +7,35 @@ def test_health_check(api_client):
     response = api_client.get(url)
     assert response.status_code == 200
     assert response.json() == {'status': 'healthy'}
+
+
+def test_liveness(api_client):
+    response = api_client.get(reverse('liveness'))
+    assert response.status_code == 200
+    assert response.json() == {'status': 'alive'}
+
+
+@pytest.mark.django_db
+def test_readiness_reports_checks(api_client, settings, tmp_path):
+    settings.PDF_TMP_DIR = str(tmp_path / 'pdf')
+    settings.PAGE_RENDER_DIR = str(tmp_path / 'pages' / 'not-created-yet')
+    settings.HEALTH_MIN_FREE_BYTES = 1
+    response = api_client.get(reverse('readiness'))
+    assert response.status_code == 200
+    body = response.json()
+    assert body['status'] == 'ready'
+    assert set(body['checks']) == {'database', 'pdf_storage', 'page_cache'}
+    assert all(check['ok'] for check in body['checks'].values())
+
+
+@pytest.mark.django_db
+def test_readiness_fails_when_disk_is_short(api_client, settings, tmp_path):
+    settings.PDF_TMP_DIR = str(tmp_path)
+    settings.PAGE_RENDER_DIR = str(tmp_path)
+    settings.HEALTH_MIN_FREE_BYTES = 2 ** 62
+    response = api_client.get(reverse('readiness'))
+    assert response.status_code == 503
+    body = response.json()
+    assert body['status'] == 'unavailable'
+    assert body['checks']['database']['ok']
+    assert not body['checks']['pdf_storage']['ok']
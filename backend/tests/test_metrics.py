@@ -0,0 +1,149 @@
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from app import metrics
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from templates.models import Template
+
+
+@pytest.fixture
+def registry(monkeypatch, settings):
+    settings.METRICS_DIR = None
+    registry = metrics.Registry()
+    monkeypatch.setattr(metrics, "registry", registry)
+    return registry
+
+
+def sample(samples, name, **labels):
+    return samples.get((name, tuple(sorted(labels.items()))))
+
+
+def test_endpoint_serves_prometheus_text(client, registry):
+    client.get(reverse("health_check"))
+    response = client.get(reverse("metrics"))
+    assert response.status_code == 200
+    assert response["Content-Type"] == metrics.CONTENT_TYPE
+    text = response.content.decode()
+    assert "# TYPE http_requests_total counter" in text
+    assert 'http_requests_total{method="GET",route="api/health/",status="200"} 1' in text
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="api/health/",le="+Inf"} 1' in (
+        text
+    )
+    assert 'http_request_duration_seconds_count{method="GET",route="api/health/"} 1' in text
+
+
+@pytest.mark.django_db
+def test_requests_are_labelled_by_route(client, registry):
+    client.get("/api/templates/1/")
+    client.get("/api/templates/2/")
+    client.get("/no/such/page/")
+    client.post(reverse("metrics"))
+    samples = registry.samples()
+    assert (
+        sample(
+            samples,
+            "http_requests_total",
+            route="api/templates/<int:pk>/",
+            method="GET",
+            status="404",
+        )
+        == 2
+    )
+    assert (
+        sample(samples, "http_requests_total", route="unmatched", method="GET", status="404") == 1
+    )
+    assert (
+        sample(samples, "http_requests_total", route="api/metrics/", method="POST", status="405")
+        == 1
+    )
+    assert sample(samples, "http_requests_in_flight") == 0
+
+
+@pytest.mark.django_db
+def test_database_queries_are_counted_per_request(client, registry):
+    template = Template.objects.create(upload_id="metrics")
+    response = client.get(reverse("templates:template-detail", args=[template.pk]))
+    assert response.status_code == 200
+    samples = registry.samples()
+    route = "api/templates/<int:pk>/"
+    assert sample(samples, "http_db_queries_total", route=route) >= 1
+    assert sample(samples, "http_db_query_seconds_total", route=route) > 0
+    assert sample(samples, "http_response_bytes_total", route=route) == len(response.content)
+
+
+def test_upload_throughput_is_observed(client, registry):
+    content = b"%PDF-1.4\n" + b"0" * 100000
+    client.post(reverse("upload_file"), {"file": SimpleUploadedFile("a.pdf", content)})
+    samples = registry.samples()
+    route = "api/upload/"
+    assert sample(samples, "http_request_bytes_total", route=route) > len(content)
+    counts = sample(samples, "http_upload_bytes_per_second", route=route)
+    assert sum(counts[:-1]) == 1
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = metrics.Registry()
+    for value in (0.001, 0.02, 0.02, 60):
+        registry.observe("http_request_duration_seconds", value, route="r")
+    text = metrics.render(registry.samples())
+    assert 'http_request_duration_seconds_bucket{route="r",le="0.005"} 1' in text
+    assert 'http_request_duration_seconds_bucket{route="r",le="0.025"} 3' in text
+    assert 'http_request_duration_seconds_bucket{route="r",le="30.0"} 3' in text
+    assert 'http_request_duration_seconds_bucket{route="r",le="+Inf"} 4' in text
+    assert 'http_request_duration_seconds_sum{route="r"} 60.041' in text
+
+
+def test_label_values_are_escaped():
+    registry = metrics.Registry()
+    registry.inc("upload_rejections_total", reason='a "b"\\c\n')
+    text = metrics.render(registry.samples())
+    assert 'upload_rejections_total{reason="a \\"b\\"\\\\c\\n"} 1' in text
+
+
+def test_threads_record_into_separate_shards():
+    registry = metrics.Registry()
+
+    def work():
+        for _ in range(1000):
+            registry.inc("http_requests_total", route="r")
+
+    with ThreadPoolExecutor(4) as pool:
+        for _ in range(8):
+            pool.submit(work)
+    assert registry.samples() == {("http_requests_total", (("route", "r"),)): 8000}
+
+
+def test_collect_adds_up_processes_and_archives_exited_ones(monkeypatch, settings, tmp_path):
+    settings.METRICS_DIR = str(tmp_path)
+    settings.METRICS_FLUSH_INTERVAL = 3600
+    exited = subprocess.run(
+        [sys.executable, "-c", "import os; print(os.getpid())"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    dead_pid = int(exited.stdout)
+
+    for pid, requests in ((dead_pid, 3), (dead_pid, 4)):
+        worker = metrics.Registry()
+        worker.pid = pid
+        worker.inc("http_requests_total", requests, route="r")
+        worker.inc("http_requests_in_flight", 1)
+        worker.flush(force=True)
+    current = metrics.Registry()
+    current.inc("http_requests_total", 5, route="r")
+    monkeypatch.setattr(metrics, "registry", current)
+
+    totals = metrics.collect()
+    assert sample(totals, "http_requests_total", route="r") == 12
+    # Gauges of exited processes describe nothing that is still running
+    assert sample(totals, "http_requests_in_flight") is None
+    files = sorted(path.name for path in tmp_path.glob("*.json"))
+    assert files == sorted([metrics.ARCHIVE, f"{current.token}.json"])
+
+    current.inc("http_requests_total", route="r")
+    assert sample(metrics.collect(), "http_requests_total", route="r") == 13
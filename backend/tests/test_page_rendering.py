@@ -0,0 +1,72 @@
+import io
+import os
+
+import pytest
+from app import pages
+from app.storage import blob_path
+from app.testing import make_pdf, upload
+from django.urls import reverse
+from PIL import Image
+
+
+@pytest.fixture
+def render_settings(settings, tmp_path):
+    settings.PDF_TMP_DIR = str(tmp_path / "pdf")
+    settings.PAGE_RENDER_DIR = str(tmp_path / "pages")
+    settings.PAGE_RENDER_DPIS = (72, 150)
+    settings.PAGE_RENDER_FORMATS = ("webp", "png")
+    settings.PAGE_RENDER_WORKERS = 0
+    os.makedirs(settings.PDF_TMP_DIR)
+    return settings
+
+
+@pytest.mark.django_db
+def test_upload_returns_page_descriptors_without_rendering(api_client, render_settings):
+    data = upload(api_client, make_pdf(page_count=3))
+
+    assert [page["page"] for page in data["pages"]] == [1, 2, 3]
+    assert data["pages"][0]["width"] == 612
+    assert len(data["pages"][0]["images"]) == 4
+    cached = os.listdir(os.path.join(render_settings.PAGE_RENDER_DIR, data["sha256"]))
+    assert cached == ["pages.json"]
+
+
+@pytest.mark.django_db
+def test_page_image_is_rendered_lazily_and_cached(client, api_client, render_settings):
+    data = upload(api_client, make_pdf())
+    image = next(i for i in data["pages"][1]["images"] if i["dpi"] == 150 and i["format"] == "png")
+
+    response = client.get(image["url"])
+    assert response.status_code == 200
+    assert response["Content-Type"] == "image/png"
+    rendered = Image.open(io.BytesIO(b"".join(response.streaming_content)))
+    assert rendered.width == 1275
+
+    path = pages.rendered_path(data["sha256"], 2, 150, "png")
+    assert os.path.exists(path)
+    mtime = os.path.getmtime(path)
+    client.get(image["url"])
+    assert os.path.getmtime(path) == mtime
+
+
+@pytest.mark.django_db
+def test_page_image_rejects_unknown_page_and_dpi(client, api_client, render_settings):
+    data = upload(api_client, make_pdf(page_count=1))
+    url = reverse("page_image", args=[data["upload_id"], 1])
+    assert client.get(f"{url}?dpi=600").status_code == 400
+    missing = reverse("page_image", args=[data["upload_id"], 5])
+    assert client.get(missing).status_code == 404
+
+
+def test_render_all_uses_process_pool(render_settings, tmp_path):
+    render_settings.PAGE_RENDER_WORKERS = 2
+    sha256 = "a" * 64
+    os.makedirs(os.path.dirname(blob_path(sha256)))
+    with open(blob_path(sha256), "wb") as f:
+        f.write(make_pdf(page_count=3))
+    try:
+        paths = pages.render_all(sha256, 72, "webp")
+    finally:
+        pages.shutdown_executor()
+    assert [os.path.basename(path) for path in paths] == ["1-72.webp", "2-72.webp", "3-72.webp"]
+    assert all(os.path.getsize(path) > 0 for path in paths)
@@ -0,0 +1,136 @@
+import os
+
+import pytest
+from app.blobstore import FlatBlobStore, ShardedBlobStore, mapped
+from app.downloads import RangeNotSatisfiable, parse_range
+from app.storage import blob_path, blob_store
+from app.testing import make_pdf, upload
+from django.core.management import call_command
+from django.urls import reverse
+
+CONTENT = make_pdf(page_count=3)
+
+
+@pytest.fixture
+def stored(api_client, settings, pdf_tmp_dir):
+    settings.PDF_DOWNLOAD_OFFLOAD = None
+    return upload(api_client, CONTENT)
+
+
+def download(client, data, **headers):
+    response = client.get(reverse("upload_download", args=[data["upload_id"]]), headers=headers)
+    body = b"".join(response.streaming_content) if response.streaming else response.content
+    return response, body
+
+
+@pytest.mark.django_db
+class TestDownload:
+    def test_whole_file(self, client, stored):
+        response, body = download(client, stored)
+        assert response.status_code == 200
+        assert body == CONTENT
+        assert response["Content-Type"] == "application/pdf"
+        assert response["Content-Length"] == str(len(CONTENT))
+        assert response["Accept-Ranges"] == "bytes"
+        assert response["ETag"] == f'"{stored["sha256"]}"'
+        assert response["Content-Disposition"] == 'inline; filename="form.pdf"'
+
+    def test_byte_range(self, client, stored):
+        response, body = download(client, stored, Range="bytes=10-109")
+        assert response.status_code == 206
+        assert body == CONTENT[10:110]
+        assert response["Content-Length"] == "100"
+        assert response["Content-Range"] == f"bytes 10-109/{len(CONTENT)}"
+
+    def test_open_and_suffix_ranges(self, client, stored):
+        response, body = download(client, stored, Range=f"bytes={len(CONTENT) - 20}-")
+        assert response.status_code == 206
+        assert body == CONTENT[-20:]
+        response, body = download(client, stored, Range="bytes=-7")
+        assert body == CONTENT[-7:]
+        size = len(CONTENT)
+        assert response["Content-Range"] == f"bytes {size - 7}-{size - 1}/{size}"
+
+    def test_range_past_the_end_is_not_satisfiable(self, client, stored):
+        response, _ = download(client, stored, Range=f"bytes={len(CONTENT)}-")
+        assert response.status_code == 416
+        assert response["Content-Range"] == f"bytes */{len(CONTENT)}"
+
+    def test_multiple_ranges_and_stale_if_range_get_the_whole_file(self, client, stored):
+        response, body = download(client, stored, Range="bytes=0-1,5-6")
+        assert response.status_code == 200
+        assert body == CONTENT
+        response, body = download(client, stored, Range="bytes=0-1", **{"If-Range": '"other"'})
+        assert response.status_code == 200
+        assert body == CONTENT
+
+    def test_matching_etag_is_not_modified(self, client, stored):
+        response, _ = download(client, stored, **{"If-None-Match": f'"{stored["sha256"]}"'})
+        assert response.status_code == 304
+
+    def test_x_accel_redirect(self, client, stored, settings):
+        settings.PDF_DOWNLOAD_OFFLOAD = "x-accel-redirect"
+        sha256 = stored["sha256"]
+        response, body = download(client, stored, Range="bytes=0-9")
+        assert response.status_code == 200
+        assert body == b""
+        assert response["X-Accel-Redirect"] == (
+            f"/protected/pdf/{sha256[:2]}/{sha256[2:4]}/{sha256}.pdf"
+        )
+        assert response["ETag"] == f'"{sha256}"'
+
+    def test_x_sendfile(self, client, stored, settings):
+        settings.PDF_DOWNLOAD_OFFLOAD = "x-sendfile"
+        response, body = download(client, stored)
+        assert body == b""
+        assert response["X-Sendfile"] == os.path.abspath(blob_path(stored["sha256"]))
+
+    def test_missing_upload_or_file(self, client, stored):
+        assert client.get(reverse("upload_download", args=["nope"])).status_code == 404
+        os.remove(blob_path(stored["sha256"]))
+        response, _ = download(client, stored)
+        assert response.status_code == 404
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-0", 100) == (0, 0)
+    assert parse_range("bytes=90-200", 100) == (90, 99)
+    assert parse_range("bytes=-200", 100) == (0, 99)
+    assert parse_range("bytes=5-1", 100) is None
+    assert parse_range("items=0-1", 100) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=-0", 100)
+
+
+class TestBlobStores:
+    def test_layouts(self, tmp_path):
+        sha256 = "0123" + "f" * 60
+        assert FlatBlobStore(str(tmp_path)).path(sha256) == str(tmp_path / f"{sha256}.pdf")
+        assert ShardedBlobStore(str(tmp_path)).path(sha256) == str(
+            tmp_path / "01" / "23" / f"{sha256}.pdf"
+        )
+
+    def test_mapped_reads_the_file(self, tmp_path):
+        path = tmp_path / "a.pdf"
+        path.write_bytes(CONTENT)
+        with mapped(path) as content:
+            assert content[:5] == b"%PDF-"
+            assert len(content) == len(CONTENT)
+        path.write_bytes(b"")
+        with mapped(path) as content:
+            assert content.read() == b""
+
+    def test_migrate_blob_layout_moves_flat_files(self, settings, tmp_path):
+        settings.PDF_TMP_DIR = str(tmp_path)
+        digests = [c * 64 for c in "abc"]
+        for sha256 in digests:
+            (tmp_path / f"{sha256}.pdf").write_bytes(CONTENT)
+        (tmp_path / "session.upload").write_bytes(b"partial")
+
+        call_command("migrate_blob_layout")
+
+        assert sorted(sha256 for sha256, _ in blob_store().stored()) == digests
+        assert sorted(os.listdir(tmp_path)) == ["aa", "bb", "cc", "session.upload"]
+        with open(blob_path("a" * 64), "rb") as f:
+            assert f.read() == CONTENT
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+from app.models import Blob, Upload
+from app.storage import blob_path, blob_store
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from jobs.models import Job
+
+
+def post_pdf(api_client, content, name="form.pdf"):
+    pdf_file = SimpleUploadedFile(name, content, content_type="application/pdf")
+    return api_client.post(reverse("pdf_upload"), {"file": pdf_file}, format="multipart")
+
+
+@pytest.mark.django_db
+def test_upload_stores_blob_by_digest(api_client, pdf_tmp_dir):
+    content = b"%PDF-1.4\n%Blank form"
+    response = post_pdf(api_client, content)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["pages"] == []
+    assert data["deduplicated"] is False
+    assert Job.objects.get(pk=data["job_id"]).kind == "render_pages"
+    assert os.path.exists(blob_path(data["sha256"]))
+    assert Upload.objects.get(upload_id=data["upload_id"]).blob.size == len(content)
+
+
+@pytest.mark.django_db
+def test_repeated_upload_aliases_existing_blob(api_client, pdf_tmp_dir):
+    content = b"%PDF-1.4\n%Blank government form"
+    first = post_pdf(api_client, content).json()
+    second = post_pdf(api_client, content, name="copy.pdf").json()
+
+    assert second["deduplicated"] is True
+    assert second["job_id"] is None
+    assert second["sha256"] == first["sha256"]
+    assert second["upload_id"] != first["upload_id"]
+    assert Blob.objects.count() == 1
+    assert Upload.objects.count() == 2
+    # Only the blob itself is left on disk, no per-upload copies or temp files
+    assert list(blob_store().stored()) == [(first["sha256"], blob_path(first["sha256"]))]
+    assert os.listdir(pdf_tmp_dir) == [first["sha256"][:2]]
@@ -0,0 +1,127 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from app import resumable
+from app.models import Upload
+from app.storage import blob_path, blob_store
+from django.db import connection
+from django.urls import reverse
+
+PDF = b"%PDF-1.4\n" + b"scanned page data " * 500
+
+
+def create_session(api_client, content=PDF, **extra):
+    payload = {"filename": "scan.pdf", "length": len(content), **extra}
+    response = api_client.post(reverse("upload_session_create"), payload, format="json")
+    assert response.status_code == 201, response.json()
+    return response
+
+
+def patch_chunk(api_client, url, offset, chunk):
+    return api_client.generic(
+        "PATCH",
+        url,
+        chunk,
+        content_type="application/offset+octet-stream",
+        HTTP_UPLOAD_OFFSET=str(offset),
+    )
+
+
+@pytest.mark.django_db
+class TestResumableUpload:
+    def test_chunks_resume_from_reported_offset(self, api_client, pdf_tmp_dir):
+        url = create_session(api_client)["Location"]
+
+        assert patch_chunk(api_client, url, 0, PDF[:4000]).json()["offset"] == 4000
+        # Wrong offset is refused and the current one reported
+        conflict = patch_chunk(api_client, url, 0, PDF[:100])
+        assert conflict.status_code == 409
+        assert conflict["Upload-Offset"] == "4000"
+
+        offset = int(api_client.head(url)["Upload-Offset"])
+        response = patch_chunk(api_client, url, offset, PDF[offset:])
+        assert response.json()["offset"] == len(PDF)
+
+        finalized = api_client.post(f"{url}finalize/")
+        assert finalized.status_code == 200
+        data = finalized.json()
+        assert data["sha256"] == hashlib.sha256(PDF).hexdigest()
+        upload = Upload.objects.get(upload_id=data["upload_id"])
+        assert upload.filename == "scan.pdf"
+        assert list(blob_store().stored()) == [(data["sha256"], blob_path(data["sha256"]))]
+        assert os.listdir(pdf_tmp_dir) == [data["sha256"][:2]]
+
+    def test_chunk_is_not_written_past_declared_length(self, api_client, pdf_tmp_dir):
+        url = create_session(api_client, content=PDF[:10])["Location"]
+        assert patch_chunk(api_client, url, 0, PDF[:50]).json()["offset"] == 10
+
+    def test_finalize_requires_complete_upload(self, api_client, pdf_tmp_dir):
+        url = create_session(api_client)["Location"]
+        patch_chunk(api_client, url, 0, PDF[:10])
+        assert api_client.post(f"{url}finalize/").status_code == 409
+
+    def test_finalize_checks_declared_hash(self, api_client, pdf_tmp_dir):
+        url = create_session(api_client, sha256="0" * 64)["Location"]
+        patch_chunk(api_client, url, 0, PDF)
+        response = api_client.post(f"{url}finalize/")
+        assert response.status_code == 400
+        assert api_client.get(url).json()["offset"] == 0
+
+    def test_rejects_non_pdf_and_oversized_sessions(self, api_client, pdf_tmp_dir, settings):
+        settings.UPLOAD_SESSION_MAX_SIZE = 100
+        payload = {"filename": "notes.txt", "length": 10}
+        response = api_client.post(reverse("upload_session_create"), payload, format="json")
+        assert "filename" in response.json()
+        payload = {"filename": "scan.pdf", "length": 101}
+        response = api_client.post(reverse("upload_session_create"), payload, format="json")
+        assert "length" in response.json()
+
+
+class StalledStream(io.BytesIO):
+    """Stream read in small pieces that stops after the first one until ``resume`` is set."""
+
+    def __init__(self, data):
+        """Serve ``data``, pausing once the first chunk has been read."""
+        super().__init__(data)
+        self.started = threading.Event()
+        self.resume = threading.Event()
+
+    def read(self, size=-1):
+        if self.started.is_set():
+            self.resume.wait()
+        self.started.set()
+        return super().read(min(size, 1000))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_overlapping_appends_are_serialized(pdf_tmp_dir):
+    session = resumable.create_session("scan.pdf", len(PDF))
+    stalled = StalledStream(PDF)
+
+    def append(stream):
+        try:
+            return resumable.append_chunk(session, 0, stream)
+        except resumable.OffsetMismatch as e:
+            return e
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(2) as pool:
+        first = pool.submit(append, stalled)
+        stalled.started.wait()
+        # The retry arrives while the first PATCH is still writing
+        retry = pool.submit(append, io.BytesIO(PDF))
+        time.sleep(0.2)
+        stalled.resume.set()
+
+    assert first.result() == len(PDF)
+    assert isinstance(retry.result(), resumable.OffsetMismatch)
+    assert retry.result().args == (len(PDF),)
+    with open(resumable.session_path(session), "rb") as f:
+        assert f.read() == PDF
+    assert resumable.finalize(session)[1] is True
@@ -0,0 +1,229 @@
+import hashlib
+import io
+import os
+import time
+from datetime import timedelta
+
+import pytest
+from app import resumable, retention
+from app.models import Blob, Upload, UploadSession
+from app.storage import blob_path
+from app.testing import make_pdf, upload
+from django.conf import settings
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from templates.models import Template
+
+
+@pytest.fixture
+def storage_settings(settings, tmp_path):
+    settings.PDF_TMP_DIR = str(tmp_path / "pdf")
+    settings.PAGE_RENDER_DIR = str(tmp_path / "pages")
+    settings.STORAGE_QUOTA_BYTES = 10**9
+    settings.STORAGE_MAX_AGE = 7 * 24 * 3600
+    settings.STORAGE_EVICTION_GRACE = 600
+    settings.STORAGE_TOUCH_INTERVAL = 300
+    os.makedirs(settings.PDF_TMP_DIR)
+    os.makedirs(settings.PAGE_RENDER_DIR)
+    retention._touched.clear()
+    return settings
+
+
+def make_blob(name, size=1000, artifacts=0, age=3600):
+    """Store a blob with ``artifacts`` bytes of page renders, last used ``age`` seconds ago."""
+    content = b"%PDF-1.4\n" + name.encode() * size
+    content = content[:size]
+    sha256 = hashlib.sha256(content).hexdigest()
+    os.makedirs(os.path.dirname(blob_path(sha256)), exist_ok=True)
+    with open(blob_path(sha256), "wb") as f:
+        f.write(content)
+    if artifacts:
+        directory = os.path.join(settings.PAGE_RENDER_DIR, sha256)
+        os.makedirs(directory)
+        with open(os.path.join(directory, "page-1.png"), "wb") as f:
+            f.write(b"\0" * artifacts)
+    blob = Blob.objects.create(
+        sha256=sha256, size=size, last_accessed=timezone.now() - timedelta(seconds=age)
+    )
+    Upload.objects.create(upload_id=f"upload-{name}", blob=blob, filename=f"{name}.pdf")
+    return blob
+
+
+def age_path(path, seconds):
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+@pytest.mark.django_db
+class TestSweep:
+    def test_evicts_least_recently_used_until_under_quota(self, storage_settings):
+        oldest = make_blob("a", age=5000)
+        middle = make_blob("b", age=4000)
+        newest = make_blob("c", age=3000)
+        storage_settings.STORAGE_QUOTA_BYTES = 1500
+
+        report = retention.sweep()
+
+        assert report["evicted_blobs"] == 2
+        assert report["freed_bytes"] == 2000
+        assert list(Blob.objects.values_list("sha256", flat=True)) == [newest.sha256]
+        assert not os.path.exists(blob_path(oldest.sha256))
+        assert not os.path.exists(blob_path(middle.sha256))
+        assert not Upload.objects.filter(blob_id__in=[oldest.pk, middle.pk]).exists()
+
+    def test_counts_artifacts_against_quota(self, storage_settings):
+        old = make_blob("a", artifacts=4000, age=5000)
+        make_blob("b", age=3000)
+        storage_settings.STORAGE_QUOTA_BYTES = 3000
+
+        report = retention.sweep()
+
+        assert report == {
+            "evicted_blobs": 1,
+            "evicted_artifacts": 0,
+            "stray_files": 0,
+            "freed_bytes": 5000,
+        }
+        assert not os.path.exists(os.path.join(storage_settings.PAGE_RENDER_DIR, old.sha256))
+
+    def test_evicts_expired_blobs_under_quota(self, storage_settings):
+        storage_settings.STORAGE_MAX_AGE = 3600
+        make_blob("a", age=7200)
+        kept = make_blob("b", age=1800)
+
+        assert retention.sweep()["evicted_blobs"] == 1
+        assert list(Blob.objects.values_list("pk", flat=True)) == [kept.pk]
+
+    def test_keeps_template_pdfs_but_drops_their_renders(self, storage_settings):
+        blob = make_blob("a", artifacts=4000, age=5000)
+        Template.objects.create(upload_id="upload-a")
+        storage_settings.STORAGE_QUOTA_BYTES = 2000
+
+        report = retention.sweep()
+
+        assert report["evicted_blobs"] == 0
+        assert report["evicted_artifacts"] == 1
+        assert os.path.exists(blob_path(blob.sha256))
+        assert not os.path.exists(os.path.join(storage_settings.PAGE_RENDER_DIR, blob.sha256))
+        blob.refresh_from_db()
+        assert blob.artifacts_size == 0
+
+    def test_recently_used_blobs_are_never_evicted(self, storage_settings):
+        make_blob("a", age=60)
+        storage_settings.STORAGE_QUOTA_BYTES = 0
+        storage_settings.STORAGE_MAX_AGE = 0
+
+        assert retention.sweep()["evicted_blobs"] == 0
+        assert Blob.objects.count() == 1
+
+    def test_dry_run_changes_nothing(self, storage_settings):
+        blob = make_blob("a", age=5000)
+        storage_settings.STORAGE_QUOTA_BYTES = 0
+
+        report = retention.sweep(dry_run=True)
+
+        assert report["evicted_blobs"] == 1
+        assert report["freed_bytes"] == 1000
+        assert Blob.objects.filter(pk=blob.pk).exists()
+        assert os.path.exists(blob_path(blob.sha256))
+
+    def test_removes_old_strays_and_abandoned_sessions(self, storage_settings):
+        kept = make_blob("a", age=60)
+        stray = os.path.join(storage_settings.PDF_TMP_DIR, "tmp1234.part")
+        fresh = os.path.join(storage_settings.PDF_TMP_DIR, "tmp5678.part")
+        orphan_pages = os.path.join(storage_settings.PAGE_RENDER_DIR, "f" * 64)
+        for path in (stray, fresh):
+            with open(path, "wb") as f:
+                f.write(b"x" * 10)
+        os.makedirs(orphan_pages)
+        age_path(stray, 3600)
+        age_path(orphan_pages, 3600)
+
+        storage_settings.STORAGE_MAX_AGE = 3600
+        abandoned = resumable.create_session("scan.pdf", 100)
+        UploadSession.objects.filter(pk=abandoned.pk).update(
+            updated_at=timezone.now() - timedelta(hours=2)
+        )
+        active = resumable.create_session("scan.pdf", 100)
+        age_path(resumable.session_path(active), 3600)
+
+        report = retention.sweep()
+
+        assert report["stray_files"] == 3
+        assert sorted(os.listdir(storage_settings.PDF_TMP_DIR)) == sorted(
+            [kept.sha256[:2], "tmp5678.part", f"{active.session_id}.upload"]
+        )
+        assert not os.path.exists(orphan_pages)
+        assert list(UploadSession.objects.values_list("pk", flat=True)) == [active.pk]
+
+    def test_strays_in_shards_go_and_unmigrated_flat_blobs_stay(self, storage_settings):
+        kept = make_blob("a", age=60)
+        legacy = os.path.join(storage_settings.PDF_TMP_DIR, f"{kept.sha256}.pdf")
+        os.replace(blob_path(kept.sha256), legacy)
+        orphan = blob_path("e" * 64)
+        os.makedirs(os.path.dirname(orphan))
+        with open(orphan, "wb") as f:
+            f.write(b"x" * 10)
+        age_path(legacy, 3600)
+        age_path(orphan, 3600)
+
+        report = retention.sweep()
+
+        assert report["stray_files"] == 1
+        assert os.path.exists(legacy)
+        assert not os.path.exists(orphan)
+
+    def test_command_prints_report(self, storage_settings):
+        make_blob("a", age=5000)
+        storage_settings.STORAGE_QUOTA_BYTES = 0
+        out = io.StringIO()
+
+        call_command("sweep_storage", stdout=out)
+
+        assert "Evicted 1 blob(s)" in out.getvalue()
+        assert Blob.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_deduplicated_upload_refreshes_last_accessed(api_client, storage_settings):
+    content = make_pdf(page_count=1)
+    upload(api_client, content)
+    blob = Blob.objects.get()
+    Blob.objects.filter(pk=blob.pk).update(last_accessed=timezone.now() - timedelta(days=1))
+
+    upload(api_client, content)
+
+    blob.refresh_from_db()
+    assert timezone.now() - blob.last_accessed < timedelta(minutes=1)
+
+
+@pytest.mark.django_db
+def test_touch_is_throttled(storage_settings):
+    blob = make_blob("a")
+    retention.touch(blob.sha256)
+    blob.refresh_from_db()
+    first = blob.last_accessed
+    assert timezone.now() - first < timedelta(minutes=1)
+
+    Blob.objects.filter(pk=blob.pk).update(last_accessed=first - timedelta(hours=1))
+    retention.touch(blob.sha256)
+    blob.refresh_from_db()
+    assert blob.last_accessed == first - timedelta(hours=1)
+
+
+@pytest.mark.django_db
+def test_usage_endpoint(api_client, storage_settings):
+    blob = make_blob("a", artifacts=500)
+    Template.objects.create(upload_id="upload-a")
+    make_blob("b")
+    retention.measure_artifacts()
+
+    data = api_client.get(reverse("storage_usage")).json()
+
+    assert data["blobs"] == 2
+    assert data["blob_bytes"] == 2000
+    assert data["artifact_bytes"] == 500
+    assert data["total_bytes"] == 2500
+    assert data["referenced_bytes"] == blob.size
+    assert data["quota_bytes"] == storage_settings.STORAGE_QUOTA_BYTES
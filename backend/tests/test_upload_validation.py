@@ -0,0 +1,70 @@
+import pytest
+from app import metrics as app_metrics, upload_handlers
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    monkeypatch.setattr(app_metrics, "registry", app_metrics.Registry())
+    return upload_handlers.rejection_metrics
+
+
+def post_file(client, name, content, url="pdf_upload"):
+    upload = SimpleUploadedFile(name, content, content_type="application/pdf")
+    return client.post(reverse(url), {"file": upload})
+
+
+@pytest.mark.django_db
+def test_pdf_named_file_without_magic_bytes_is_rejected(client, pdf_tmp_dir, metrics):
+    content = b"<html>" + b"x" * 300_000
+    response = post_file(client, "fake.pdf", content)
+
+    assert response.status_code == 400
+    assert response.json() == {"file": ["Only PDF files are allowed"]}
+    stats = metrics()["not_pdf"]
+    assert stats["count"] == 1
+    # Rejected on the first chunk, so most of the body was never read
+    assert stats["bytes_saved"] > 200_000
+    assert list(pdf_tmp_dir.iterdir()) == []
+
+
+@pytest.mark.django_db
+def test_oversized_upload_is_rejected_before_reading_body(client, pdf_tmp_dir, metrics, settings):
+    settings.PDF_UPLOAD_MAX_SIZE = 1024
+    response = post_file(client, "big.pdf", b"%PDF-1.4\n" + b"0" * 200_000)
+
+    assert response.status_code == 413
+    assert "maximum upload size" in response.json()["file"][0]
+    assert metrics()["too_large"]["bytes_saved"] > 200_000
+
+
+@pytest.mark.django_db
+def test_file_of_exactly_the_limit_is_accepted(client, pdf_tmp_dir, metrics, settings):
+    settings.PDF_UPLOAD_MAX_SIZE = 1024
+    content = b"%PDF-1.4\n" + b"0" * (1024 - 9)
+    assert post_file(client, "exact.pdf", content).status_code == 200
+
+    response = post_file(client, "over.pdf", content + b"0")
+    assert response.status_code == 413
+    assert metrics()["too_large"]["count"] == 1
+
+
+def test_limit_is_enforced_while_streaming():
+    handler = upload_handlers.PDFUploadHandler(max_size=10)
+    handler.new_file("file", "a.pdf", "application/pdf", None)
+    handler.receive_data_chunk(b"%PDF-1.4", 0)
+    with pytest.raises(upload_handlers.StopUpload):
+        handler.receive_data_chunk(b"more bytes", 8)
+    assert handler.rejection.reason == "too_large"
+
+
+def test_explicit_zero_limit_is_kept():
+    assert upload_handlers.PDFUploadHandler(max_size=0).max_size == 0
+
+
+@pytest.mark.django_db
+def test_valid_pdf_passes_through(client, pdf_tmp_dir, metrics):
+    response = post_file(client, "form.pdf", b"%PDF-1.4\n%Form")
+    assert response.status_code == 200
+    assert metrics() == {}
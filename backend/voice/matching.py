@@ -0,0 +1,356 @@
+"""Assign dictated values to template fields.
+
+Each template version is compiled once into a ``MatchIndex``: the label,
+field id and ``validation["synonyms"]`` of every field become token phrases
+in an Aho-Corasick automaton, and every phrase token is also indexed by its
+one-character deletions so that a misrecognised word (one edit away) still
+resolves. Near misses are only tried for longer words that match no label
+as spoken, and only where they continue or start a label phrase, so ordinary
+value words ("lame" after "name is") stay values. Matching a transcript is a
+single pass over its tokens, however many fields the template has.
+
+The text between one spoken label and the next becomes the value of the
+first field, cleaned up according to the field type and validation hints.
+
+``TranscriptMatcher`` follows a transcript that grows while it is dictated.
+Label mentions far enough from the end cannot change as words are added, so
+their values are kept and each update only rescans the tail from the last
+unsettled mention, instead of the whole transcript.
+"""
+
+import re
+import unicodedata
+from collections import deque
+
+from templates.cache import VersionedIndexCache
+from templates.models import Field
+from templates.validation import TemplateValidator
+
+TOKEN = re.compile(r"[^\W_]+")
+# Labels invented by field detection ("Field 3") and ids like "p1_3" are not
+# something anyone would say
+GENERATED_PHRASE = re.compile(r"^(?:field \d+|p\d+(?: \d+)+)$")
+
+# Shorter words have too many neighbours one edit away to be corrected safely
+FUZZY_MIN_LENGTH = 5
+LEADING_FILLERS = {"is", "are", "was", "equals", "equal", "to", "be", "should", "will", "set"}
+TRAILING_FILLERS = {"and", "then", "next", "my", "your", "the"}
+STOP_WORDS = LEADING_FILLERS | TRAILING_FILLERS | {"a", "an", "of"}
+NEGATIVE_WORDS = {"no", "not", "unchecked", "false", "off", "uncheck", "untick"}
+VALUE_PUNCTUATION = " \t\r\n,;:!?-"
+
+SPOKEN_SYMBOLS = {"at": "@", "dot": ".", "dash": "-", "underscore": "_", "plus": "+"}
+
+# Trailing words a streaming recognizer may still revise; mentions are only
+# settled once they are further than this (plus the longest label) from the end
+REVISION_TOKENS = 8
+
+
+def normalize(token):
+    decomposed = unicodedata.normalize("NFKD", token)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text, start=0):
+    """Return ``[(normalized_token, start, end)]`` with character offsets into ``text``.
+
+    Tokens are read from character ``start`` on.
+    """
+    return [(normalize(m.group()), m.start(), m.end()) for m in TOKEN.finditer(text, start)]
+
+
+def _deletions(token):
+    return {token[:i] + token[i + 1 :] for i in range(len(token))}
+
+
+class _Automaton:
+    """Aho-Corasick automaton whose alphabet is normalized tokens."""
+
+    def __init__(self):
+        """Start with only the root state."""
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+
+    def add(self, tokens, payload):
+        state = 0
+        for token in tokens:
+            following = self.goto[state].get(token)
+            if following is None:
+                following = len(self.goto)
+                self.goto[state][token] = following
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+            state = following
+        self.outputs[state].append((len(tokens), payload))
+
+    def compile(self):
+        """Compute failure links breadth first and merge outputs along them."""
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for token, following in self.goto[state].items():
+                pending.append(following)
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[following] = self.goto[fallback].get(token, 0)
+                self.outputs[following] = (
+                    self.outputs[following] + self.outputs[self.fail[following]]
+                )
+
+    def step(self, state, token):
+        """Return the state after ``token``, or None when no phrase continues or starts with it."""
+        while state and token not in self.goto[state]:
+            state = self.fail[state]
+        return self.goto[state].get(token)
+
+    def scan(self, tokens, alternatives=None):
+        """Yield ``(end_position, phrase_length, payload)`` for every phrase occurrence.
+
+        ``alternatives(token)`` gives replacements to try, in order, for a
+        token no phrase continues or starts with at that point.
+        """
+        state = 0
+        for position, token in enumerate(tokens):
+            following = self.step(state, token)
+            if following is None and alternatives is not None:
+                for alternative in alternatives(token):
+                    following = self.step(state, alternative)
+                    if following is not None:
+                        break
+            state = following or 0
+            for length, payload in self.outputs[state]:
+                yield position, length, payload
+
+
+class MatchIndex:
+    """The compiled phrases of one template version."""
+
+    def __init__(self, fields, version=None):
+        """Compile ``fields``, dicts with field_id, type, label and validation."""
+        self.fields = fields
+        self.version = version
+        self.validator = TemplateValidator(fields, version)
+        self.automaton = _Automaton()
+        self.vocabulary = set()
+        self.near_misses = {}
+        self.longest = 0
+
+        phrases = {}
+        for position, field in enumerate(fields):
+            for phrase in self._phrases(field):
+                phrases.setdefault(phrase, []).append(position)
+        for phrase, positions in phrases.items():
+            self.automaton.add(phrase, tuple(positions))
+            self.vocabulary.update(phrase)
+            self.longest = max(self.longest, len(phrase))
+        self.automaton.compile()
+
+        for token in self.vocabulary:
+            if len(token) >= FUZZY_MIN_LENGTH:
+                for variant in _deletions(token) | {token}:
+                    self.near_misses.setdefault(variant, set()).add(token)
+
+    @staticmethod
+    def _phrases(field):
+        validation = field.get("validation") or {}
+        sources = [field["label"], field["field_id"], *validation.get("synonyms", [])]
+        phrases = set()
+        for source in sources:
+            phrase = tuple(token for token, _, _ in tokenize(str(source)))
+            if not phrase or GENERATED_PHRASE.match(" ".join(phrase)):
+                continue
+            if all(token in STOP_WORDS for token in phrase):
+                continue
+            phrases.add(phrase)
+        return phrases
+
+    @classmethod
+    def build(cls, template_id, version):
+        fields = Field.objects.filter(template_id=template_id).order_by("page_number", "id")
+        return cls(list(fields.values("field_id", "type", "label", "validation")), version)
+
+    def alternatives(self, token):
+        """Return the phrase words one edit away from a transcript ``token`` not in any phrase."""
+        if token in self.vocabulary or len(token) < FUZZY_MIN_LENGTH:
+            return ()
+        candidates = set(self.near_misses.get(token, ()))
+        for variant in _deletions(token):
+            candidates.update(self.near_misses.get(variant, ()))
+        return sorted(candidates)
+
+    def mentions(self, tokens):
+        """Return non-overlapping ``(start, end, field_positions)`` label mentions.
+
+        Overlaps are resolved leftmost first, then longest.
+        """
+        found = [
+            (end - length + 1, end, positions)
+            for end, length, positions in self.automaton.scan(
+                [token for token, _, _ in tokens], self.alternatives
+            )
+        ]
+        found.sort(key=lambda mention: (mention[0], mention[0] - mention[1]))
+        chosen = []
+        for mention in found:
+            if not chosen or mention[0] > chosen[-1][1]:
+                chosen.append(mention)
+        return chosen
+
+    def match(self, transcript):
+        """Return ``[{field_id, value, start, end}]`` in transcript order.
+
+        ``start`` and ``end`` locate the value in the transcript. When a field
+        is mentioned again the later value wins, which lets speakers correct
+        themselves. A label shared by several fields fills them in turn.
+        """
+        tokens = tokenize(transcript)
+        return _ordered(self.assign(transcript, tokens, self.mentions(tokens), {}))
+
+    def assign(self, transcript, tokens, mentions, assigned, first=0, last=None):
+        """Apply ``mentions[first:last]`` to ``assigned``, ``{field_position: assignment}``.
+
+        The value of a mention runs to the next mention, or to the end of the
+        transcript for the last one.
+        """
+        last = len(mentions) if last is None else last
+        for number in range(first, last):
+            _, end, positions = mentions[number]
+            if number + 1 < len(mentions):
+                following = mentions[number + 1][0]
+                span = (tokens[end][2], tokens[following][1])
+            else:
+                following = len(tokens)
+                span = (tokens[end][2], len(transcript))
+            start, stop = _trim(transcript, tokens[end + 1 : following], *span)
+
+            free = [position for position in positions if position not in assigned]
+            position = free[0] if free else positions[-1]
+            field = self.fields[position]
+            value = _clean_value(field, transcript[start:stop])
+            if value:
+                assigned[position] = {
+                    "field_id": field["field_id"],
+                    "value": value,
+                    "start": start,
+                    "end": stop,
+                }
+        return assigned
+
+    def errors(self, assignments):
+        """Return ``{field_id: [errors]}`` for assigned values that fail their validation."""
+        values = {assignment["field_id"]: assignment["value"] for assignment in assignments}
+        return self.validator.validate(values, partial=True)
+
+
+class TranscriptMatcher:
+    """Matches of a transcript that grows while it is dictated.
+
+    ``update`` gives the same result as ``MatchIndex.match`` on the whole
+    transcript. Mentions followed by more than the longest label and
+    ``REVISION_TOKENS`` words are settled: their values end where the next
+    mention starts, so they are kept, and later updates tokenize and scan
+    only from the first unsettled mention on. Text the matcher has settled
+    is checked on every update; if the recognizer revised it, the transcript
+    is matched from the start again.
+    """
+
+    def __init__(self, index):
+        """Follow transcripts matched against ``index``."""
+        self.index = index
+        self._reset()
+
+    def _reset(self):
+        self.start = 0
+        self.prefix = ""
+        self.settled = {}
+
+    def update(self, transcript):
+        """Return ``[{field_id, value, start, end}]`` for the transcript so far."""
+        if not transcript.startswith(self.prefix):
+            self._reset()
+        tokens = tokenize(transcript, self.start)
+        mentions = self.index.mentions(tokens)
+
+        # Mentions starting this far from the end cannot change any more, and
+        # neither can the values of the mentions before them
+        cutoff = len(tokens) - self.index.longest - REVISION_TOKENS
+        stable = 0
+        while stable + 1 < len(mentions) and mentions[stable + 1][1] < cutoff:
+            stable += 1
+
+        assigned = self.index.assign(transcript, tokens, mentions, dict(self.settled), last=stable)
+        if stable:
+            self.settled = dict(assigned)
+            first = mentions[stable][0]
+            self.start = tokens[first][1]
+            # The tokens any mention overlapping the new start could span must not change
+            self.prefix = transcript[: tokens[first + self.index.longest][1]]
+        return _ordered(self.index.assign(transcript, tokens, mentions, assigned, first=stable))
+
+
+def _ordered(assigned):
+    return sorted(assigned.values(), key=lambda assignment: assignment["start"])
+
+
+def _trim(transcript, tokens, start, end):
+    """Narrow ``[start, end)`` past filler words and punctuation at either end."""
+    first, last = 0, len(tokens)
+    while first < last and tokens[first][0] in LEADING_FILLERS:
+        start = tokens[first][2]
+        first += 1
+    while last > first and tokens[last - 1][0] in TRAILING_FILLERS:
+        end = tokens[last - 1][1]
+        last -= 1
+    while start < end and transcript[start] in VALUE_PUNCTUATION:
+        start += 1
+    while end > start and transcript[end - 1] in VALUE_PUNCTUATION + ".":
+        end -= 1
+    return start, end
+
+
+def _clean_value(field, text):
+    validation = field.get("validation") or {}
+    hint = validation.get("format") or validation.get("type")
+    if field["type"] in ("checkbox", "radio"):
+        words = {token for token, _, _ in tokenize(text)}
+        return "no" if words & NEGATIVE_WORDS else "yes"
+    if hint == "email":
+        text = _spoken_symbols(text)
+    elif hint in ("number", "integer", "phone"):
+        allowed = "0123456789+" if hint == "phone" else "0123456789-."
+        text = "".join(c for c in text if c in allowed)
+    if validation.get("choices"):
+        text = _closest_choice(text, validation["choices"])
+    if validation.get("max_length"):
+        text = text[: int(validation["max_length"])]
+    return text
+
+
+def _spoken_symbols(text):
+    """Turn "jane at example dot com" into "jane@example.com"."""
+    parts = [SPOKEN_SYMBOLS.get(normalize(word), word) for word in text.split()]
+    return "".join(parts)
+
+
+def _closest_choice(text, choices):
+    """Return the choice whose words were all spoken, preferring longer choices."""
+    spoken = {token for token, _, _ in tokenize(text)}
+    for choice in sorted(choices, key=lambda c: -len(str(c))):
+        words = {token for token, _, _ in tokenize(str(choice))}
+        if words and words <= spoken:
+            return choice
+    return text
+
+
+index_cache = VersionedIndexCache("MATCH_INDEX_CACHE_SIZE", MatchIndex.build)
+
+
+def template_index(template_id):
+    """Return the match index for the template's current version.
+
+    Raises ``Template.DoesNotExist`` for an unknown template.
+    """
+    return index_cache.get(template_id)
@@ -0,0 +1,5 @@
+from rest_framework import serializers
+
+
+class TranscriptSerializer(serializers.Serializer):
+    transcript = serializers.CharField(allow_blank=True, trim_whitespace=False)
@@ -0,0 +1,171 @@
+"""Dictation over WebSocket.
+
+Clients connect to ``/ws/templates/<id>/dictate/`` and send audio as binary
+frames. Every frame is fed to a streaming recognizer, and whenever the
+transcript changes the server answers with a ``partial`` message holding the
+transcript so far, the field values it implies and the validation errors of
+those values. A text frame ``{"type": "end"}`` finishes the stream with a
+``final`` message, after which the server closes the connection. Matching
+follows the transcript with a ``TranscriptMatcher``, so each update costs the
+new words rather than the whole dictation.
+
+Django's ASGI handler only speaks HTTP, so this is a plain ASGI application
+that ``backend.asgi`` routes WebSocket connections to.
+
+Frames travel from the socket to the recognizer through a queue holding at
+most ``VOICE_STREAM_MAX_PENDING_FRAMES``. When the queue is full the server
+stops reading, which pushes back on the client instead of buffering without
+bound. Frames that queued up while the recognizer was busy are fed in one go
+and answered with a single message, so a slow recognizer never falls further
+and further behind.
+"""
+
+import asyncio
+import json
+import logging
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from templates.models import Template
+
+from . import matching
+from .transcription import get_recognizer
+
+logger = logging.getLogger(__name__)
+
+PATH = re.compile(r"^/ws/templates/(?P<pk>\d+)/dictate/$")
+
+CLOSE_NORMAL = 1000
+CLOSE_UNSUPPORTED = 1003
+CLOSE_ERROR = 1011
+CLOSE_TOO_BIG = 1009
+CLOSE_NOT_FOUND = 4404
+
+_END = object()
+
+
+async def dictation_application(scope, receive, send):
+    """ASGI application serving dictation WebSocket connections."""
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    route = PATH.match(scope["path"])
+    if route is None:
+        await send({"type": "websocket.close", "code": CLOSE_NOT_FOUND})
+        return
+    try:
+        index = await sync_to_async(matching.template_index)(int(route["pk"]))
+    except Template.DoesNotExist:
+        await send({"type": "websocket.close", "code": CLOSE_NOT_FOUND})
+        return
+
+    await send({"type": "websocket.accept"})
+    await DictationSession(index, get_recognizer(), send).run(receive)
+
+
+class DictationSession:
+    """One dictation stream: reads frames, recognizes them and reports matches."""
+
+    def __init__(self, index, recognizer, send):
+        """Bind the template's match index and a fresh recognizer to a connection."""
+        self.index = index
+        self.recognizer = recognizer
+        self.send = send
+        self.frames = asyncio.Queue(maxsize=settings.VOICE_STREAM_MAX_PENDING_FRAMES)
+        self.received = 0
+        self.transcript = None
+        self.matcher = matching.TranscriptMatcher(index)
+
+    async def run(self, receive):
+        worker = asyncio.create_task(self._recognize())
+        close_code = await self._read(receive, worker)
+        if close_code != CLOSE_NORMAL:
+            worker.cancel()
+        try:
+            await worker
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            logger.exception("Error recognizing dictation")
+            if close_code is not None:
+                close_code = CLOSE_ERROR
+        if close_code is not None:
+            await self.send({"type": "websocket.close", "code": close_code})
+
+    async def _read(self, receive, worker):
+        """Queue incoming frames and return the close code, or None on disconnect."""
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                return None
+            if message.get("bytes") is not None:
+                frame = message["bytes"]
+                self.received += len(frame)
+                if (
+                    len(frame) > settings.VOICE_STREAM_MAX_FRAME_SIZE
+                    or self.received > settings.VOICE_AUDIO_MAX_SIZE
+                ):
+                    return CLOSE_TOO_BIG
+                if not await self._enqueue(frame, worker):
+                    return CLOSE_ERROR
+            elif _is_end(message.get("text")):
+                return CLOSE_NORMAL if await self._enqueue(_END, worker) else CLOSE_ERROR
+            else:
+                return CLOSE_UNSUPPORTED
+
+    async def _enqueue(self, frame, worker):
+        """Wait for room in the queue; return False if the recognizer died meanwhile."""
+        if worker.done():
+            return False
+        if not self.frames.full():
+            self.frames.put_nowait(frame)
+            return True
+        put = asyncio.ensure_future(self.frames.put(frame))
+        await asyncio.wait({put, worker}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            return False
+        return True
+
+    async def _recognize(self):
+        accept = sync_to_async(self._accept, thread_sensitive=False)
+        while True:
+            frames = [await self.frames.get()]
+            while not self.frames.empty():
+                frames.append(self.frames.get_nowait())
+            finished = frames[-1] is _END
+            transcript, assignments = await accept(frames[:-1] if finished else frames, finished)
+            if finished:
+                await self._reply("final", transcript, assignments)
+                return
+            if transcript != self.transcript:
+                self.transcript = transcript
+                await self._reply("partial", transcript, assignments)
+
+    def _accept(self, frames, finished):
+        transcript = self.transcript or ""
+        for frame in frames:
+            transcript = self.recognizer.accept(frame)
+        if finished:
+            transcript = self.recognizer.finish()
+        elif transcript == self.transcript:
+            return transcript, None
+        return transcript, self.matcher.update(transcript)
+
+    async def _reply(self, kind, transcript, assignments):
+        message = {
+            "type": kind,
+            "version": self.index.version,
+            "transcript": transcript,
+            "assignments": assignments,
+            "errors": self.index.errors(assignments),
+        }
+        await self.send({"type": "websocket.send", "text": json.dumps(message)})
+
+
+def _is_end(text):
+    try:
+        return json.loads(text).get("type") == "end"
+    except (TypeError, ValueError, AttributeError):
+        return False
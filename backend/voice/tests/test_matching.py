@@ -0,0 +1,202 @@
+import pytest
+from rest_framework.test import APIClient
+from templates.models import Field, Template
+from templates.serializers import TemplateSerializer
+from voice.matching import MatchIndex
+
+FIELDS = [
+    {"field_id": "first_name", "type": "text", "label": "First name", "validation": {}},
+    {
+        "field_id": "last_name",
+        "type": "text",
+        "label": "Last name",
+        "validation": {"synonyms": ["surname"]},
+    },
+    {
+        "field_id": "email",
+        "type": "text",
+        "label": "Email address",
+        "validation": {"format": "email"},
+    },
+    {"field_id": "agree", "type": "checkbox", "label": "I agree", "validation": {}},
+    {"field_id": "p1_5", "type": "text", "label": "Field 5", "validation": {}},
+    {
+        "field_id": "state",
+        "type": "select",
+        "label": "State",
+        "validation": {"choices": ["New York", "Texas"]},
+    },
+]
+
+
+def values(assignments):
+    return {a["field_id"]: a["value"] for a in assignments}
+
+
+class TestMatchIndex:
+    def test_assigns_text_between_labels(self):
+        transcript = (
+            "My first name is Jane, last name Doe and email address is jane at example dot com."
+        )
+        assignments = MatchIndex(FIELDS).match(transcript)
+        assert values(assignments) == {
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "email": "jane@example.com",
+        }
+        first = assignments[0]
+        assert transcript[first["start"] : first["end"]] == "Jane"
+
+    def test_synonyms_fuzzy_labels_and_corrections(self):
+        transcript = (
+            "Surname O'Brien. Frist name is Jan, sorry, first name Jane. State new york please"
+        )
+        assert values(MatchIndex(FIELDS).match(transcript)) == {
+            "last_name": "O'Brien",
+            "first_name": "Jane",
+            "state": "New York",
+        }
+
+    def test_checkbox_values(self):
+        index = MatchIndex(FIELDS)
+        assert values(index.match("I agree.")) == {"agree": "yes"}
+        assert values(index.match("I agree? No, not yet")) == {"agree": "no"}
+
+    def test_generated_labels_are_not_matched(self):
+        assert MatchIndex(FIELDS).match("field 5 is ignored") == []
+
+    def test_shared_label_fills_fields_in_turn(self):
+        fields = [
+            {"field_id": f"name_{n}", "type": "text", "label": "Name", "validation": {}}
+            for n in range(3)
+        ]
+        assert values(MatchIndex(fields).match("name Ada name Bob")) == {
+            "name_0": "Ada",
+            "name_1": "Bob",
+        }
+
+    def test_near_misses_only_resolve_to_labels_where_a_label_can_be(self):
+        fields = [
+            {"field_id": "name", "type": "text", "label": "Name", "validation": {}},
+            {"field_id": "home", "type": "text", "label": "Home address", "validation": {}},
+        ]
+        index = MatchIndex(fields)
+        assert values(index.match("name is lame")) == {"name": "lame"}
+        assert values(index.match("home adress 5 Main Street")) == {"home": "5 Main Street"}
+        # A one-edit neighbour in a value only counts when it continues a label
+        assert values(index.match("name Adress Lane home address Bern")) == {
+            "name": "Adress Lane",
+            "home": "Bern",
+        }
+
+    def test_long_dictation_is_linear(self):
+        fields = [
+            {"field_id": f"item_{n}", "type": "text", "label": f"Item {n} price", "validation": {}}
+            for n in range(2000)
+        ]
+        index = MatchIndex(fields)
+        operations = []
+
+        class Counted(list):
+            def __getitem__(self, state):
+                operations.append(state)
+                return super().__getitem__(state)
+
+        automaton = index.automaton
+        automaton.goto, automaton.fail = Counted(automaton.goto), Counted(automaton.fail)
+
+        def dictate(count):
+            operations.clear()
+            # Misheard words ("prise") exercise the near-miss lookups as well
+            transcript = " ".join(f"item {n} prise {n} dollars" for n in range(count))
+            assignments = index.match(transcript)
+            assert len(assignments) == count
+            return len(operations), assignments
+
+        single, _ = dictate(1000)
+        double, assignments = dictate(2000)
+        assert double <= 2 * single + 10
+        transcript = " ".join(f"item {n} prise {n} dollars" for n in range(2000))
+        assert assignments[-1] == {
+            "field_id": "item_1999",
+            "value": "1999 dollars",
+            "start": transcript.rindex("1999 dollars"),
+            "end": len(transcript),
+        }
+
+
+@pytest.mark.django_db
+class TestVoiceEndpoints:
+    @pytest.fixture
+    def template(self):
+        template = Template.objects.create(upload_id="voice-upload")
+        for field in FIELDS:
+            Field.objects.create(
+                template=template, page_number=1, x=0, y=0, width=100, height=20, **field
+            )
+        return template
+
+    def test_match(self, template):
+        response = APIClient().post(
+            f"/api/templates/{template.pk}/match/",
+            {"transcript": "first name Ada last name Lovelace"},
+            format="json",
+        )
+        assert response.status_code == 200
+        assert response.data["version"] == 1
+        assert values(response.data["assignments"]) == {
+            "first_name": "Ada",
+            "last_name": "Lovelace",
+        }
+
+    def test_match_reports_validation_errors(self, template):
+        response = APIClient().post(
+            f"/api/templates/{template.pk}/match/",
+            {"transcript": "first name Ada email address ada at example"},
+            format="json",
+        )
+        assert values(response.data["assignments"]) == {
+            "first_name": "Ada",
+            "email": "ada@example",
+        }
+        assert response.data["errors"] == {
+            "email": [{"code": "email", "message": "Enter a valid email address"}]
+        }
+
+    def test_index_follows_template_version(self, template):
+        url = f"/api/templates/{template.pk}/match/"
+        APIClient().post(url, {"transcript": "first name Ada"}, format="json")
+
+        data = TemplateSerializer(template).data
+        data["fields"][0]["label"] = "Given name"
+        serializer = TemplateSerializer(template, data=data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        response = APIClient().post(url, {"transcript": "given name Ada"}, format="json")
+        assert response.data["version"] == 2
+        assert values(response.data["assignments"]) == {"first_name": "Ada"}
+
+    def test_transcribe_with_stub_engine(self, template):
+        response = APIClient().post(
+            f"/api/templates/{template.pk}/transcribe/",
+            b"surname   Hopper",
+            content_type="audio/wav",
+        )
+        assert response.status_code == 200
+        assert response.data["transcript"] == "surname Hopper"
+        assert values(response.data["assignments"]) == {"last_name": "Hopper"}
+
+    def test_transcribe_rejects_oversized_audio(self, template, settings):
+        settings.VOICE_AUDIO_MAX_SIZE = 4
+        response = APIClient().post(
+            f"/api/templates/{template.pk}/transcribe/", b"12345", content_type="audio/wav"
+        )
+        assert response.status_code == 413
+
+    def test_errors(self, template):
+        client = APIClient()
+        response = client.post(f"/api/templates/{template.pk}/match/", {}, format="json")
+        assert response.status_code == 400
+        response = client.post("/api/templates/999/match/", {"transcript": ""}, format="json")
+        assert response.status_code == 404
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import random
+import threading
+
+import pytest
+from templates.models import Field, Template
+from voice.matching import MatchIndex, TranscriptMatcher
+from voice.streaming import dictation_application
+from voice.transcription import StubRecognizer
+
+
+def frame(data):
+    return {"type": "websocket.receive", "bytes": data}
+
+
+END = {"type": "websocket.receive", "text": json.dumps({"type": "end"})}
+
+
+async def converse(path, messages):
+    inbox = asyncio.Queue()
+    outbox = []
+    for message in [{"type": "websocket.connect"}, *messages]:
+        inbox.put_nowait(message)
+
+    async def send(message):
+        outbox.append(message)
+
+    scope = {"type": "websocket", "path": path}
+    await asyncio.wait_for(dictation_application(scope, inbox.get, send), timeout=10)
+    return outbox
+
+
+def replies(outbox):
+    return [json.loads(m["text"]) for m in outbox if m["type"] == "websocket.send"]
+
+
+@pytest.fixture
+def template(transactional_db):
+    template = Template.objects.create(upload_id="stream-upload")
+    for field_id, label in [("first_name", "First name"), ("last_name", "Last name")]:
+        Field.objects.create(
+            template=template,
+            field_id=field_id,
+            type="text",
+            label=label,
+            page_number=1,
+            x=0,
+            y=0,
+            width=100,
+            height=20,
+        )
+    return template
+
+
+class TestDictationStream:
+    def test_partial_and_final_results(self, template):
+        path = f"/ws/templates/{template.pk}/dictate/"
+        frames = [frame(b"first name "), frame(b"Ada last"), frame(b" name Love"), frame(b"lace")]
+        outbox = asyncio.run(converse(path, [*frames, END]))
+
+        assert outbox[0] == {"type": "websocket.accept"}
+        assert outbox[-1] == {"type": "websocket.close", "code": 1000}
+        messages = replies(outbox)
+        assert all(m["type"] == "partial" for m in messages[:-1])
+        assert messages[-1] == {
+            "type": "final",
+            "version": 1,
+            "transcript": "first name Ada last name Lovelace",
+            "assignments": [
+                {"field_id": "first_name", "value": "Ada", "start": 11, "end": 14},
+                {"field_id": "last_name", "value": "Lovelace", "start": 25, "end": 33},
+            ],
+            "errors": {},
+        }
+
+    def test_multibyte_characters_split_across_frames(self, template):
+        data = "last name Zoë".encode()
+        outbox = asyncio.run(
+            converse(
+                f"/ws/templates/{template.pk}/dictate/", [frame(data[:-1]), frame(data[-1:]), END]
+            )
+        )
+        assert replies(outbox)[-1]["assignments"][0]["value"] == "Zoë"
+
+    def test_unknown_template_is_rejected(self, template):
+        outbox = asyncio.run(converse("/ws/templates/999/dictate/", []))
+        assert outbox == [{"type": "websocket.close", "code": 4404}]
+
+    def test_oversized_frame_closes_connection(self, template, settings):
+        settings.VOICE_STREAM_MAX_FRAME_SIZE = 8
+        outbox = asyncio.run(
+            converse(f"/ws/templates/{template.pk}/dictate/", [frame(b"x" * 9), END])
+        )
+        assert outbox[-1] == {"type": "websocket.close", "code": 1009}
+
+    def test_slow_recognizer_bounds_buffering(self, template, settings, monkeypatch):
+        settings.VOICE_STREAM_MAX_PENDING_FRAMES = 2
+        release = threading.Event()
+        fed = []
+
+        class SlowRecognizer(StubRecognizer):
+            def accept(self, data):
+                release.wait(5)
+                fed.append(data)
+                return super().accept(data)
+
+        monkeypatch.setattr("voice.streaming.get_recognizer", SlowRecognizer)
+
+        async def scenario():
+            inbox = asyncio.Queue()
+            outbox = []
+
+            async def send(message):
+                outbox.append(message)
+
+            scope = {"type": "websocket", "path": f"/ws/templates/{template.pk}/dictate/"}
+            app = asyncio.ensure_future(dictation_application(scope, inbox.get, send))
+            for message in [{"type": "websocket.connect"}] + [frame(b"a ")] * 10 + [END]:
+                inbox.put_nowait(message)
+            await asyncio.sleep(0.3)
+            # Frames read so far: at most one queue's worth being recognized, a
+            # full queue and one waiting for room. The rest stay unread.
+            unread = inbox.qsize()
+            release.set()
+            await asyncio.wait_for(app, timeout=10)
+            return unread, outbox
+
+        unread, outbox = asyncio.run(scenario())
+        assert 11 - unread <= 2 * 2 + 1
+        assert len(fed) == 10
+        assert replies(outbox)[-1]["type"] == "final"
+        # Frames that queued up are answered together
+        assert len(replies(outbox)) < 11
+
+
+def dictated_words(count, rng):
+    words = []
+    for n in range(count):
+        label = rng.choice(["first name", "last name", "surname", "name"])
+        words += [*label.split(), *rng.choice(["is", ""]).split(), f"value{n}", "and"]
+    return words
+
+
+class TestTranscriptMatcher:
+    @pytest.mark.parametrize("seed", range(3))
+    def test_updates_match_the_whole_transcript(self, seed):
+        rng = random.Random(seed)
+        fields = [
+            {"field_id": "first", "type": "text", "label": "First name", "validation": {}},
+            {"field_id": "last", "type": "text", "label": "Last name", "validation": {}},
+            {
+                "field_id": "family",
+                "type": "text",
+                "label": "Surname",
+                "validation": {"synonyms": ["family name"]},
+            },
+        ]
+        index = MatchIndex(fields)
+        matcher = TranscriptMatcher(index)
+        words = []
+        for word in dictated_words(80, rng):
+            words.append(word)
+            if rng.random() < 0.2:
+                # The recognizer revises a recent word now and then
+                position = len(words) - 1 - rng.randrange(min(len(words), 12))
+                words[position] = rng.choice(["name", "last", "lost", "value"])
+            transcript = " ".join(words)
+            assert matcher.update(transcript) == index.match(transcript)
+
+    def test_work_per_update_does_not_grow_with_the_transcript(self, monkeypatch):
+        fields = [
+            {"field_id": f"item_{n}", "type": "text", "label": f"Item {n}", "validation": {}}
+            for n in range(50)
+        ]
+        index = MatchIndex(fields)
+        mentions = index.mentions
+        scanned = []
+        monkeypatch.setattr(
+            index, "mentions", lambda tokens: scanned.append(len(tokens)) or mentions(tokens)
+        )
+
+        def dictate(count):
+            scanned.clear()
+            matcher = TranscriptMatcher(index)
+            words = []
+            for n in range(count):
+                for word in f"item {n % 50} is {n} dollars".split():
+                    words.append(word)
+                    matcher.update(" ".join(words))
+            return sum(scanned)
+
+        # Twice the dictation, twice the work; rescanning everything would be four times
+        assert dictate(400) <= 2.1 * dictate(200)
+
+
+def test_stub_recognizer_collapses_whitespace_across_frames():
+    rng = random.Random(3)
+    text = "  first  name\tAda\n\nlast name  Lovelace  and more words " * 5
+    data = text.encode()
+    recognizer = StubRecognizer()
+    position = 0
+    while position < len(data):
+        size = rng.randint(1, 7)
+        transcript = recognizer.accept(data[position : position + size])
+        position += size
+        seen = data[:position].decode(errors="ignore")
+        assert transcript == " ".join(seen.split())
+    assert recognizer.finish() == " ".join(text.split())
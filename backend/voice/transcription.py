@@ -0,0 +1,94 @@
+"""Pluggable speech-to-text engines.
+
+``TRANSCRIPTION_ENGINE`` names the engine for complete recordings and
+``RECOGNIZER_ENGINE`` the one for audio streamed frame by frame, both by
+dotted path. Engines run locally in the web process; anything slow should be
+wrapped in a job.
+"""
+
+import codecs
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Transcriber:
+    """Base class for engines turning a complete recording into text."""
+
+    def transcribe(self, audio, content_type=None):
+        """Return the transcript of ``audio``, the raw bytes of a recording."""
+        raise NotImplementedError
+
+
+class StubTranscriber(Transcriber):
+    """Deterministic offline engine for development and tests.
+
+    The "recording" is expected to be UTF-8 text, which is returned as the
+    transcript with whitespace collapsed. Anything else transcribes to an
+    empty string.
+    """
+
+    def transcribe(self, audio, content_type=None):
+        try:
+            text = bytes(audio).decode("utf-8")
+        except UnicodeDecodeError:
+            return ""
+        return " ".join(text.split())
+
+
+class StreamingRecognizer:
+    """Base class for engines transcribing audio while it arrives.
+
+    A new instance is created for every stream and is only used by one
+    thread at a time.
+    """
+
+    def accept(self, frame):
+        """Feed the next chunk of audio and return the transcript so far."""
+        raise NotImplementedError
+
+    def finish(self):
+        """Return the final transcript once the stream has ended."""
+        raise NotImplementedError
+
+
+class StubRecognizer(StreamingRecognizer):
+    """Streaming counterpart of ``StubTranscriber``: frames are pieces of UTF-8 text.
+
+    Words are collapsed as they complete, so a frame costs the work of its own
+    text rather than of the whole transcript.
+    """
+
+    def __init__(self):
+        """Start with an empty transcript."""
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self.words = ""
+        self.pending = ""
+
+    def accept(self, frame):
+        self._add(self.decoder.decode(bytes(frame)))
+        return self._transcript()
+
+    def finish(self):
+        self._add(self.decoder.decode(b"", final=True))
+        return self._transcript()
+
+    def _add(self, text):
+        # The last word may continue in the next frame unless whitespace follows it
+        words = (self.pending + text).split()
+        self.pending = words.pop() if words and not text[-1:].isspace() else ""
+        if words:
+            self.words = " ".join([self.words, *words] if self.words else words)
+
+    def _transcript(self):
+        if not self.pending:
+            return self.words
+        return f"{self.words} {self.pending}" if self.words else self.pending
+
+
+def get_transcriber():
+    return import_string(settings.TRANSCRIPTION_ENGINE)()
+
+
+def get_recognizer():
+    return import_string(settings.RECOGNIZER_ENGINE)()
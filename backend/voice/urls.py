@@ -0,0 +1,14 @@
+from django.urls import path
+
+from .views import TemplateMatchView, TemplateTranscribeView
+
+app_name = "voice"
+
+urlpatterns = [
+    path("templates/<int:pk>/match/", TemplateMatchView.as_view(), name="template-match"),
+    path(
+        "templates/<int:pk>/transcribe/",
+        TemplateTranscribeView.as_view(),
+        name="template-transcribe",
+    ),
+]
@@ -0,0 +1,62 @@
+import logging
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from templates.models import Template
+
+from . import matching
+from .serializers import TranscriptSerializer
+from .transcription import get_transcriber
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateMatchView(APIView):
+    """Map a transcript onto the template's fields without saving anything."""
+
+    def post(self, request, pk):
+        try:
+            serializer = TranscriptSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            index = matching.template_index(pk)
+            transcript = serializer.validated_data["transcript"]
+            return Response(_match_response(index, transcript))
+        except Template.DoesNotExist:
+            return Response({"error": "Template not found"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            logger.exception("Error matching transcript")
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class TemplateTranscribeView(APIView):
+    """Transcribe a recording sent as the raw request body, then match it."""
+
+    def post(self, request, pk):
+        try:
+            index = matching.template_index(pk)
+            audio = request.read(settings.VOICE_AUDIO_MAX_SIZE + 1)
+            if len(audio) > settings.VOICE_AUDIO_MAX_SIZE:
+                return Response(
+                    {"error": f"Audio exceeds {settings.VOICE_AUDIO_MAX_SIZE} bytes"},
+                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                )
+            transcript = get_transcriber().transcribe(audio, request.content_type)
+            return Response(_match_response(index, transcript))
+        except Template.DoesNotExist:
+            return Response({"error": "Template not found"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            logger.exception("Error transcribing audio")
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _match_response(index, transcript):
+    assignments = index.match(transcript)
+    return {
+        "version": index.version,
+        "transcript": transcript,
+        "assignments": assignments,
+        "errors": index.errors(assignments),
+    }
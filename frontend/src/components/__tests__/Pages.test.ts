@@ -57,6 +57,24 @@ describe('Pages.vue', () => {
     expect(canvases).toHaveLength(2)
   })
 
+  it('loads the PDF with range requests', async () => {
+    mount(Pages, {
+      props: {
+        pdfUrl: '/api/uploads/abc/file/'
+      }
+    })
+
+    await new Promise(resolve => setTimeout(resolve, 0)) // Wait for PDF loading
+
+    expect(pdfjsLib.getDocument).toHaveBeenCalledWith(
+      expect.objectContaining({
+        url: '/api/uploads/abc/file/',
+        disableStream: true,
+        disableAutoFetch: true,
+      })
+    )
+  })
+
   it('handles PDF loading error', async () => {
     const consoleSpy = vi.spyOn(console, 'error').mockImplementation(() => {})
     const mockError = new Error('Failed to load PDF')